@@ -0,0 +1,69 @@
+# Compares the fast codecs (matcher.models.codec) with dataclasses_json and jsons,
+# on the payloads decoded and encoded on each match
+#
+# Usage: python -m benchmarks.codecs
+import timeit
+
+import jsons
+
+from matcher.models import codec
+from matcher.models.api.domain import Album, Song
+from matcher.models.api.dto import ExternalMetadataDto, ExternalMetadataSourceDto
+from matcher.models.event import Event
+
+ITERATIONS = 1_000
+
+ALBUM = {
+    "id": 1,
+    "name": "Album",
+    "slug": "artist-album",
+    "type": "StudioRecording",
+    "releaseDate": "2020-01-01T00:00:00.000Z",
+    "artists": [
+        {"id": 2, "name": "Artist", "localIdentifiers": {"musicbrainzId": "m"}},
+        {"id": 3, "name": "Other Artist", "localIdentifiers": None},
+    ],
+    "localIdentifiers": {"musicbrainzId": "m", "discogsId": "d"},
+}
+SONG = {
+    "id": 1,
+    "name": "Song",
+    "slug": "artist-song",
+    "artist": {"id": 2, "name": "Artist"},
+    "featuring": [{"id": 3, "name": "Other Artist"}],
+    "master": {"sourceFileId": 3, "duration": 210, "bitrate": 320},
+    "localIdentifiers": {"acoustidId": "a"},
+}
+EVENT = {"type": "song", "name": "Song", "id": 1}
+METADATA = ExternalMetadataDto(
+    "Description",
+    80,
+    [ExternalMetadataSourceDto(f"https://provider.com/{i}", i) for i in range(5)],
+    album_id=1,
+)
+
+
+def compare(name: str, current, fast):
+    current_time = timeit.timeit(current, number=ITERATIONS)
+    fast_time = timeit.timeit(fast, number=ITERATIONS)
+    print(
+        f"{name}: {current_time / ITERATIONS * 1e6:.1f}µs -> "
+        f"{fast_time / ITERATIONS * 1e6:.1f}µs ({current_time / fast_time:.0f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    compare(
+        "Decode album",
+        lambda: Album.schema().load(ALBUM),
+        lambda: codec.load(Album, ALBUM),
+    )
+    compare(
+        "Decode song", lambda: Song.schema().load(SONG), lambda: codec.load(Song, SONG)
+    )
+    compare(
+        "Decode event",
+        lambda: jsons.load(EVENT, Event),
+        lambda: codec.load(Event, EVENT),
+    )
+    compare("Encode metadata", lambda: METADATA.to_dict(), lambda: codec.dump(METADATA))
@@ -0,0 +1,76 @@
+# Compares the cost of checking whether a MusicBrainz request is cached
+# (to skip the rate limiter) as the cache fills up, before and after indexing it
+#
+# Usage: python -m benchmarks.musicbrainz_cache
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import cast
+
+from aiohttp_client_cache import CacheBackend
+from aiohttp_client_cache.response import CachedResponse
+from aiohttp_client_cache.session import CachedSession
+from yarl import URL
+
+from matcher.providers.musicbrainz import CACHE_EXPIRATION, CacheIndex
+
+SIZES = [100, 1_000, 10_000, 100_000]
+# In seconds, per size and implementation
+DURATION = 0.5
+BASE_URL = URL("https://musicbrainz.org/")
+QUERY = {"inc": "url-rels"}
+PARAMS = {**QUERY, "fmt": "json"}
+MISSING_ROUTE = "/ws/2/artist/missing"
+
+
+# What MusicBrainzProvider._fetch used to do
+async def scan_cache(session: CachedSession, route: str, query: dict) -> bool:
+    return any(
+        [
+            route == s.path and query == s.query  # pyright: ignore
+            async for s in session.cache.get_urls()
+        ]
+    )
+
+
+async def measure(f) -> float:
+    iterations = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        await f()
+        iterations += 1
+    return (time.perf_counter() - start) / iterations
+
+
+async def main():
+    session = CachedSession(base_url=BASE_URL, cache=CacheBackend())
+    index = CacheIndex(CACHE_EXPIRATION)
+    filled = 0
+    for size in SIZES:
+        for i in range(filled, size):
+            route = f"/ws/2/artist/{i}"
+            url = BASE_URL.join(URL(route)).with_query(PARAMS)
+            # Only the URL is read when scanning the cache
+            response = cast(CachedResponse, SimpleNamespace(url=url))
+            await session.cache.responses.write(
+                session.cache.create_key("GET", url), response
+            )
+            index.add(session, route, PARAMS, time.monotonic())
+        filled = size
+
+        async def check_index(route: str) -> bool:
+            return index.has(session, route, PARAMS)
+
+        # Worst case for the scan: a cache miss
+        before = await measure(lambda: scan_cache(session, MISSING_ROUTE, QUERY))
+        after = await measure(lambda: check_index(MISSING_ROUTE))
+        hit = await measure(lambda: check_index("/ws/2/artist/0"))
+        print(
+            f"{size} cached responses: {before * 1e6:.2f}µs -> {after * 1e6:.2f}µs "
+            f"({before / after:.0f}x faster, hit: {hit * 1e6:.2f}µs)"
+        )
+    await session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+# Compares the scheduling overhead of a match (with the 7 providers) before and after
+# the task planner. Provider requests are replaced by no-ops, so only the cost of
+# creating and scheduling the tasks is measured
+#
+# Usage: python -m benchmarks.planner (from the matcher's directory)
+import asyncio
+import os
+import time
+
+from matcher.api import API
+from matcher.context import Context
+from matcher.matcher import album, common, label, planner
+from matcher.models.api.provider import Provider
+from matcher.providers.factory import ProviderFactory
+from matcher.settings import (
+    AllMusicSettings,
+    DiscogsSettings,
+    GeniusSettings,
+    LrcLibSettings,
+    MetacriticSettings,
+    MusicBrainzSettings,
+    Settings,
+    WikipediaSettings,
+)
+
+ITERATIONS = 10_000
+
+
+async def noop(*_):
+    return None
+
+
+def ignore(_):
+    return None
+
+
+def setup_context():
+    os.environ.setdefault("INTERNAL_CONFIG_DIR", "tests/assets")
+    os.environ.setdefault("API_URL", "http://localhost")
+    os.environ.setdefault("API_KEYS", "abcd")
+    settings = Settings()
+    provider_settings = [
+        MusicBrainzSettings(name=MusicBrainzSettings.name),
+        MetacriticSettings(name=MetacriticSettings.name),
+        WikipediaSettings(name=WikipediaSettings.name),
+        AllMusicSettings(name=AllMusicSettings.name),
+        LrcLibSettings(name=LrcLibSettings.name),
+        GeniusSettings(api_key="x", name=GeniusSettings.name),
+        DiscogsSettings(api_key="x", name=DiscogsSettings.name),
+    ]
+    providers = [
+        ProviderFactory.buildProvider(
+            Provider(id=i, name=s.name, slug=s.name, illustration_id=None), s
+        )
+        for (i, s) in enumerate(provider_settings)
+    ]
+    Context.init(API(), settings, providers)
+
+
+# What matches used to do: one task per provider, then one task per feature
+async def match_before(features):
+    async def provider_task(provider):
+        await asyncio.gather(
+            *[
+                common.bind_feature_to_result(f, provider, lambda: True, noop, ignore)
+                for f in features
+            ]
+        )
+
+    await asyncio.gather(*[provider_task(p) for p in Context.get().get_providers()])
+
+
+async def match_after(resource, features, link_sources):
+    plan = planner.plan_tasks(resource, "", [], features, link_sources=link_sources)
+
+    async def provider_task(call: planner.ProviderCall):
+        await planner.run_features(
+            call,
+            [planner.FeatureBinding(f, lambda: True, noop, ignore) for f in features],
+        )
+
+    await planner.run_plan(plan, provider_task)
+
+
+async def measure(f) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await f()
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+async def compare(name: str, before, after):
+    before_time = await measure(before)
+    after_time = await measure(after)
+    print(
+        f"{name}: {before_time * 1e6:.1f}µs -> {after_time * 1e6:.1f}µs "
+        f"({before_time / after_time:.0f}x faster)"
+    )
+
+
+async def main():
+    setup_context()
+    await compare(
+        "Label",
+        lambda: match_before(label.LABEL_FEATURES),
+        lambda: match_after("label", label.LABEL_FEATURES, False),
+    )
+    await compare(
+        "Album",
+        lambda: match_before(album.ALBUM_FEATURES),
+        lambda: match_after("album", album.ALBUM_FEATURES, True),
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
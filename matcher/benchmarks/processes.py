@@ -0,0 +1,84 @@
+# Compares the throughput of the matcher with 1, 2 and 4 processes
+# Each simulated match parses an HTML page (CPU-bound, like Genius or AllMusic pages)
+# and sends requests to a provider whose rate limit is shared through the token server
+#
+# Usage: python -m benchmarks.processes
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+
+from matcher.lane import Lane
+from matcher.providers.rate_limiter import RateLimiter
+from matcher.tokens import TokenClient, TokenServer
+
+EVENTS = 200
+WORKERS_PER_PROCESS = 4
+REQUESTS_PER_EVENT = 3
+# Per second, shared by all processes
+RATE_LIMIT = 300
+# In seconds
+PROVIDER_LATENCY = 0.02
+PAGE = (
+    "<html><body>"
+    + "".join(f"<div class='lyrics'><p>Line {i}</p><br/></div>" for i in range(1000))
+    + "</body></html>"
+)
+
+
+async def simulate_matches(socket_path: str, events: int):
+    client = TokenClient(socket_path)
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(events):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            for _ in range(REQUESTS_PER_EVENT):
+                await client.acquire("benchmark", Lane.BACKGROUND)
+                await asyncio.sleep(PROVIDER_LATENCY)
+            BeautifulSoup(PAGE, "html.parser").find_all("p")
+
+    await asyncio.gather(*[worker() for _ in range(WORKERS_PER_PROCESS)])
+
+
+def run_process(socket_path: str, events: int):
+    asyncio.run(simulate_matches(socket_path, events))
+
+
+async def benchmark(processes: int) -> float:
+    socket_path = os.path.join(tempfile.mkdtemp(), "tokens.sock")
+    limiter = RateLimiter("benchmark")
+    limiter.limit_requests = RATE_LIMIT
+    limiter.reserved_requests = 0
+    server = TokenServer(socket_path, {"benchmark": limiter})
+    await server.start()
+    spawn = multiprocessing.get_context("spawn")
+    children = [
+        spawn.Process(target=run_process, args=(socket_path, EVENTS // processes))
+        for _ in range(processes)
+    ]
+    start = time.monotonic()
+    for child in children:
+        child.start()
+    await asyncio.gather(*[asyncio.to_thread(child.join) for child in children])
+    elapsed = time.monotonic() - start
+    await server.stop()
+    return elapsed
+
+
+async def main():
+    for processes in [1, 2, 4]:
+        elapsed = await benchmark(processes)
+        print(
+            f"{processes} process(es): {EVENTS} matches in {elapsed:.2f}s "
+            f"({EVENTS / elapsed:.1f} matches/s)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
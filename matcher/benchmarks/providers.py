@@ -0,0 +1,80 @@
+# Compares the dispatch of features and providers through the registry
+# with the linear isinstance scans it replaces, on the MusicBrainz and Genius providers
+#
+# Usage: python -m benchmarks.providers
+import timeit
+
+from matcher.models.api.provider import Provider
+from matcher.providers.features import (
+    GetAlbumGenresFeature,
+    GetArtistUrlFromIdFeature,
+    GetLabelByName,
+    GetSyncedSongLyricsFeature,
+    IsSongUrlFeature,
+)
+from matcher.providers.genius import GeniusProvider
+from matcher.providers.musicbrainz import MusicBrainzProvider
+from matcher.providers.registry import ProviderRegistry
+from matcher.settings import GeniusSettings, MusicBrainzSettings
+
+ITERATIONS = 100_000
+
+MUSICBRAINZ = MusicBrainzProvider(
+    Provider(1, "MusicBrainz", "musicbrainz", None), MusicBrainzSettings("MusicBrainz")
+)
+GENIUS = GeniusProvider(
+    Provider(2, "Genius", "genius", None), GeniusSettings("Genius", "x")
+)
+PROVIDERS = [MUSICBRAINZ, GENIUS]
+REGISTRY = ProviderRegistry(PROVIDERS)
+FEATURES = [
+    GetArtistUrlFromIdFeature,
+    GetAlbumGenresFeature,
+    IsSongUrlFeature,
+    GetSyncedSongLyricsFeature,
+    GetLabelByName,
+]
+
+
+# What BaseProvider.get_feature used to do
+def scan_feature(provider, t):
+    try:
+        return [f for f in provider.features if isinstance(f, t)][0]
+    except Exception:
+        pass
+
+
+def scan_provider(cl):
+    for provider in PROVIDERS:
+        if isinstance(provider, cl):
+            return provider
+    return None
+
+
+def compare(name: str, current, fast):
+    current_time = timeit.timeit(current, number=ITERATIONS)
+    fast_time = timeit.timeit(fast, number=ITERATIONS)
+    print(
+        f"{name}: {current_time / ITERATIONS * 1e9:.0f}ns -> "
+        f"{fast_time / ITERATIONS * 1e9:.0f}ns ({current_time / fast_time:.0f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    for provider in PROVIDERS:
+        for feature in FEATURES:
+            compare(
+                f"{provider.api_model.name}.get_feature({feature.__name__})",
+                lambda p=provider, f=feature: scan_feature(p, f),
+                lambda p=provider, f=feature: p.get_feature(f),
+            )
+    compare(
+        "Provider by type",
+        lambda: scan_provider(GeniusProvider),
+        lambda: REGISTRY.get_by_type(GeniusProvider),
+    )
+    compare(
+        "Provider by ID",
+        lambda: [p for p in PROVIDERS if p.api_model.id == 2][0],
+        lambda: REGISTRY.get_by_id(2),
+    )
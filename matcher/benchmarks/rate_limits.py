@@ -0,0 +1,85 @@
+# Compares a provider's throughput and throttled responses, with and without pacing.
+# The provider is a local server that allows LIMIT requests per second (over a
+# moving window) and answers 429 to the others, like Discogs does
+#
+# Usage: python -m benchmarks.rate_limits
+import asyncio
+import time
+from collections import deque
+
+from aiohttp import ClientSession, web
+
+from matcher.providers.rate_limiter import configure_rate_limiters
+from matcher.providers.session import HasSession
+
+LIMIT = 20
+REQUESTS = 100
+CONCURRENCY = 8
+
+
+def start_provider() -> web.Application:
+    sent: deque[float] = deque()
+
+    async def handler(_: web.Request):
+        now = time.monotonic()
+        while sent and sent[0] <= now - 1:
+            sent.popleft()
+        if len(sent) >= LIMIT:
+            return web.json_response({}, status=429, headers={"Retry-After": "1"})
+        sent.append(now)
+        return web.json_response(
+            {}, headers={"X-RateLimit-Remaining": str(LIMIT - len(sent))}
+        )
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    return app
+
+
+async def run(port: int, paced: bool) -> tuple[float, int]:
+    class Client(HasSession):
+        rate_limiter_name = "benchmark"
+
+        def mk_session(self):
+            return ClientSession(base_url=f"http://127.0.0.1:{port}")
+
+    client = Client()
+    remaining = iter(range(REQUESTS))
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        for _ in remaining:
+            if paced:
+                (_, ok) = await client.send_get("/", None, True)
+            else:
+                async with client.get_session().get("/") as response:
+                    ok = response.status == 200
+            failures += not ok
+
+    start = time.monotonic()
+    await asyncio.gather(*[worker() for _ in range(CONCURRENCY)])
+    elapsed = time.monotonic() - start
+    await client.reset_session()
+    return (REQUESTS / elapsed, failures)
+
+
+async def main():
+    configure_rate_limiters({"benchmark": (1, 1 / LIMIT)})
+    runner = web.AppRunner(start_provider())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # pyright: ignore
+    for paced in [False, True]:
+        (throughput, failures) = await run(port, paced)
+        print(
+            f"{'Paced' if paced else 'Unpaced'}: {throughput:.1f} requests/s "
+            f"(limit: {LIMIT}/s), {failures} failed requests out of {REQUESTS}"
+        )
+        await asyncio.sleep(1)
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,18 +1,24 @@
 import asyncio
-import logging
+import time
+from collections.abc import AsyncIterable
 from dataclasses import dataclass
+from functools import partial
 from typing import Annotated
 
 from aiormq.abc import AbstractChannel, DeliveredMessage
 from fastapi import Depends, FastAPI, Query, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.sse import EventSourceResponse, ServerSentEvent
 from pydantic import BaseModel
 
 from matcher.api import User
 from matcher.bootstrap import bootstrap_context
-from matcher.context import Context, CurrentItem
-from matcher.logger import INFO, WARN, log
+from matcher.cache import response_cache
+from matcher.context import Context, CurrentItem, provider_filter
+from matcher.jobs import Job, JobItem, JobItemStatus
+from matcher.lane import Lane
+from matcher.logger import ERROR, INFO, WARN, log, setup_logging
 from matcher.matcher.album import match_and_post_album
 from matcher.matcher.area import match_and_post_area
 from matcher.matcher.artist import match_and_post_artist
@@ -21,85 +27,276 @@ from matcher.matcher.song import match_and_post_song
 from matcher.models.api.domain import LocalIdentifiers
 from matcher.mq import (
     connect_mq,
-    get_queue_size,
+    stop_consuming,
     stop_mq,
 )
+from matcher.prefetch import prefetch
+from matcher.providers.rate_limiter import rate_limiters
+from matcher.providers.session import failed_providers
+from matcher.retry import RETRY_PRIORITY
+from matcher.supervisor import Supervisor, adopt_orphan_journals
+from matcher.transport import (
+    CONNECTIONS_LIMIT,
+    CONNECTIONS_PER_HOST_LIMIT,
+    transport,
+)
 
 from .models.event import Event
 
-match_lock = asyncio.Lock()
-
 
 async def consume(message: DeliveredMessage, channel: AbstractChannel):
     event = Event.from_json(message.body)
     delivery_tag = message.delivery_tag
+    key = (event.type, event.id)
+    ctx = Context.get()
+
+    async def ack():
+        if delivery_tag is not None:
+            await channel.basic_ack(delivery_tag)
+
+    if not ctx.coalescer.admit(key):
+        log(
+            INFO,
+            "Skipping duplicate event",
+            {event.type: event.name, "id": event.id},
+        )
+        await ack()
+        return
+
+    async def run():
+        try:
+            await match(event.type, event.name, event.id)
+        finally:
+            ctx.coalescer.release(key)
+        await ack()
+
+    # Gives the message back to the broker, so that it is not lost
+    async def drop():
+        if delivery_tag is not None:
+            await channel.basic_nack(delivery_tag, requeue=True)
+
     log(
         INFO,
         "Received event",
         {event.type: event.name, "id": event.id},
     )
-    await match(event.type, event.name, event.id)
-    if delivery_tag is not None:
-        await channel.basic_ack(delivery_tag)
+    ctx.scheduler.push(
+        event.type,
+        message.header.properties.priority,
+        run,
+        drop,
+        lambda: prefetch(event.type, event.id),
+    )
 
 
 async def match(
-    resourceType: str, resourceName: str, resourceId: int, reuseSources=False
+    resourceType: str,
+    resourceName: str,
+    resourceId: int,
+    reuseSources=False,
+    lane=Lane.BACKGROUND,
+    providers: set[int] | None = None,
+    incremental=False,
 ):
-    async with match_lock:
-        ctx = Context.get()
-        ctx.current_item = CurrentItem(
-            name=resourceName, type=resourceType, id=resourceId
-        )
-        ctx.pending_items_count = await get_queue_size()
-        if ctx.pending_items_count == 0:
-            ctx.clear_handled_items_count()
-        default_local_identifiers = LocalIdentifiers()
-        try:
-            match resourceType:
-                case "artist":
-                    artist = await ctx.client.get_artist(resourceId)
-                    await match_and_post_artist(
-                        resourceId,
-                        artist.name,
-                        artist.local_identifiers or default_local_identifiers,
-                        reuseSources,
-                    )
-                    ctx.increment_handled_items_count()
-                case "album":
-                    album = await ctx.client.get_album(resourceId)
-                    await match_and_post_album(
-                        resourceId,
-                        album.name,
-                        album.local_identifiers or default_local_identifiers,
-                        reuseSources,
-                    )
-                    ctx.increment_handled_items_count()
-                case "song":
-                    song = await ctx.client.get_song(resourceId)
-                    await match_and_post_song(
-                        resourceId,
-                        resourceName,
-                        song.local_identifiers or default_local_identifiers,
-                        reuseSources,
+    ctx = Context.get()
+    key = (resourceType, resourceId)
+    failures: set[int] = set()
+    async with ctx.match_pool.slot(key, lane):
+        with ctx.client.request_scope():
+            failures_token = failed_providers.set(failures)
+            filter_token = provider_filter.set(providers)
+            ctx.running_items[key] = CurrentItem(
+                name=resourceName, type=resourceType, id=resourceId
+            )
+            started_at = time.monotonic()
+            if ctx.get_pending_items_count() == 0:
+                ctx.clear_handled_items_count()
+            if ctx.progress.has_subscribers():
+                ctx.progress.publish("queue", get_queue_status())
+            default_local_identifiers = LocalIdentifiers()
+            try:
+                match resourceType:
+                    case "artist":
+                        artist = await ctx.client.get_artist(resourceId)
+                        await match_and_post_artist(
+                            resourceId,
+                            artist.name,
+                            artist.local_identifiers or default_local_identifiers,
+                            reuseSources,
+                            incremental,
+                        )
+                        ctx.increment_handled_items_count()
+                    case "album":
+                        album = await ctx.client.get_album(resourceId)
+                        await match_and_post_album(
+                            resourceId,
+                            album.name,
+                            album.local_identifiers or default_local_identifiers,
+                            reuseSources,
+                            incremental,
+                        )
+                        ctx.increment_handled_items_count()
+                    case "song":
+                        song = await ctx.client.get_song(resourceId)
+                        await match_and_post_song(
+                            resourceId,
+                            resourceName,
+                            song.local_identifiers or default_local_identifiers,
+                            reuseSources,
+                            incremental,
+                        )
+                        ctx.increment_handled_items_count()
+                    case "area":
+                        area = await ctx.client.get_area(str(resourceId), True)
+                        await match_and_post_area(area)
+                        ctx.increment_handled_items_count()
+
+                    case "label":
+                        label = await ctx.client.get_label(str(resourceId))
+                        await match_and_post_label(label)
+                        ctx.increment_handled_items_count()
+                    case _:
+                        log(
+                            WARN, "No handler for resource type", {"type": resourceType}
+                        )
+            except Exception:
+                pass
+            finally:
+                failed_providers.reset(failures_token)
+                provider_filter.reset(filter_token)
+                del ctx.running_items[key]
+                if ctx.progress.has_subscribers():
+                    ctx.progress.publish(
+                        "match",
+                        MatchCompletedEvent(
+                            type=resourceType,
+                            id=resourceId,
+                            name=resourceName,
+                            lane=lane.value,
+                            duration=time.monotonic() - started_at,
+                        ),
                     )
-                    ctx.increment_handled_items_count()
-                case "area":
-                    area = await ctx.client.get_area(str(resourceId), True)
-                    await match_and_post_area(area)
-                    ctx.increment_handled_items_count()
-
-                case "label":
-                    label = await ctx.client.get_label(str(resourceId))
-                    await match_and_post_label(label)
-                    ctx.increment_handled_items_count()
-                case _:
-                    log(WARN, "No handler for resource type", {"type": resourceType})
-        except Exception:
-            pass
-        ctx.current_item = None
+                    ctx.progress.publish("queue", get_queue_status())
+    schedule_retry(resourceType, resourceName, resourceId, failures)
 
 
+# Re-runs the providers that failed, later and with a low priority
+def schedule_retry(
+    resource_type: str, resource_name: str, resource_id: int, failures: set[int]
+):
+    ctx = Context.get()
+    key = (resource_type, resource_id)
+    if not failures:
+        ctx.retrier.forget(key)
+        return
+
+    def retry():
+        # A match of the resource is already on its way
+        if ctx.coalescer.pending(key) is not None:
+            return
+        ctx.coalescer.hold(key)
+
+        async def run():
+            try:
+                await match(
+                    resource_type,
+                    resource_name,
+                    resource_id,
+                    lane=Lane.RETRY,
+                    providers=failures,
+                )
+            finally:
+                ctx.coalescer.release(key)
+
+        async def drop():
+            ctx.coalescer.release(key)
+
+        ctx.scheduler.push(resource_type, RETRY_PRIORITY, run, drop)
+
+    log_data = {resource_type: resource_name, "providers count": len(failures)}
+    if ctx.retrier.schedule(key, retry):
+        log(INFO, "Provider requests failed, retrying later", log_data)
+    else:
+        log(WARN, "Provider requests failed too many times, giving up", log_data)
+
+
+# Jobs are requested by admins, they go before events from the queue
+JOB_PRIORITY = 5
+
+# Keeps a reference to tasks waiting for a resource that was already pending
+job_waiters: set[asyncio.Task] = set()
+
+
+async def get_resource_name(resource_type: str, resource_id: int) -> str:
+    client = Context.get().client
+    match resource_type:
+        case "artist":
+            return (await client.get_artist(resource_id)).name
+        case "album":
+            return (await client.get_album(resource_id)).name
+        case "song":
+            return (await client.get_song(resource_id)).name
+    raise Exception(f"Unknown resource type: {resource_type}")
+
+
+def submit_job(job: Job):
+    ctx = Context.get()
+    ctx.jobs.add(job)
+    for item in job.items:
+        key = (item.type, item.id)
+        pending = ctx.coalescer.pending(key)
+        if pending is not None:
+            item.deduplicated = True
+            waiter = asyncio.create_task(wait_for_pending_item(item, pending))
+            job_waiters.add(waiter)
+            waiter.add_done_callback(job_waiters.discard)
+            continue
+        ctx.coalescer.hold(key)
+        (run, drop) = mk_job_item_task(job, item)
+        ctx.scheduler.push(
+            item.type, JOB_PRIORITY, run, drop, partial(prefetch, item.type, item.id)
+        )
+
+
+async def wait_for_pending_item(item: JobItem, pending: asyncio.Event):
+    item.start()
+    await pending.wait()
+    item.finish(JobItemStatus.DONE)
+
+
+def mk_job_item_task(job: Job, item: JobItem):
+    ctx = Context.get()
+    key = (item.type, item.id)
+
+    async def run():
+        item.start()
+        try:
+            # The entity fetched for its name is reused by the match
+            with ctx.client.request_scope():
+                name = await get_resource_name(item.type, item.id)
+                await match(
+                    item.type,
+                    name,
+                    item.id,
+                    reuseSources=job.reuse_sources,
+                    incremental=job.incremental,
+                )
+            item.finish(JobItemStatus.DONE)
+        except Exception as e:
+            log(ERROR, "Job item failed", {item.type: item.id, "error": str(e)})
+            item.finish(JobItemStatus.FAILED)
+        finally:
+            ctx.coalescer.release(key)
+
+    async def drop():
+        item.finish(JobItemStatus.FAILED)
+        ctx.coalescer.release(key)
+
+    return (run, drop)
+
+
+supervisor: Supervisor | None = None
+
 app = FastAPI(
     title="Meelo's Matcher API",
     description="The matcher is in charge of downloading external metadata (lyrics, images, genres) from providers (e.g. Genius, Wikipedia, etc.)",
@@ -111,25 +308,31 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup():
-    uvicorn_error = logging.getLogger("uvicorn.error")
-    uvicorn_error.disabled = True
-    uvicorn_access = logging.getLogger("uvicorn.access")
-    uvicorn_access.disabled = True
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)-4s %(message)s",
-        datefmt="%Y/%m/%d %H:%M:%S",
-    )
-
-    logging.getLogger("asyncio").setLevel(logging.ERROR)
-    logging.getLogger("pika").setLevel(logging.ERROR)
+    global supervisor
+    setup_logging()
     await bootstrap_context()
+    settings = Context.get().settings
+    journal = Context.get().client.journal
+    if journal is not None:
+        adopt_orphan_journals(journal, settings.processes)
+    if settings.processes > 1:
+        supervisor = Supervisor(settings.processes, settings.supervisor_socket_path)
+        await supervisor.start()
+    Context.get().scheduler.start()
     await connect_mq(consume)
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    await stop_consuming()
+    await Context.get().scheduler.stop()
+    Context.get().retrier.stop()
     await stop_mq()
+    await Context.get().client.stop_journal()
+    await response_cache.close()
+    await transport.close()
+    if supervisor is not None:
+        await supervisor.stop()
 
 
 class StatusResponse(BaseModel):
@@ -140,7 +343,48 @@ class StatusResponse(BaseModel):
 class QueueResponse(BaseModel):
     handled_items: int
     current_item: CurrentItem | None
+    running_items: list[CurrentItem]
     pending_items: int
+    coalesced_items: int
+    # Matches waiting to be retried
+    retrying_items: int
+    # Writes waiting to be sent to the API
+    journaled_writes: int
+
+
+class RateLimiterStatus(BaseModel):
+    name: str
+    waiting: int
+    requests: int
+    throttled: int
+    # In seconds
+    average_wait: float
+    max_wait: float
+
+
+class TransportResponse(BaseModel):
+    requests: int
+    connections_created: int
+    connections_reused: int
+    dns_cache_hits: int
+    dns_cache_misses: int
+    open_sessions: int
+    connections_limit: int
+    connections_per_host_limit: int
+    response_cache_hits: int
+    response_cache_stale_hits: int
+    response_cache_misses: int
+    response_cache_size: int
+    rate_limiters: list[RateLimiterStatus]
+
+
+class MatchCompletedEvent(BaseModel):
+    type: str
+    id: int
+    name: str
+    lane: str
+    # In seconds
+    duration: float
 
 
 @dataclass
@@ -169,16 +413,26 @@ async def get_user_token(req: Request) -> str:
 
 
 async def get_user(token: Annotated[str, Depends(get_user_token)]) -> User:
-    user = await Context.get().client.get_user(token)
+    ctx = Context.get()
+    (cached, user) = ctx.users.get(token)
+    if not cached:
+        user = await ctx.client.get_user(token)
+        ctx.users.set(token, user)
     if user is None:
         raise ErrorResponse("Invalid token", status.HTTP_400_BAD_REQUEST)
     if not user.enabled:
+        # The user may be enabled in the meantime, so it is fetched again next time
+        ctx.users.invalidate(token)
         raise ErrorResponse("User is not enabled", status.HTTP_401_UNAUTHORIZED)
     return user
 
 
-async def get_admin_user(user: Annotated[User, Depends(get_user)]) -> User:
+async def get_admin_user(
+    user: Annotated[User, Depends(get_user)],
+    token: Annotated[str, Depends(get_user_token)],
+) -> User:
     if not user.admin:
+        Context.get().users.invalidate(token)
         raise ErrorResponse("User is not an admin", status.HTTP_401_UNAUTHORIZED)
     return user
 
@@ -190,6 +444,21 @@ async def matcher_status() -> StatusResponse:
     )
 
 
+def get_queue_status() -> QueueResponse:
+    ctx = Context.get()
+    return QueueResponse(
+        pending_items=ctx.get_pending_items_count(),
+        handled_items=ctx.handled_items_count,
+        current_item=ctx.current_item,
+        running_items=list(ctx.running_items.values()),
+        coalesced_items=ctx.coalescer.coalesced_count,
+        retrying_items=ctx.retrier.pending_count(),
+        journaled_writes=ctx.client.journal.pending_count()
+        if ctx.client.journal
+        else 0,
+    )
+
+
 @app.get(
     "/queue",
     summary="Get info on the task queue",
@@ -199,19 +468,79 @@ async def matcher_status() -> StatusResponse:
 async def queue(
     _: Annotated[User, Depends(get_admin_user)],
 ) -> QueueResponse:
-    ctx = Context.get()
-    return QueueResponse(
-        pending_items=ctx.pending_items_count,
-        handled_items=ctx.handled_items_count,
-        current_item=ctx.current_item,
+    return get_queue_status()
+
+
+@app.get(
+    "/transport",
+    summary="Get stats on the HTTP connection pool",
+    tags=["Endpoints"],
+    response_model=TransportResponse,
+)
+async def transport_status(
+    _: Annotated[User, Depends(get_admin_user)],
+) -> TransportResponse:
+    stats = transport.stats
+    return TransportResponse(
+        requests=stats.requests,
+        connections_created=stats.connections_created,
+        connections_reused=stats.connections_reused,
+        dns_cache_hits=stats.dns_cache_hits,
+        dns_cache_misses=stats.dns_cache_misses,
+        open_sessions=transport.open_sessions_count(),
+        connections_limit=CONNECTIONS_LIMIT,
+        connections_per_host_limit=CONNECTIONS_PER_HOST_LIMIT,
+        response_cache_hits=response_cache.stats.hits,
+        response_cache_stale_hits=response_cache.stats.stale_hits,
+        response_cache_misses=response_cache.stats.misses,
+        response_cache_size=response_cache.size(),
+        rate_limiters=[
+            RateLimiterStatus(
+                name=limiter.name,
+                waiting=limiter.waiting,
+                requests=limiter.stats.requests,
+                throttled=limiter.stats.throttled,
+                average_wait=limiter.stats.total_wait / (limiter.stats.requests or 1),
+                max_wait=limiter.stats.max_wait,
+            )
+            for limiter in rate_limiters.values()
+        ],
     )
 
 
+# In seconds. If nothing happened, the queue's status is sent again,
+# which keeps the connection alive and refreshes the pending items count
+QUEUE_STREAM_REFRESH_INTERVAL = 15
+
+
+@app.get(
+    "/queue/stream",
+    summary="Stream the status of the task queue, and the completed matches",
+    tags=["Endpoints"],
+    response_class=EventSourceResponse,
+)
+async def queue_stream(
+    _: Annotated[User, Depends(get_admin_user)],
+) -> AsyncIterable[ServerSentEvent]:
+    ctx = Context.get()
+    with ctx.progress.subscribe() as events:
+        yield ServerSentEvent(event="queue", data=get_queue_status())
+        while True:
+            try:
+                async with asyncio.timeout(QUEUE_STREAM_REFRESH_INTERVAL):
+                    event = await events.get()
+                yield ServerSentEvent(event=event.name, data=event.data)
+            except TimeoutError:
+                yield ServerSentEvent(event="queue", data=get_queue_status())
+
+
 class MatchDTO(BaseModel):
     artistId: int | None = None
     albumId: int | None = None
     songId: int | None = None
     reuseSources: bool
+    # Only look for the data the resource does not have yet
+    incremental: bool = False
 
 
 @app.post(
@@ -231,17 +560,123 @@ async def rematch(
     try:
         if dto.artistId:
             artist = await ctx.client.get_artist(dto.artistId, token)
-            await match("artist", artist.name, artist.id, reuseSources=dto.reuseSources)
+            await match(
+                "artist",
+                artist.name,
+                artist.id,
+                reuseSources=dto.reuseSources,
+                lane=Lane.INTERACTIVE,
+                incremental=dto.incremental,
+            )
         if dto.albumId:
             album = await ctx.client.get_album(dto.albumId, token)
-            await match("album", album.name, album.id, reuseSources=dto.reuseSources)
+            await match(
+                "album",
+                album.name,
+                album.id,
+                reuseSources=dto.reuseSources,
+                lane=Lane.INTERACTIVE,
+                incremental=dto.incremental,
+            )
         if dto.songId:
             song = await ctx.client.get_song(dto.songId, token)
-            await match("song", song.name, song.id, reuseSources=dto.reuseSources)
+            await match(
+                "song",
+                song.name,
+                song.id,
+                reuseSources=dto.reuseSources,
+                lane=Lane.INTERACTIVE,
+                incremental=dto.incremental,
+            )
     except Exception as e:
         raise ErrorResponse(e.__str__(), status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class JobDTO(BaseModel):
+    artistIds: list[int] = []
+    albumIds: list[int] = []
+    songIds: list[int] = []
+    reuseSources: bool
+    # Only look for the data the resources do not have yet
+    incremental: bool = False
+
+
+class JobCreatedResponse(BaseModel):
+    id: str
+
+
+class JobItemResponse(BaseModel):
+    type: str
+    id: int
+    status: JobItemStatus
+    deduplicated: bool
+    started_at: float | None
+    finished_at: float | None
+    duration: float | None
+
+
+class JobResponse(BaseModel):
+    id: str
+    status: JobItemStatus
+    created_at: float
+    items: list[JobItemResponse]
+
+
+@app.post(
+    "/jobs",
+    summary="Refresh external metadata for the given resources, in the background",
+    tags=["Endpoints"],
+    response_model=JobCreatedResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_job(
+    _: Annotated[User, Depends(get_admin_user)],
+    dto: JobDTO,
+) -> JobCreatedResponse:
+    items = (
+        [JobItem("artist", id) for id in dict.fromkeys(dto.artistIds)]
+        + [JobItem("album", id) for id in dict.fromkeys(dto.albumIds)]
+        + [JobItem("song", id) for id in dict.fromkeys(dto.songIds)]
+    )
+    if not items:
+        raise ErrorResponse("Empty DTO", status.HTTP_400_BAD_REQUEST)
+    job = Job(items, dto.reuseSources, dto.incremental)
+    submit_job(job)
+    return JobCreatedResponse(id=job.id)
+
+
+@app.get(
+    "/jobs/{job_id}",
+    summary="Get the status of a job",
+    tags=["Endpoints"],
+    response_model=JobResponse,
+)
+async def get_job(
+    _: Annotated[User, Depends(get_admin_user)],
+    job_id: str,
+) -> JobResponse:
+    job = Context.get().jobs.get(job_id)
+    if job is None:
+        raise ErrorResponse("Job not found", status.HTTP_404_NOT_FOUND)
+    return JobResponse(
+        id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        items=[
+            JobItemResponse(
+                type=item.type,
+                id=item.id,
+                status=item.status,
+                deduplicated=item.deduplicated,
+                started_at=item.started_at,
+                finished_at=item.finished_at,
+                duration=item.duration,
+            )
+            for item in job.items
+        ],
+    )
+
+
 class ResolvedUrlResponse(BaseModel):
     url: str
     providerId: int
@@ -1,11 +1,19 @@
+import asyncio
 import os
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from datetime import date
 from typing import Any, TypeVar
 
 import aiohttp
 from dataclasses_json import DataClassJsonMixin
 
+from matcher.journal import RejectedWrite, WriteJournal
+from matcher.lane import Lane, current_lane
 from matcher.logger import ERROR, log
+from matcher.models import codec
 from matcher.models.api.domain import Album, Area, Artist, File, Label, Song
 from matcher.models.api.dto import (
     AreaDto,
@@ -21,9 +29,23 @@ from matcher.models.api.page import Page
 from matcher.models.api.provider import Provider
 from matcher.models.match_result import SyncedLyrics
 from matcher.providers.domain import AlbumType
+from matcher.transport import transport
+from matcher.writes import WritePlan
 
 T = TypeVar("T", bound=DataClassJsonMixin)
 
+# GET responses of the current request scope, by route and token
+request_cache: ContextVar[dict[tuple[str, str | None], asyncio.Future[Any]] | None] = (
+    ContextVar("request_cache", default=None)
+)
+
+PREFETCHED_CAPACITY = 50
+# In seconds. Past that, the prefetched response is considered stale
+PREFETCHED_TTL = 60
+
+# Writes of the current match, sent at the end of it
+write_plan: ContextVar[WritePlan | None] = ContextVar("write_plan", default=None)
+
 
 class API:
     def __init__(self):
@@ -33,7 +55,39 @@ class API:
         self._key = (os.environ.get("API_KEYS") or "").split(",")[0]
         if not self._key:
             raise Exception("Missing or empty env variable: 'API_KEYS'")
-        self.session = aiohttp.ClientSession(base_url=self._url)
+        self._session: aiohttp.ClientSession | None = None
+        # Responses fetched for upcoming events, used once by the next GET of the route
+        self._prefetched: dict[str, tuple[float, asyncio.Future[Any]]] = {}
+        # Concurrent GETs (e.g. from different matches) of the same route share a response
+        self._in_flight: dict[str, asyncio.Future[Any]] = {}
+        # When set, writes whose response is not needed are sent in the background
+        self.journal: WriteJournal | None = None
+        # Called with the user tokens that the API rejected (e.g. revoked or expired)
+        self.on_token_rejected: Callable[[str], None] | None = None
+
+    # Created lazily, as it requires a running event loop
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = transport.register(
+                aiohttp.ClientSession(base_url=self._url, **transport.session_options())
+            )
+        return self._session
+
+    def use_journal(self, journal: WriteJournal):
+        self.journal = journal
+        journal.start(self._replay)
+
+    async def stop_journal(self):
+        if self.journal is not None:
+            await self.journal.stop()
+            self.journal = None
+
+    async def _replay(self, method: str, route: str, json: dict):
+        if method == "PUT":
+            await self._send_put(route, json)
+        else:
+            await self._post(route, json=json)
 
     async def ping(self) -> bool:
         try:
@@ -42,22 +96,108 @@ class API:
         except Exception:
             return False
 
+    # Within the block, each GET is sent at most once (e.g. for the duration of a match).
+    # Responses are forgotten on writes
+    @contextmanager
+    def request_scope(self) -> Iterator[None]:
+        if request_cache.get() is not None:
+            yield
+            return
+        token = request_cache.set({})
+        try:
+            yield
+        finally:
+            request_cache.reset(token)
+
+    # Within the block, PUTs and the POSTs whose response is not needed are planned,
+    # and sent concurrently on exit. Writes planned before a failure are still sent
+    @asynccontextmanager
+    async def planned_writes(self) -> AsyncIterator[WritePlan]:
+        plan = WritePlan()
+        token = write_plan.set(plan)
+        try:
+            try:
+                yield plan
+            finally:
+                write_plan.reset(token)
+        except Exception:
+            await plan.send_quietly(self._put, self._post_later)
+            raise
+        await plan.send(self._put, self._post_later)
+
     async def _get(
         self, route: str, token: str | None = None, log_fail: bool = True
     ) -> Any:
+        cache = request_cache.get()
+        if cache is None:
+            return await self._get_uncached(route, token, log_fail)
+        key = (route, token)
+        response = cache.get(key)
+        if response is None:
+            response = asyncio.ensure_future(self._get_uncached(route, token, log_fail))
+            cache[key] = response
+        try:
+            return await asyncio.shield(response)
+        except Exception:
+            # Failed reads are not kept, so that they can be retried
+            if cache.get(key) is response:
+                del cache[key]
+            raise
+
+    async def _get_uncached(self, route: str, token: str | None, log_fail: bool) -> Any:
+        if token is not None:
+            return await self._fetch(route, token, log_fail)
+        if current_lane.get() == Lane.PREFETCH:
+            response = asyncio.ensure_future(self._fetch(route, token, False))
+            self._prefetched[route] = (time.monotonic(), response)
+            while len(self._prefetched) > PREFETCHED_CAPACITY:
+                del self._prefetched[next(iter(self._prefetched))]
+            return await asyncio.shield(response)
+        prefetched = self._prefetched.pop(route, None)
+        if prefetched is not None:
+            (fetched_at, response) = prefetched
+            if time.monotonic() - fetched_at < PREFETCHED_TTL:
+                try:
+                    return await response
+                except Exception:
+                    pass
+        return await self._fetch(route, token, log_fail)
+
+    async def _fetch(self, route: str, token: str | None, log_fail: bool) -> Any:
+        try:
+            if token is not None:
+                return await self._send_get(route, token)
+            response = self._in_flight.get(route)
+            if response is None:
+                response = asyncio.ensure_future(self._send_get(route, None))
+                self._in_flight[route] = response
+                response.add_done_callback(lambda r: self._forget_in_flight(route, r))
+            # Shielded, as other requests may be waiting for the same response
+            return await asyncio.shield(response)
+        except Exception:
+            if log_fail:
+                log(ERROR, "GETting API failed: ")
+            raise
+
+    def _forget_in_flight(self, route: str, response: asyncio.Future[Any]):
+        if self._in_flight.get(route) is response:
+            del self._in_flight[route]
+
+    async def _send_get(self, route: str, token: str | None) -> Any:
         async with self.session.get(
             route,
             headers={"Authorization": f"Bearer {token}"}
             if token
             else {"x-api-key": self._key},
         ) as response:
+            if response.status == 401 and token and self.on_token_rejected:
+                self.on_token_rejected(token)
             if response.status != 200:
-                if log_fail:
-                    log(ERROR, "GETting API failed: ")
                 raise Exception(await response.text())
             return await response.json()
 
     async def _post(self, route: str, json: dict = {}, file_path: str = "") -> Any:
+        self._forget_scoped_responses()
         async with self.session.post(
             route,
             headers={
@@ -68,10 +208,32 @@ class API:
         ) as response:
             if response.status != 201:
                 log(ERROR, "POSTting API failed: ")
-                raise Exception(await response.text())
+                raise await API._write_error(response)
             return await response.json()
 
+    # Planned or journaled if possible, see `planned_writes` and `use_journal`
+    async def _post_later(self, route: str, json: dict):
+        plan = write_plan.get()
+        if plan is not None:
+            plan.post(route, json)
+        elif self.journal is not None:
+            self._forget_scoped_responses()
+            self.journal.append("POST", route, json)
+        else:
+            await self._post(route, json=json)
+
     async def _put(self, route: str, json: dict = {}) -> None:
+        plan = write_plan.get()
+        if plan is not None:
+            plan.put(route, json)
+        elif self.journal is not None:
+            self._forget_scoped_responses()
+            self.journal.append("PUT", route, json)
+        else:
+            await self._send_put(route, json)
+
+    async def _send_put(self, route: str, json: dict) -> None:
+        self._forget_scoped_responses()
         async with self.session.put(
             route,
             headers={
@@ -81,15 +243,27 @@ class API:
         ) as response:
             if response.status != 200:
                 log(ERROR, "PUTting API failed: ")
-                raise Exception(await response.text())
+                raise await API._write_error(response)
+
+    # Client errors are not retried by the journal, unlike the API being unavailable
+    @staticmethod
+    async def _write_error(response: aiohttp.ClientResponse) -> Exception:
+        if 400 <= response.status < 500 and response.status not in [408, 429]:
+            return RejectedWrite(await response.text())
+        return Exception(await response.text())
+
+    def _forget_scoped_responses(self):
+        cache = request_cache.get()
+        if cache:
+            cache.clear()
 
     async def post_external_metadata(self, dto: ExternalMetadataDto):
-        await self._post("/external-metadata", json=dto.to_dict())
+        await self._post_later("/external-metadata", codec.dump(dto))
 
     async def post_artist_illustration(self, artist_id: int, image_url):
-        await self._post(
+        await self._post_later(
             "/illustrations/url",
-            json={"url": image_url, "artistId": artist_id},
+            {"url": image_url, "artistId": artist_id},
         )
 
     async def link_artist_to_area(
@@ -120,7 +294,7 @@ class API:
     async def _get_external_metadata(self, query: str) -> ExternalMetadataDto | None:
         try:
             json = await self._get(f"/external-metadata?{query}")
-            return ExternalMetadataDto.schema().load(json)
+            return codec.load(ExternalMetadataDto, json)
         except Exception:
             pass
 
@@ -130,23 +304,24 @@ class API:
 
     async def get_album(self, album_id: int, token: str | None = None) -> Album:
         json = await self._get(
-            f"/albums/{album_id}?with=artists,localIdentifiers", token
+            f"/albums/{album_id}?with=artists,localIdentifiers,genres", token
         )
-        return Album.schema().load(json)
+        return codec.load(Album, json)
 
     async def get_artist(self, artist_id: int, token: str | None = None) -> Artist:
         json = await self._get(f"/artists/{artist_id}?with=localIdentifiers", token)
-        return Artist.schema().load(json)
+        return codec.load(Artist, json)
 
     async def get_song(self, song_id: int, token: str | None = None) -> Song:
         json = await self._get(
-            f"/songs/{song_id}?with=artist,featuring,master,localIdentifiers", token
+            f"/songs/{song_id}?with=artist,featuring,master,localIdentifiers,genres,lyrics",
+            token,
         )
-        return Song.schema().load(json)
+        return codec.load(Song, json)
 
     async def get_file(self, file_id: int) -> File:
         json = await self._get(f"/files/{file_id}")
-        return File.schema().load(json)
+        return codec.load(File, json)
 
     async def get_user(self, token: str) -> User | None:
         try:
@@ -157,7 +332,7 @@ class API:
 
     async def post_provider(self, provider_name: str) -> Provider:
         dto = CreateProviderDto(name=provider_name)
-        json = await self._post("/external-providers", json=dto.to_dict())
+        json = await self._post("/external-providers", json=codec.dump(dto))
         return Provider.schema().load(json)
 
     async def post_provider_icon(self, provider_id: int, icon_path):
@@ -177,7 +352,7 @@ class API:
             labels=labels,
             type=type.value if type else None,
         )
-        await self._put(f"/albums/{album_id}", json=dto.to_dict())
+        await self._put(f"/albums/{album_id}", json=codec.dump(dto))
 
     async def post_song_lyrics(
         self, song_id: int, plain_lyrics: str, synced_lyrics: SyncedLyrics | None
@@ -188,18 +363,18 @@ class API:
                 {"timestamp": t, "content": line} for (t, line) in synced_lyrics
             ]
             dto = {**dto, "synced": formatted}
-        await self._post(f"/songs/{song_id}/lyrics", json=dto)
+        await self._post_later(f"/songs/{song_id}/lyrics", dto)
 
     async def post_song_genres(self, song_id: int, genres: list[str]):
         await self._put(f"/songs/{song_id}", json={"genres": genres})
 
     async def get_area(self, area_id: str | int, log_fail: bool) -> Area:
         json = await self._get(f"/areas/{area_id}", None, log_fail)
-        return Area.schema().load(json)
+        return codec.load(Area, json)
 
     async def get_label(self, label_id: str | int) -> Label:
         json = await self._get(f"/labels/{label_id}")
-        return Label.schema().load(json)
+        return codec.load(Label, json)
 
     async def get_area_by_mbid(self, area_mbid: str) -> Area | None:
         try:
@@ -209,20 +384,20 @@ class API:
 
     async def post_area(self, area_dto: AreaDto) -> Area | None:
         try:
-            json = await self._post("/areas", json=area_dto.to_dict())
-            return Area.schema().load(json)
+            json = await self._post("/areas", json=codec.dump(area_dto))
+            return codec.load(Area, json)
         except Exception as e:
             log(ERROR, str(e))
 
     async def update_area(self, area_id: int, area_dto: UpdateAreaDto):
         try:
-            await self._put(f"/areas/{area_id}", json=area_dto.to_dict())
+            await self._put(f"/areas/{area_id}", json=codec.dump(area_dto))
         except Exception as e:
             log(ERROR, str(e))
 
     async def update_label(self, label_id: int, label_dto: UpdateLabelDto):
         try:
-            await self._put(f"/labels/{label_id}", json=label_dto.to_dict())
+            await self._put(f"/labels/{label_id}", json=codec.dump(label_dto))
         except Exception as e:
             log(ERROR, str(e))
 
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+from matcher.api import API
+from matcher.models.api.domain import Area
+from matcher.models.api.dto import AreaDto
+
+# In seconds. The API deletes unused areas during its housekeeping,
+# so the IDs it gave us may not stay valid forever
+AREA_CACHE_TTL = 60 * 60
+
+
+class AreaResolver:
+    # Maps MBIDs to the API's areas, creating the missing ones.
+    # Concurrent resolutions of the same MBID share a single lookup (and creation)
+    def __init__(self, client: API, ttl: float = AREA_CACHE_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.hits = 0
+        self._areas: dict[str, tuple[float, Area]] = {}
+        self._resolving: dict[str, asyncio.Future[Area | None]] = {}
+
+    # Areas we got from the API (e.g. from events) are cached as well
+    def remember(self, area: Area):
+        self._areas[area.mbid] = (time.monotonic(), area)
+
+    def get(self, mbid: str) -> Area | None:
+        cached = self._areas.get(mbid)
+        if cached is None:
+            return None
+        (cached_at, area) = cached
+        if time.monotonic() - cached_at > self.ttl:
+            del self._areas[mbid]
+            return None
+        return area
+
+    async def resolve(self, dto: AreaDto) -> Area | None:
+        area = self.get(dto.mbid)
+        if area is not None:
+            self.hits += 1
+            return area
+        resolving = self._resolving.get(dto.mbid)
+        if resolving is None:
+            resolving = asyncio.ensure_future(self._resolve(dto))
+            self._resolving[dto.mbid] = resolving
+            resolving.add_done_callback(lambda _: self._resolving.pop(dto.mbid, None))
+        # A cancelled match should not cancel the others waiting for the area
+        return await asyncio.shield(resolving)
+
+    async def _resolve(self, dto: AreaDto) -> Area | None:
+        area = await self.client.get_area_by_mbid(dto.mbid)
+        if area is None:
+            area = await self.client.post_area(dto)
+        if area is None:
+            # Another process may have created it in the meantime
+            area = await self.client.get_area_by_mbid(dto.mbid)
+        if area is not None:
+            self.remember(area)
+        return area
@@ -1,10 +1,13 @@
 import sys
 
 from matcher.api import API
+from matcher.cache import response_cache
 from matcher.context import Context
+from matcher.journal import WriteJournal
 from matcher.logger import FATAL, INFO, log
 from matcher.models.api.provider import Provider as ProviderApiModel
 from matcher.providers.boilerplate import BaseProviderBoilerplate
+from matcher.providers.rate_limiter import configure_rate_limiters
 from matcher.settings import Settings
 
 from .providers.factory import ProviderFactory
@@ -25,9 +28,14 @@ async def bootstrap_context():
             settings.provider_settings,
             api_client,
         )
+        configure_rate_limiters(settings.rate_limits)
         resolved_providers = build_provider_models(
             provider_api_entries, settings.provider_settings
         )
+        if settings.journal_path:
+            api_client.use_journal(WriteJournal(settings.journal_path))
+        if settings.cache_path:
+            response_cache.open(settings.cache_path, settings.cache_size * 1024 * 1024)
         Context.init(api_client, settings, resolved_providers)
     except Exception as e:
         log(FATAL, str(e))
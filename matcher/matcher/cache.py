@@ -0,0 +1,278 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import sqlite3
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from matcher.logger import WARN, log
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+# In seconds, by resource kind. Providers can override them (see HasSession.cache_ttls)
+CACHE_DEFAULT_TTLS: dict[str, float] = {"search": DAY, "resource": 7 * DAY}
+# Past its TTL, a response is still served for this long, while it is fetched again in the background
+CACHE_STALE_TTL = 30 * DAY
+# In bytes
+CACHE_DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+# When the cache is full, least recently used responses are evicted until it is this full
+CACHE_EVICTION_RATIO = 0.9
+# Access times of cache hits are written in batches, so that hits do not write to the disk.
+# A batch is written once it has this many entries, or is this old (in seconds)
+CACHE_TOUCH_BATCH_SIZE = 100
+CACHE_TOUCH_INTERVAL = 60
+
+# (value, whether it can be cached, e.g. the response was successful)
+type Fetch = Callable[[], Awaitable[tuple[Any, bool]]]
+
+T = TypeVar("T")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class ResponseCache:
+    # Providers' responses, stored in a SQLite file shared by the processes,
+    # so that they survive restarts and rematches do not download them again.
+    # Disabled (i.e. responses are always fetched) until `open` is called.
+    # The file is accessed from a thread of its own, as other processes' writes can lock it
+    def __init__(self):
+        self.stats = CacheStats()
+        self.max_size = CACHE_DEFAULT_MAX_SIZE
+        self._db: sqlite3.Connection | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        # Estimate of the size of the stored responses, as other processes write to the file too
+        self._size = 0
+        self._refreshes: dict[str, asyncio.Task] = {}
+        # Access times not written yet, by key
+        self._touched: dict[str, float] = {}
+        self._touched_since = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    def open(self, path: str, max_size: int = CACHE_DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        # Only used by the executor's thread, once opened
+        self._db = sqlite3.connect(
+            path, isolation_level=None, timeout=5, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                stale_until REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self._db.execute("DELETE FROM responses WHERE stale_until < ?", (time.time(),))
+        self._size = self._stored_size()
+        self._executor = ThreadPoolExecutor(1, "response-cache")
+
+    async def close(self):
+        for task in list(self._refreshes.values()):
+            task.cancel()
+        await asyncio.gather(*self._refreshes.values(), return_exceptions=True)
+        if self._executor is not None:
+            (executor, self._executor) = (self._executor, None)
+            # After the reads and writes that are already queued
+            await asyncio.get_running_loop().run_in_executor(executor, self._close_db)
+            executor.shutdown()
+
+    def _close_db(self):
+        if self._db is not None:
+            self._flush_touched()
+            self._db.close()
+            self._db = None
+
+    def size(self) -> int:
+        return self._size if self.enabled else 0
+
+    # Returns the cached value if there is one. If it is stale, it is fetched again in the background
+    async def get_or_fetch(
+        self, provider: str, kind: str, key: str, ttl: float, fetch: Fetch
+    ) -> Any:
+        if not self.enabled:
+            return (await fetch())[0]
+        key = self._hash(provider, key)
+        entry = await self._run(self._read, key)
+        if entry is not None:
+            (value, expires_at) = entry
+            if expires_at > time.time():
+                self.stats.hits += 1
+            else:
+                self.stats.stale_hits += 1
+                self._refresh_later(provider, kind, key, ttl, fetch)
+            return value
+        self.stats.misses += 1
+        return await self._fetch_and_store(provider, kind, key, ttl, fetch)
+
+    async def _fetch_and_store(
+        self, provider: str, kind: str, key: str, ttl: float, fetch: Fetch
+    ) -> Any:
+        (value, cacheable) = await fetch()
+        if cacheable and value is not None:
+            await self._run(self._write, provider, kind, key, value, ttl)
+        return value
+
+    # Runs in the cache's thread. Does nothing once the cache is closed
+    async def _run(self, f: Callable[..., T], *args) -> T | None:
+        if self._executor is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, f, *args
+        )
+
+    # Only one refresh per response at a time
+    def _refresh_later(
+        self, provider: str, kind: str, key: str, ttl: float, fetch: Fetch
+    ):
+        if key in self._refreshes:
+            return
+
+        async def refresh():
+            try:
+                await self._fetch_and_store(provider, kind, key, ttl, fetch)
+            except Exception:
+                # The stale response is served until it can be fetched again
+                pass
+            finally:
+                self._refreshes.pop(key, None)
+
+        # Outside of the match's context, as it can outlive it
+        self._refreshes[key] = asyncio.create_task(
+            refresh(), context=contextvars.Context()
+        )
+
+    def _read(self, key: str) -> tuple[Any, float] | None:
+        if self._db is None:
+            return None
+        now = time.time()
+        try:
+            row = self._db.execute(
+                "SELECT value, expires_at, stale_until FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            (value, expires_at, stale_until) = row
+            if stale_until < now:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._touch(key, now)
+            return (json.loads(value), expires_at)
+        except (sqlite3.Error, ValueError) as e:
+            log(WARN, "Could not read from response cache", {"error": str(e)})
+            return None
+
+    def _write(self, provider: str, kind: str, key: str, value: Any, ttl: float):
+        if self._db is None:
+            return
+        now = time.time()
+        try:
+            serialized = json.dumps(value)
+            size = len(serialized)
+            self._db.execute(
+                """INSERT OR REPLACE INTO responses
+                (key, provider, kind, value, size, expires_at, stale_until, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    key,
+                    provider,
+                    kind,
+                    serialized,
+                    size,
+                    now + ttl,
+                    now + ttl + CACHE_STALE_TTL,
+                    now,
+                ),
+            )
+            self._size += size
+            if self._size > self.max_size:
+                self._evict()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            log(WARN, "Could not write to response cache", {"error": str(e)})
+
+    def _touch(self, key: str, now: float):
+        if not self._touched:
+            self._touched_since = now
+        self._touched[key] = now
+        if (
+            len(self._touched) >= CACHE_TOUCH_BATCH_SIZE
+            or now - self._touched_since >= CACHE_TOUCH_INTERVAL
+        ):
+            self._flush_touched()
+
+    def _flush_touched(self):
+        assert self._db is not None
+        (touched, self._touched) = (self._touched, {})
+        if not touched:
+            return
+        try:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for (key, accessed_at) in touched.items()],
+            )
+            self._db.execute("COMMIT")
+        except sqlite3.Error as e:
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            log(WARN, "Could not write to response cache", {"error": str(e)})
+
+    # Removes the least recently used responses
+    def _evict(self):
+        assert self._db is not None
+        # So that recently used responses are not evicted
+        self._flush_touched()
+        self._size = self._stored_size()
+        target = self.max_size * CACHE_EVICTION_RATIO
+        while self._size > target:
+            rows = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            evicted = []
+            for key, size in rows:
+                evicted.append(key)
+                self._size -= size
+                if self._size <= target:
+                    break
+            self._db.executemany(
+                "DELETE FROM responses WHERE key = ?", [(k,) for k in evicted]
+            )
+            self.stats.evictions += len(evicted)
+
+    def _stored_size(self) -> int:
+        assert self._db is not None
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    # Keys can contain secrets (e.g. tokens in the query), they are not stored as is
+    @staticmethod
+    def _hash(provider: str, key: str) -> str:
+        return hashlib.sha256(f"{provider}:{key}".encode()).hexdigest()
+
+
+response_cache = ResponseCache()
@@ -1,16 +1,28 @@
-import asyncio
 import os
-from collections.abc import Awaitable, Callable
-from dataclasses import dataclass
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from typing import TypeVar
 
 from matcher.providers.boilerplate import BaseProviderBoilerplate
+from matcher.providers.registry import ProviderRegistry
 
 from .api import API
+from .areas import AreaResolver
+from .jobs import JobRegistry
+from .pool import Coalescer, MatchPool, ResourceKey
+from .progress import ProgressBroadcaster
+from .retry import Retrier
+from .scheduler import Scheduler
 from .settings import Settings
+from .users import UserCache
 
 T = TypeVar("T", bound=BaseProviderBoilerplate)
 
+# When set, only the providers with these IDs are used (e.g. when retrying a match)
+provider_filter: ContextVar[set[int] | None] = ContextVar(
+    "provider_filter", default=None
+)
+
 
 @dataclass
 class CurrentItem:
@@ -26,18 +38,27 @@ class _InternalContext:
     providers: list[BaseProviderBoilerplate]
     handled_items_count: int
     pending_items_count: int
-    current_item: CurrentItem | None = None
-
-    async def run_provider_task(
-        self, t: Callable[[BaseProviderBoilerplate], Awaitable[None]]
-    ) -> None:
-        await asyncio.gather(*[t(p) for p in self.providers])
+    match_pool: MatchPool
+    coalescer: Coalescer
+    scheduler: Scheduler
+    retrier: Retrier
+    areas: AreaResolver
+    registry: ProviderRegistry
+    running_items: dict[ResourceKey, CurrentItem] = field(default_factory=dict)
+    jobs: JobRegistry = field(default_factory=JobRegistry)
+    progress: ProgressBroadcaster = field(default_factory=ProgressBroadcaster)
+    users: UserCache = field(default_factory=UserCache)
+
+    # The item whose match started last
+    @property
+    def current_item(self) -> CurrentItem | None:
+        return next(reversed(self.running_items.values()), None)
 
     def get_provider(self, cl: type[T]) -> T | None:
-        for provider in self.providers:
-            if isinstance(provider, cl):
-                return provider
-        return None
+        provider = self.registry.get_by_type(cl)
+        if provider is None or not self.is_provider_enabled(provider):
+            return None
+        return provider
 
     def get_provider_or_raise(self, cl: type[T]) -> T:
         res = self.get_provider(cl)
@@ -47,13 +68,25 @@ class _InternalContext:
     def get_providers(
         self,
     ) -> list[BaseProviderBoilerplate]:
-        return self.providers
+        enabled = provider_filter.get()
+        if enabled is None:
+            return self.providers
+        return [p for p in self.providers if p.api_model.id in enabled]
+
+    def is_provider_enabled(self, provider: BaseProviderBoilerplate) -> bool:
+        enabled = provider_filter.get()
+        return enabled is None or provider.api_model.id in enabled
+
+    # Items waiting in the broker's queue or in the local buffer
+    def get_pending_items_count(self) -> int:
+        return self.pending_items_count + self.scheduler.pending_count()
 
     def increment_handled_items_count(self):
         self.handled_items_count = self.handled_items_count + 1
 
     def clear_handled_items_count(self):
         self.handled_items_count = 0
+        self.coalescer.coalesced_count = 0
 
 
 class Context:
@@ -68,7 +101,21 @@ class Context:
     def init(
         cls, client: API, settings: Settings, providers: list[BaseProviderBoilerplate]
     ):
-        cls._instance = _InternalContext(client, settings, providers, 0, 0)
+        cls._instance = _InternalContext(
+            client,
+            settings,
+            providers,
+            0,
+            0,
+            MatchPool(settings.workers, settings.interactive_workers),
+            Coalescer(settings.coalesce_window),
+            Scheduler(settings.workers, settings.prefetch_size),
+            Retrier(settings.retry_delay, settings.retry_attempts),
+            AreaResolver(client),
+            ProviderRegistry(providers),
+        )
+        # Cached users of revoked tokens are not accepted anymore
+        client.on_token_rejected = cls._instance.users.invalidate
 
     @classmethod
     def get(cls) -> _InternalContext:
@@ -0,0 +1,72 @@
+import time
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+
+
+class JobItemStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class JobItem:
+    type: str
+    id: int
+    status: JobItemStatus = JobItemStatus.PENDING
+    # True if the resource was already pending, and the job waited for it
+    deduplicated: bool = False
+    # Timestamps, in seconds since epoch
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    def start(self):
+        self.status = JobItemStatus.RUNNING
+        self.started_at = time.time()
+
+    def finish(self, status: JobItemStatus):
+        self.status = status
+        self.finished_at = time.time()
+
+    @property
+    def duration(self) -> float | None:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+@dataclass
+class Job:
+    items: list[JobItem]
+    reuse_sources: bool
+    incremental: bool = False
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def status(self) -> JobItemStatus:
+        statuses = {item.status for item in self.items}
+        if statuses <= {JobItemStatus.DONE}:
+            return JobItemStatus.DONE
+        if JobItemStatus.PENDING in statuses or JobItemStatus.RUNNING in statuses:
+            if statuses == {JobItemStatus.PENDING}:
+                return JobItemStatus.PENDING
+            return JobItemStatus.RUNNING
+        return JobItemStatus.FAILED
+
+
+class JobRegistry:
+    # Only the most recent jobs are kept
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self._jobs: dict[str, Job] = {}
+
+    def add(self, job: Job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.capacity:
+            del self._jobs[next(iter(self._jobs))]
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from matcher.logger import ERROR, WARN, log
+
+# Writes replayed at the same time
+JOURNAL_BATCH_SIZE = 20
+# In seconds, doubled on each failed attempt of a write.
+# Writes are retried until the API accepts or rejects them (e.g. while it restarts)
+JOURNAL_MIN_BACKOFF = 1
+JOURNAL_MAX_BACKOFF = 300
+# Body fields identifying the resource of writes to shared routes (e.g. /external-metadata)
+RESOURCE_FIELDS = ["artistId", "albumId", "songId"]
+
+# (method, route, body)
+type Replay = Callable[[str, str, dict[str, Any]], Awaitable[Any]]
+
+
+# Raised by replays when the API rejects the write (e.g. its resource was deleted).
+# The write is dropped, as sending it again would not change the answer
+class RejectedWrite(Exception):
+    pass
+
+
+@dataclass
+class JournalEntry:
+    id: int
+    method: str
+    route: str
+    resource: str
+    body: dict[str, Any]
+    attempts: int
+
+
+class WriteJournal:
+    # Append-only log of the writes to send to the API, stored in a SQLite file.
+    # Writes are replayed in the background, so that matches do not wait on the API,
+    # and the ones that were not sent yet survive restarts.
+    # Writes to the same resource are replayed in order
+    def __init__(self, path: str, batch_size: int = JOURNAL_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.replayed_count = 0
+        self.dropped_count = 0
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS writes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                method TEXT NOT NULL,
+                route TEXT NOT NULL,
+                resource TEXT NOT NULL,
+                body TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                retry_at REAL NOT NULL DEFAULT 0
+            )"""
+        )
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def append(self, method: str, route: str, body: dict[str, Any]):
+        self._db.execute(
+            "INSERT INTO writes (method, route, resource, body) VALUES (?, ?, ?, ?)",
+            (method, route, _resource(route, body), json.dumps(body)),
+        )
+        self._wake.set()
+
+    # Moves the writes of another journal file to this one, then deletes the file.
+    # Returns the number of writes
+    def adopt(self, path: str) -> int:
+        other = sqlite3.connect(path, isolation_level=None)
+        try:
+            rows = other.execute(
+                "SELECT method, route, body FROM writes ORDER BY id"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # The file was created, but nothing was journaled
+            rows = []
+        finally:
+            other.close()
+        self._db.execute("BEGIN")
+        self._db.executemany(
+            "INSERT INTO writes (method, route, resource, body) VALUES (?, ?, ?, ?)",
+            [
+                (method, route, _resource(route, json.loads(body)), body)
+                for (method, route, body) in rows
+            ],
+        )
+        self._db.execute("COMMIT")
+        for suffix in ["", "-wal", "-shm"]:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        if rows:
+            self._wake.set()
+        return len(rows)
+
+    def pending_count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM writes").fetchone()[0]
+
+    def start(self, replay: Replay):
+        pending = self.pending_count()
+        if pending:
+            log(WARN, "Replaying journaled writes", {"count": pending})
+        self._task = asyncio.create_task(self._run(replay))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._db.close()
+
+    async def _run(self, replay: Replay):
+        while True:
+            entries = self._next_batch()
+            if entries:
+                await self._replay(entries, replay)
+                continue
+            self._wake.clear()
+            next_retry = self._db.execute("SELECT MIN(retry_at) FROM writes").fetchone()
+            timeout = next_retry[0] - time.time() if next_retry[0] else None
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._wake.wait()
+            except TimeoutError:
+                pass
+
+    def _next_batch(self) -> list[JournalEntry]:
+        now = time.time()
+        # Resources with a write waiting to be retried are skipped,
+        # to keep the order of their writes
+        rows = self._db.execute(
+            """SELECT id, method, route, resource, body, attempts FROM writes
+            WHERE retry_at <= ? AND resource NOT IN (
+                SELECT resource FROM writes WHERE retry_at > ?
+            )
+            ORDER BY id LIMIT ?""",
+            (now, now, self.batch_size),
+        ).fetchall()
+        return [
+            JournalEntry(id, method, route, resource, json.loads(body), attempts)
+            for (id, method, route, resource, body, attempts) in rows
+        ]
+
+    async def _replay(self, entries: list[JournalEntry], replay: Replay):
+        by_resource: dict[str, list[JournalEntry]] = {}
+        for entry in entries:
+            by_resource.setdefault(entry.resource, []).append(entry)
+
+        async def replay_resource(resource_entries: list[JournalEntry]):
+            for entry in resource_entries:
+                try:
+                    await replay(entry.method, entry.route, entry.body)
+                except RejectedWrite as e:
+                    self._drop(entry, e)
+                    continue
+                except Exception:
+                    self._retry_later(entry)
+                    # The next writes of the resource wait for this one
+                    return
+                self._db.execute("DELETE FROM writes WHERE id = ?", (entry.id,))
+                self.replayed_count += 1
+
+        await asyncio.gather(*[replay_resource(r) for r in by_resource.values()])
+
+    def _drop(self, entry: JournalEntry, error: RejectedWrite):
+        self._db.execute("DELETE FROM writes WHERE id = ?", (entry.id,))
+        self.dropped_count += 1
+        log(
+            ERROR,
+            "Dropping journaled write",
+            {"route": entry.route, "method": entry.method, "error": str(error)},
+        )
+
+    def _retry_later(self, entry: JournalEntry):
+        backoff = min(
+            JOURNAL_MIN_BACKOFF * 2 ** min(entry.attempts, 16), JOURNAL_MAX_BACKOFF
+        )
+        self._db.execute(
+            "UPDATE writes SET attempts = ?, retry_at = ? WHERE id = ?",
+            (entry.attempts + 1, time.time() + backoff, entry.id),
+        )
+
+
+# Key of the resource targeted by a write, e.g. '/external-metadata?songId=1'
+def _resource(route: str, body: dict[str, Any]) -> str:
+    ids = [f"{f}={body[f]}" for f in RESOURCE_FIELDS if body.get(f) is not None]
+    return f"{route}?{'&'.join(ids)}" if ids else route
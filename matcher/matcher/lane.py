@@ -0,0 +1,17 @@
+from contextvars import ContextVar
+from enum import Enum
+
+
+class Lane(Enum):
+    # Events from the queue
+    BACKGROUND = "background"
+    # Rematches requested by an admin, who is waiting for the result
+    INTERACTIVE = "interactive"
+    # Fetching data for upcoming events, only using spare provider requests
+    PREFETCH = "prefetch"
+    # Matches retried after some of their provider requests failed
+    RETRY = "retry"
+
+
+# Set for the duration of a match, inherited by the tasks it spawns
+current_lane: ContextVar[Lane] = ContextVar("current_lane", default=Lane.BACKGROUND)
@@ -32,3 +32,18 @@ def log(level, msg: str, data: dict[str, str | int] = {}):
     )
     str_msg = f"{bold_color}{msg}{reset_color} {str_data}"
     logging.log(level, str_msg)
+
+
+def setup_logging():
+    uvicorn_error = logging.getLogger("uvicorn.error")
+    uvicorn_error.disabled = True
+    uvicorn_access = logging.getLogger("uvicorn.access")
+    uvicorn_access.disabled = True
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)-4s %(message)s",
+        datefmt="%Y/%m/%d %H:%M:%S",
+    )
+
+    logging.getLogger("asyncio").setLevel(logging.ERROR)
+    logging.getLogger("pika").setLevel(logging.ERROR)
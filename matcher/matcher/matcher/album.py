@@ -2,9 +2,10 @@ import asyncio
 from datetime import datetime
 
 from matcher.logger import ERROR, INFO, log
+from matcher.models.api.domain import Album
 from matcher.models.api.dto import ExternalMetadataDto
 from matcher.models.match_result import AlbumMatchResult
-from matcher.providers.boilerplate import BaseProviderBoilerplate
+from matcher.providers.base import BaseFeature
 from matcher.providers.domain import AlbumType
 from matcher.providers.features import (
     GetAlbumDescriptionFeature,
@@ -17,37 +18,45 @@ from matcher.providers.features import (
 
 from ..context import Context
 from ..models.api.dto import ExternalMetadataSourceDto
-from . import common
+from . import common, planner
+from .planner import FeatureBinding, ProviderCall
 
 OVERRIDABLE_ALBUM_TYPES = [AlbumType.STUDIO, AlbumType.LIVE]
 
+ALBUM_FEATURES: list[type[BaseFeature]] = [
+    GetAlbumDescriptionFeature,
+    GetAlbumReleaseDateFeature,
+    GetAlbumLabelsFeature,
+    GetAlbumRatingFeature,
+    GetAlbumTypeFeature,
+    GetAlbumGenresFeature,
+]
+
 
 async def match_and_post_album(
     album_id: int,
     album_name: str,
     local_identifiers: common.LocalIdentifiers,
     reuseSources: bool,
+    incremental: bool = False,
 ):
     try:
         context = Context.get()
-        album = await context.client.get_album(album_id)
-        artist_names = [a.name for a in album.artists or []]
 
-        async def match():
-            if not reuseSources:
-                return await match_album(
-                    album_id,
-                    album_name,
-                    artist_names,
-                    album.type,
-                    local_identifiers,
-                    None,
-                )
-            previous_metadata = await context.client.get_album_external_metadata(
-                album_id
-            )
-            previous_sources = previous_metadata.sources if previous_metadata else []
-            return await match_album(
+        # Also used to skip writes that would not change anything
+        (album, previous_metadata) = await asyncio.gather(
+            context.client.get_album(album_id),
+            context.client.get_album_external_metadata(album_id),
+        )
+        previous_sources = common.get_sources_to_reuse(
+            previous_metadata, reuseSources, incremental
+        )
+        known_features = (
+            get_known_features(album, previous_metadata) if incremental else set()
+        )
+        artist_names = [a.name for a in album.artists or []]
+        with common.skipping_known_features(known_features):
+            res = await match_album(
                 album_id,
                 album_name,
                 artist_names,
@@ -55,8 +64,10 @@ async def match_and_post_album(
                 local_identifiers,
                 previous_sources,
             )
-
-        res = await match()
+            await common.keep_metadata_from_other_providers(
+                res.metadata,
+                lambda: context.client.get_album_external_metadata(album_id),
+            )
         # We only care about the new album type if the previous type is Studio or live (see #1089)
         album_type = (
             res.album_type
@@ -71,36 +82,58 @@ async def match_and_post_album(
         log_data: dict[str, str | int] = {
             "album": album_name,
         }
-        log_data["providers count"] = len(res.metadata.sources)
-        if len(res.metadata.sources):
-            await context.client.post_external_metadata(res.metadata)
+        skipped_writes = 0
+        async with context.client.planned_writes():
+            log_data["providers count"] = len(res.metadata.sources)
+            if len(res.metadata.sources):
+                if common.is_metadata_unchanged(res.metadata, previous_metadata):
+                    skipped_writes += 1
+                else:
+                    await context.client.post_external_metadata(res.metadata)
 
-        if old_release_date and res.release_date:
-            if old_release_date.month != 1 and old_release_date.day != 1:
-                log_data["release date ignored"] = "already provided by api"
-                res.release_date = None
-            elif abs(res.release_date.year - old_release_date.year) > 2:
-                log_data["release date ignored"] = "too far from api's"
-                log_data["found release year"] = res.release_date.year
-                log_data["api release year"] = old_release_date.year
-                res.release_date = None
-        log_data["release date"] = "found" if res.release_date else "none"
-        log_data["genres count"] = len(res.genres)
-        log_data["album type"] = (
-            album_type.value
-            if album_type != album.type and album_type != AlbumType.OTHER
-            else album.type.value
-        )
-        log_data["labels count"] = len(res.labels)
-        if (
-            res.release_date
-            or res.genres
-            or res.labels
-            or (album_type != album.type and album_type != AlbumType.OTHER)
-        ):
-            await context.client.post_album_update(
-                album_id, res.release_date, res.genres, (res.labels or None), album_type
+            if old_release_date and res.release_date:
+                if old_release_date.month != 1 and old_release_date.day != 1:
+                    log_data["release date ignored"] = "already provided by api"
+                    res.release_date = None
+                elif abs(res.release_date.year - old_release_date.year) > 2:
+                    log_data["release date ignored"] = "too far from api's"
+                    log_data["found release year"] = res.release_date.year
+                    log_data["api release year"] = old_release_date.year
+                    res.release_date = None
+            log_data["release date"] = "found" if res.release_date else "none"
+            log_data["genres count"] = len(res.genres)
+            log_data["album type"] = (
+                album_type.value
+                if album_type != album.type and album_type != AlbumType.OTHER
+                else album.type.value
+            )
+            log_data["labels count"] = len(res.labels)
+            has_update = bool(
+                res.release_date
+                or res.genres
+                or res.labels
+                or (album_type != album.type and album_type != AlbumType.OTHER)
             )
+            if res.release_date == old_release_date:
+                res.release_date = None
+            res.genres = common.get_new_genres(res.genres, album.genres)
+            # Labels are not diffed, as the API does not expose an album's labels
+            if (
+                res.release_date
+                or res.genres
+                or res.labels
+                or (album_type != album.type and album_type != AlbumType.OTHER)
+            ):
+                await context.client.post_album_update(
+                    album_id,
+                    res.release_date,
+                    res.genres,
+                    (res.labels or None),
+                    album_type,
+                )
+            elif has_update:
+                skipped_writes += 1
+        log_data["skipped writes"] = skipped_writes
         log(INFO, "Matched data", log_data)
     except Exception as e:
         log(ERROR, str(e))
@@ -165,14 +198,25 @@ async def match_album(
         [],
     )
 
-    async def provider_task(
-        source: ExternalMetadataSourceDto | None,
-        provider: BaseProviderBoilerplate,
-    ):
-        if source is None and sources_to_reuse is not None:
-            return
+    plan = planner.plan_tasks(
+        "album",
+        album_name,
+        external_sources,
+        [
+            f
+            for f in ALBUM_FEATURES
+            if (f is not GetAlbumGenresFeature or need_genres)
+            and (f is not GetAlbumTypeFeature or should_look_for_album_type)
+        ],
+        sources_only=sources_to_reuse is not None,
+    )
+    for known_source in plan.known_sources:
+        res.metadata.push_source(known_source)
+
+    async def provider_task(call: ProviderCall):
+        provider = call.provider
         (source, album) = await common.resolve_data_from_source(
-            source,
+            call.source,
             provider,
             lambda: provider.search_album(album_name, artist_names),
             lambda id: provider.get_album(id),
@@ -183,52 +227,70 @@ async def match_album(
             res.metadata.push_source(source)
         if not album:
             return
-        await asyncio.gather(
-            common.bind_feature_to_result(
-                GetAlbumDescriptionFeature,
-                provider,
-                lambda: res.metadata.description is None,
-                lambda get_description: get_description.run(album),
-                lambda description: res.metadata.set_description_if_none(description),
-            ),
-            common.bind_feature_to_result(
-                GetAlbumReleaseDateFeature,
-                provider,
-                lambda: res.release_date is None,
-                lambda get_release_date: get_release_date.run(album),
-                lambda release_data: res.set_release_date_if_none(release_data),
-            ),
-            common.bind_feature_to_result(
-                GetAlbumLabelsFeature,
-                provider,
-                lambda: len(res.labels) == 0,
-                lambda get_labels: get_labels.run(album),
-                lambda labels: res.push_labels(labels),
-            ),
-            common.bind_feature_to_result(
-                GetAlbumRatingFeature,
-                provider,
-                lambda: res.metadata.rating is None,
-                lambda get_rating: get_rating.run(album),
-                lambda rating: res.metadata.set_rating_if_none(rating),
-            ),
-            common.bind_feature_to_result(
-                GetAlbumTypeFeature,
-                provider,
-                lambda: res.album_type is None and should_look_for_album_type,
-                lambda get_album_type: get_album_type.run(album),
-                lambda album_type: res.set_album_type_if_none(album_type),
-            ),
-            common.bind_feature_to_result(
-                GetAlbumGenresFeature,
-                provider,
-                lambda: need_genres,
-                lambda get_album_genres: get_album_genres.run(album),
-                lambda genres: res.push_genres(genres),
-            ),
+        await planner.run_features(
+            call,
+            [
+                FeatureBinding(
+                    GetAlbumDescriptionFeature,
+                    lambda: res.metadata.description is None,
+                    lambda get_description: get_description.run(album),
+                    lambda description: res.metadata.set_description_if_none(
+                        description
+                    ),
+                ),
+                FeatureBinding(
+                    GetAlbumReleaseDateFeature,
+                    lambda: res.release_date is None,
+                    lambda get_release_date: get_release_date.run(album),
+                    lambda release_data: res.set_release_date_if_none(release_data),
+                ),
+                FeatureBinding(
+                    GetAlbumLabelsFeature,
+                    lambda: len(res.labels) == 0,
+                    lambda get_labels: get_labels.run(album),
+                    lambda labels: res.push_labels(labels),
+                ),
+                FeatureBinding(
+                    GetAlbumRatingFeature,
+                    lambda: res.metadata.rating is None,
+                    lambda get_rating: get_rating.run(album),
+                    lambda rating: res.metadata.set_rating_if_none(rating),
+                ),
+                FeatureBinding(
+                    GetAlbumTypeFeature,
+                    lambda: res.album_type is None and should_look_for_album_type,
+                    lambda get_album_type: get_album_type.run(album),
+                    lambda album_type: res.set_album_type_if_none(album_type),
+                ),
+                FeatureBinding(
+                    GetAlbumGenresFeature,
+                    lambda: need_genres,
+                    lambda get_album_genres: get_album_genres.run(album),
+                    lambda genres: res.push_genres(genres),
+                ),
+            ],
         )
 
-    await common.run_tasks_from_sources(provider_task, external_sources)
+    await planner.run_plan(plan, provider_task)
     if res.album_type == type:
         res.album_type = None
     return res
+
+
+# Used in incremental mode, to only run the features whose data is missing
+def get_known_features(
+    album: Album, previous_metadata: ExternalMetadataDto | None
+) -> set[type[BaseFeature]]:
+    known: set[type[BaseFeature]] = set()
+    if previous_metadata and previous_metadata.description:
+        known.add(GetAlbumDescriptionFeature)
+    if previous_metadata and previous_metadata.rating is not None:
+        known.add(GetAlbumRatingFeature)
+    # Same rule as when posting the release date
+    if album.release_date:
+        release_date = datetime.fromisoformat(album.release_date).date()
+        if release_date.month != 1 and release_date.day != 1:
+            known.add(GetAlbumReleaseDateFeature)
+    if album.genres:
+        known.add(GetAlbumGenresFeature)
+    return known
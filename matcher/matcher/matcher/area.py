@@ -1,25 +1,27 @@
 from matcher.context import Context
 from matcher.logger import ERROR, INFO, log
-from matcher.matcher import common
+from matcher.matcher import planner
 from matcher.models.api.domain import Area
-from matcher.models.api.dto import ExternalMetadataSourceDto, UpdateAreaDto
+from matcher.models.api.dto import UpdateAreaDto
 from matcher.models.match_result import AreaMatchResult
-from matcher.providers.boilerplate import BaseProviderBoilerplate
+from matcher.providers.base import BaseFeature
+from matcher.providers.features import GetAreaType, GetParentArea
+
+from .planner import ProviderCall
+
+AREA_FEATURES: list[type[BaseFeature]] = [GetParentArea, GetAreaType]
 
 
 async def match_and_post_area(area: Area):
     try:
         res = await match_area(area)
         context = Context.get()
+        context.areas.remember(area)
         parent_area: Area | None = None
         log_data: dict[str, str | int] = {"area": area.name, "parent area": "none"}
         if res.parent_area:
-            parent_area = await context.client.get_area_by_mbid(res.parent_area.mbid)
-            if parent_area is None:
-                parent_area = await context.client.post_area(res.parent_area)
-                log_data["parent area"] = "created"
-            else:
-                log_data["parent area"] = "linked"
+            parent_area = await context.areas.resolve(res.parent_area)
+            log_data["parent area"] = "linked" if parent_area else "none"
         update_dto = UpdateAreaDto(
             parentId=parent_area.id if parent_area else None, type=res.type
         )
@@ -32,15 +34,15 @@ async def match_and_post_area(area: Area):
 async def match_area(area: Area) -> AreaMatchResult:
     res = AreaMatchResult(parent_area=None, type=area.type)
 
-    async def provider_task(
-        _: ExternalMetadataSourceDto | None,
-        provider: BaseProviderBoilerplate,
-    ):
+    plan = planner.plan_tasks("area", area.name, [], AREA_FEATURES, link_sources=False)
+
+    async def provider_task(call: ProviderCall):
+        provider = call.provider
         area_model = await provider.get_area(area.mbid)
         if area_model is None:
             return
         res.type = res.type or provider.get_area_type(area_model)
         res.parent_area = res.parent_area or provider.get_parent_area(area_model)
 
-    await common.run_tasks_from_sources(provider_task, [])
+    await planner.run_plan(plan, provider_task)
     return res
@@ -2,10 +2,10 @@ import asyncio
 import logging
 
 from matcher.logger import INFO, log
-from matcher.models.api.domain import Area, LocalIdentifiers
+from matcher.models.api.domain import Area, Artist, LocalIdentifiers
 from matcher.models.api.dto import ExternalMetadataDto, ExternalMetadataSourceDto
 from matcher.models.match_result import ArtistMatchResult
-from matcher.providers.boilerplate import BaseProviderBoilerplate
+from matcher.providers.base import BaseFeature
 from matcher.providers.features import (
     GetArtistActivityArea,
     GetArtistBirthArea,
@@ -14,7 +14,15 @@ from matcher.providers.features import (
 )
 
 from ..context import Context
-from . import common
+from . import common, planner
+from .planner import FeatureBinding, ProviderCall
+
+ARTIST_FEATURES: list[type[BaseFeature]] = [
+    GetArtistActivityArea,
+    GetArtistBirthArea,
+    GetArtistDescriptionFeature,
+    GetArtistIllustrationUrlFeature,
+]
 
 
 async def match_and_post_artist(
@@ -22,52 +30,73 @@ async def match_and_post_artist(
     artist_name: str,
     local_identifiers: LocalIdentifiers,
     reuseSources: bool,
+    incremental: bool = False,
 ):
-    async def match():
-        if not reuseSources:
-            return await match_artist(artist_id, artist_name, local_identifiers, None)
-        previous_metadata = await context.client.get_artist_external_metadata(artist_id)
-        previous_sources = previous_metadata.sources if previous_metadata else []
-        return await match_artist(
-            artist_id,
-            artist_name,
-            local_identifiers,
-            previous_sources,
-        )
-
     try:
         context = Context.get()
-        res = await match()
-        log_data: dict[str, str | int] = {"artist": artist_name}
-
-        log_data["providers count"] = len(res.metadata.sources)
-        if len(res.metadata.sources):
-            log_data["reusing known sources"] = str(reuseSources)
-            await context.client.post_external_metadata(res.metadata)
-
-        log_data["illustration"] = "found" if res.illustration_url else "none"
-        if res.illustration_url:
-            await context.client.post_artist_illustration(
-                artist_id, res.illustration_url
+        # Also used to skip writes that would not change anything
+        (artist, previous_metadata) = await asyncio.gather(
+            context.client.get_artist(artist_id),
+            context.client.get_artist_external_metadata(artist_id),
+        )
+        previous_sources = common.get_sources_to_reuse(
+            previous_metadata, reuseSources, incremental
+        )
+        known_features = (
+            get_known_features(artist, previous_metadata) if incremental else set()
+        )
+        with common.skipping_known_features(known_features):
+            res = await match_artist(
+                artist_id, artist_name, local_identifiers, previous_sources
             )
-
-        log_data["areas"] = "found" if res.activity_area or res.birth_area else "none"
-        if res.activity_area or res.birth_area:
-            activity_area: Area | None = None
-            birth_area: Area | None = None
-            if res.activity_area:
-                activity_area = (
-                    await context.client.get_area_by_mbid(res.activity_area.mbid)
-                ) or (await context.client.post_area(res.activity_area))
-            if res.birth_area:
-                birth_area = (
-                    await context.client.get_area_by_mbid(res.birth_area.mbid)
-                ) or (await context.client.post_area(res.birth_area))
-            await context.client.link_artist_to_area(
-                artist_id,
-                activity_area.id if activity_area else None,
-                birth_area.id if birth_area else None,
+            await common.keep_metadata_from_other_providers(
+                res.metadata,
+                lambda: context.client.get_artist_external_metadata(artist_id),
+            )
+        log_data: dict[str, str | int] = {"artist": artist_name}
+        skipped_writes = 0
+
+        async with context.client.planned_writes():
+            log_data["providers count"] = len(res.metadata.sources)
+            if len(res.metadata.sources):
+                log_data["reusing known sources"] = str(reuseSources)
+                if common.is_metadata_unchanged(res.metadata, previous_metadata):
+                    skipped_writes += 1
+                else:
+                    await context.client.post_external_metadata(res.metadata)
+
+            log_data["illustration"] = "found" if res.illustration_url else "none"
+            if res.illustration_url:
+                # The API keeps the illustration that the artist already has
+                if artist.illustration_id is not None:
+                    skipped_writes += 1
+                else:
+                    await context.client.post_artist_illustration(
+                        artist_id, res.illustration_url
+                    )
+
+            log_data["areas"] = (
+                "found" if res.activity_area or res.birth_area else "none"
             )
+            if res.activity_area or res.birth_area:
+                activity_area: Area | None = None
+                birth_area: Area | None = None
+                if res.activity_area:
+                    activity_area = await context.areas.resolve(res.activity_area)
+                if res.birth_area:
+                    birth_area = await context.areas.resolve(res.birth_area)
+                activity_area_id = activity_area.id if activity_area else None
+                birth_area_id = birth_area.id if birth_area else None
+                # Areas that are not found are not sent
+                if activity_area_id in (None, artist.activity_area_id) and (
+                    birth_area_id in (None, artist.birth_area_id)
+                ):
+                    skipped_writes += 1
+                else:
+                    await context.client.link_artist_to_area(
+                        artist_id, activity_area_id, birth_area_id
+                    )
+        log_data["skipped writes"] = skipped_writes
         log(INFO, "Matched data", log_data)
     except Exception as e:
         logging.error(e)
@@ -124,14 +153,20 @@ async def match_artist(
         None,
     )
 
-    async def provider_task(
-        source: ExternalMetadataSourceDto | None,
-        provider: BaseProviderBoilerplate,
-    ):
-        if source is None and sources_to_reuse is not None:
-            return
+    plan = planner.plan_tasks(
+        "artist",
+        artist_name,
+        external_sources,
+        ARTIST_FEATURES,
+        sources_only=sources_to_reuse is not None,
+    )
+    for known_source in plan.known_sources:
+        res.metadata.push_source(known_source)
+
+    async def provider_task(call: ProviderCall):
+        provider = call.provider
         (source, artist) = await common.resolve_data_from_source(
-            source,
+            call.source,
             provider,
             lambda: provider.search_artist(artist_name),
             lambda id: provider.get_artist(id),
@@ -143,37 +178,54 @@ async def match_artist(
         if not artist:
             return
 
-        await asyncio.gather(
-            common.bind_feature_to_result(
-                GetArtistActivityArea,
-                provider,
-                lambda: res.activity_area is None,
-                lambda get_area: get_area.run(artist),
-                lambda area: res.set_activity_area_if_none(area),
-            ),
-            common.bind_feature_to_result(
-                GetArtistBirthArea,
-                provider,
-                lambda: res.birth_area is None,
-                lambda get_area: get_area.run(artist),
-                lambda area: res.set_birth_area_if_none(area),
-            ),
-            common.bind_feature_to_result(
-                GetArtistDescriptionFeature,
-                provider,
-                lambda: res.metadata.description is None,
-                lambda get_description: get_description.run(artist),
-                lambda description: res.metadata.set_description_if_none(description),
-            ),
-            common.bind_feature_to_result(
-                GetArtistIllustrationUrlFeature,
-                provider,
-                lambda: res.illustration_url is None,
-                lambda get_illustration_url: get_illustration_url.run(artist),
-                lambda url: res.set_illustration_url_if_none(url),
-            ),
+        await planner.run_features(
+            call,
+            [
+                FeatureBinding(
+                    GetArtistActivityArea,
+                    lambda: res.activity_area is None,
+                    lambda get_area: get_area.run(artist),
+                    lambda area: res.set_activity_area_if_none(area),
+                ),
+                FeatureBinding(
+                    GetArtistBirthArea,
+                    lambda: res.birth_area is None,
+                    lambda get_area: get_area.run(artist),
+                    lambda area: res.set_birth_area_if_none(area),
+                ),
+                FeatureBinding(
+                    GetArtistDescriptionFeature,
+                    lambda: res.metadata.description is None,
+                    lambda get_description: get_description.run(artist),
+                    lambda description: res.metadata.set_description_if_none(
+                        description
+                    ),
+                ),
+                FeatureBinding(
+                    GetArtistIllustrationUrlFeature,
+                    lambda: res.illustration_url is None,
+                    lambda get_illustration_url: get_illustration_url.run(artist),
+                    lambda url: res.set_illustration_url_if_none(url),
+                ),
+            ],
         )
 
-    await common.run_tasks_from_sources(provider_task, external_sources)
+    await planner.run_plan(plan, provider_task)
 
     return res
+
+
+# Used in incremental mode, to only run the features whose data is missing
+def get_known_features(
+    artist: Artist, previous_metadata: ExternalMetadataDto | None
+) -> set[type[BaseFeature]]:
+    known: set[type[BaseFeature]] = set()
+    if previous_metadata and previous_metadata.description:
+        known.add(GetArtistDescriptionFeature)
+    if artist.illustration_id is not None:
+        known.add(GetArtistIllustrationUrlFeature)
+    if artist.activity_area_id is not None:
+        known.add(GetArtistActivityArea)
+    if artist.birth_area_id is not None:
+        known.add(GetArtistBirthArea)
+    return known
@@ -1,39 +1,37 @@
-from collections.abc import Awaitable, Callable
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Any, TypeVar
 
 from matcher.logger import DEBUG, log
-from matcher.models.api.domain import LocalIdentifiers
-from matcher.models.api.dto import ExternalMetadataSourceDto
+from matcher.models.api.domain import Genre, LocalIdentifiers, Lyrics
+from matcher.models.api.dto import ExternalMetadataDto, ExternalMetadataSourceDto
+from matcher.models.match_result import SyncedLyrics
 from matcher.providers.base import BaseFeature
 from matcher.providers.boilerplate import BaseProviderBoilerplate
 from matcher.providers.domain import SearchResult
+from matcher.utils import to_slug
 
-from ..context import Context
+from ..context import Context, provider_filter
 from ..providers.discogs import DiscogsProvider
 from ..providers.musicbrainz import MusicBrainzProvider
 from ..providers.wikidata import WikidataProvider
 from ..providers.wikipedia import WikipediaProvider
 
+# Features whose data the resource already has (in incremental mode), which are not run
+known_features: ContextVar[frozenset[type[BaseFeature]]] = ContextVar(
+    "known_features", default=frozenset()
+)
 
-def get_provider_from_external_source(dto: ExternalMetadataSourceDto):
-    return [p for p in Context.get().providers if p.api_model.id == dto.provider_id][0]
-
-
-async def run_tasks_from_sources(
-    f: Callable[
-        [ExternalMetadataSourceDto | None, BaseProviderBoilerplate], Awaitable[None]
-    ],
-    sources: list[ExternalMetadataSourceDto],
-):
-    async def get_task_or_noop(p: BaseProviderBoilerplate):
-        for s in sources:
-            if s.provider_id == p.api_model.id:
-                await f(s, p)
-                return
+# Shared across matches, so that its session (and connections) are reused
+wikidata_provider = WikidataProvider()
 
-        await f(None, p)
 
-    await Context.get().run_provider_task(lambda p: get_task_or_noop(p))
+def get_provider_from_external_source(dto: ExternalMetadataSourceDto):
+    provider = Context.get().registry.get_by_id(dto.provider_id)
+    if provider is None:
+        raise IndexError(f"Unknown provider: {dto.provider_id}")
+    return provider
 
 
 async def resolve_data_from_source(
@@ -73,7 +71,7 @@ async def bind_feature_to_result[F, D](
     set_result: Callable[[D], None],
 ):
     f = provider.get_feature(feature)
-    if f and guard_data_is_missing():
+    if f and feature not in known_features.get() and guard_data_is_missing():
         res = await get(f)
         if res:
             set_result(res)
@@ -85,7 +83,6 @@ async def get_sources_from_wikidata(
     get_wikidata_relation_key: Callable[[BaseProviderBoilerplate], str | None],
     get_resource_url_from_id: Callable[[BaseProviderBoilerplate, str], str | None],
 ) -> list[ExternalMetadataSourceDto]:
-    wikidata_provider = WikidataProvider()
     wikidata_rels = await wikidata_provider.get_resource_relations(wikidata_id)
     if not wikidata_rels:
         return []
@@ -224,3 +221,81 @@ async def get_sources_from_musicbrainz(
     except Exception:
         pass
     return (wikidata_id, external_sources)
+
+
+# In incremental mode, the previous sources are reused if there are any
+def get_sources_to_reuse(
+    previous_metadata: ExternalMetadataDto | None,
+    reuse_sources: bool,
+    incremental: bool,
+) -> list[ExternalMetadataSourceDto] | None:
+    if incremental and previous_metadata and previous_metadata.sources:
+        return previous_metadata.sources
+    if reuse_sources:
+        return previous_metadata.sources if previous_metadata else []
+    return None
+
+
+@contextmanager
+def skipping_known_features(
+    features: set[type[BaseFeature]],
+) -> Iterator[None]:
+    token = known_features.set(frozenset(features))
+    try:
+        yield
+    finally:
+        known_features.reset(token)
+
+
+# When only some providers (e.g. on retry) or features (in incremental mode) were used,
+# posting the metadata would erase what was found previously. So we keep it
+async def keep_metadata_from_other_providers(
+    metadata: ExternalMetadataDto,
+    get_previous_metadata: Callable[[], Awaitable[ExternalMetadataDto | None]],
+):
+    if provider_filter.get() is None and not known_features.get():
+        return
+    previous_metadata = await get_previous_metadata()
+    if not previous_metadata:
+        return
+    found_provider_ids = [source.provider_id for source in metadata.sources]
+    metadata.sources = [
+        source
+        for source in previous_metadata.sources
+        if source.provider_id not in found_provider_ids
+    ] + metadata.sources
+    metadata.description = previous_metadata.description or metadata.description
+    metadata.rating = previous_metadata.rating or metadata.rating
+
+
+# Diffing with what the API already stores, to skip no-op writes
+
+
+def is_metadata_unchanged(
+    metadata: ExternalMetadataDto, previous_metadata: ExternalMetadataDto | None
+) -> bool:
+    if previous_metadata is None:
+        return False
+    return (
+        metadata.description == previous_metadata.description
+        and metadata.rating == previous_metadata.rating
+        and {(s.provider_id, s.url) for s in metadata.sources}
+        == {(s.provider_id, s.url) for s in previous_metadata.sources}
+    )
+
+
+# The API adds the genres to the existing ones
+def get_new_genres(genres: list[str], existing_genres: list[Genre] | None) -> list[str]:
+    existing_slugs = {to_slug(g.name) for g in existing_genres or []}
+    return [g for g in genres if to_slug(g) not in existing_slugs]
+
+
+def are_lyrics_unchanged(
+    plain: str, synced: SyncedLyrics | None, previous_lyrics: Lyrics | None
+) -> bool:
+    if previous_lyrics is None or previous_lyrics.plain != plain:
+        return False
+    previous_synced = [
+        (line.timestamp, line.content) for line in previous_lyrics.synced or []
+    ]
+    return previous_synced == list(synced or [])
@@ -1,10 +1,25 @@
 from matcher.context import Context
 from matcher.logger import ERROR, INFO, log
-from matcher.matcher import common
+from matcher.matcher import planner
 from matcher.models.api.domain import Area, Label
-from matcher.models.api.dto import ExternalMetadataSourceDto, UpdateLabelDto
+from matcher.models.api.dto import UpdateLabelDto
 from matcher.models.match_result import LabelMatchResult
-from matcher.providers.boilerplate import BaseProviderBoilerplate
+from matcher.providers.base import BaseFeature
+from matcher.providers.features import (
+    GetLabelArea,
+    GetLabelEndDate,
+    GetLabelMBID,
+    GetLabelStartDate,
+)
+
+from .planner import ProviderCall
+
+LABEL_FEATURES: list[type[BaseFeature]] = [
+    GetLabelStartDate,
+    GetLabelEndDate,
+    GetLabelArea,
+    GetLabelMBID,
+]
 
 
 async def match_and_post_label(label: Label):
@@ -19,12 +34,8 @@ async def match_and_post_label(label: Label):
             "dates": "found" if res.start_date or res.end_date else "none",
         }
         if res.area:
-            area = await context.client.get_area_by_mbid(res.area.mbid)
-            if area is None:
-                log_data["area"] = "created"
-                area = await context.client.post_area(res.area)
-            else:
-                log_data["area"] = "linked"
+            area = await context.areas.resolve(res.area)
+            log_data["area"] = "linked" if area else "none"
 
         update_dto = UpdateLabelDto(
             start_date=res.start_date.isoformat() if res.start_date else None,
@@ -41,10 +52,12 @@ async def match_and_post_label(label: Label):
 async def match_label(label: Label) -> LabelMatchResult:
     res = LabelMatchResult(start_date=None, end_date=None, area=None, mbid=label.mbid)
 
-    async def provider_task(
-        _: ExternalMetadataSourceDto | None,
-        provider: BaseProviderBoilerplate,
-    ):
+    plan = planner.plan_tasks(
+        "label", label.name, [], LABEL_FEATURES, link_sources=False
+    )
+
+    async def provider_task(call: ProviderCall):
+        provider = call.provider
         label_model = None
         if label.mbid:
             label_model = await provider.get_label_by_mbid(label.mbid)
@@ -58,5 +71,5 @@ async def match_label(label: Label) -> LabelMatchResult:
         res.end_date = provider.get_label_end_date(label_model)
         res.area = provider.get_label_area(label_model)
 
-    await common.run_tasks_from_sources(provider_task, [])
+    await planner.run_plan(plan, provider_task)
     return res
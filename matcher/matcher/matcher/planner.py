@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Coroutine
+from dataclasses import dataclass, field
+from typing import Any
+
+from matcher.logger import DEBUG, log
+from matcher.models.api.dto import ExternalMetadataSourceDto
+from matcher.providers.base import BaseFeature
+from matcher.providers.boilerplate import BaseProviderBoilerplate
+from matcher.providers.registry import ResourceType
+
+from ..context import Context
+from . import common
+
+# Works out, before a match, which providers need to be called and which of their features need to run.
+# This way, no task is created for a provider that cannot serve the resource,
+# or for a feature that the provider does not have, or whose data is not needed
+
+
+@dataclass
+class ProviderCall:
+    provider: BaseProviderBoilerplate
+    # If None, the resource is searched for
+    source: ExternalMetadataSourceDto | None
+    features: list[type[BaseFeature]]
+
+
+@dataclass
+class TaskPlan:
+    resource: ResourceType
+    name: str
+    calls: list[ProviderCall] = field(default_factory=list)
+    # Sources to keep as is, as there is nothing to fetch from them
+    known_sources: list[ExternalMetadataSourceDto] = field(default_factory=list)
+    # Provider name -> reason
+    skipped: dict[str, str] = field(default_factory=dict)
+
+    # One entry per provider
+    def describe(self) -> list[dict[str, str | int]]:
+        return (
+            [
+                {
+                    "provider": c.provider.api_model.name,
+                    "action": "get" if c.source else "search",
+                    "features": len(c.features),
+                }
+                for c in self.calls
+            ]
+            + [
+                {"provider id": s.provider_id, "action": "keep source"}
+                for s in self.known_sources
+            ]
+            + [
+                {"provider": p, "action": "skip", "reason": r}
+                for (p, r) in self.skipped.items()
+            ]
+        )
+
+
+@dataclass
+class FeatureBinding[F: BaseFeature, D]:
+    feature: type[F]
+    guard_data_is_missing: Callable[[], bool]
+    get: Callable[[F], Awaitable[D | None]]
+    set_result: Callable[[D], None]
+
+
+# features: the features whose data is needed (e.g. without genres if they are not pushed)
+# sources_only: if true, providers without a known source are not searched
+# link_sources: if false, providers are only called if they have a needed feature
+def plan_tasks(
+    resource: ResourceType,
+    name: str,
+    sources: list[ExternalMetadataSourceDto],
+    features: list[type[BaseFeature]],
+    sources_only: bool = False,
+    link_sources: bool = True,
+) -> TaskPlan:
+    context = Context.get()
+    plan = TaskPlan(resource, name)
+    capable_providers = context.registry.get_for_resource(resource)
+    sources_by_provider = {s.provider_id: s for s in sources}
+    known = common.known_features.get()
+    for provider in context.get_providers():
+        source = sources_by_provider.get(provider.api_model.id)
+        provider_name = provider.api_model.name
+        if source is None and sources_only:
+            plan.skipped[provider_name] = "no known source"
+            continue
+        if provider not in capable_providers:
+            if source is not None:
+                plan.known_sources.append(source)
+            else:
+                plan.skipped[provider_name] = f"cannot serve {resource}"
+            continue
+        needed_features = [
+            f for f in features if f not in known and provider.has_feature(f)
+        ]
+        if not needed_features and (source is not None or not link_sources):
+            if source is not None:
+                plan.known_sources.append(source)
+            else:
+                plan.skipped[provider_name] = "nothing to fetch"
+            continue
+        plan.calls.append(ProviderCall(provider, source, needed_features))
+    if logging.getLogger().isEnabledFor(DEBUG):
+        for entry in plan.describe():
+            log(DEBUG, "Planned provider call", {resource: name, **entry})
+    return plan
+
+
+async def run_plan(
+    plan: TaskPlan, f: Callable[[ProviderCall], Coroutine[Any, Any, None]]
+):
+    await _run_all([f(call) for call in plan.calls])
+
+
+# Runs the bindings of the call's features, if their data is still missing
+async def run_features(call: ProviderCall, bindings: list[FeatureBinding]):
+    await _run_all(
+        [
+            common.bind_feature_to_result(
+                b.feature,
+                call.provider,
+                b.guard_data_is_missing,
+                b.get,
+                b.set_result,
+            )
+            for b in bindings
+            if b.feature in call.features and b.guard_data_is_missing()
+        ]
+    )
+
+
+# Most features only read the data that was fetched already. Tasks are started eagerly,
+# so that the ones that do not send requests complete without going through the event loop
+async def _run_all(coroutines: list[Coroutine[Any, Any, None]]):
+    if len(coroutines) == 1:
+        await coroutines[0]
+    elif coroutines:
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[asyncio.eager_task_factory(loop, c) for c in coroutines])
@@ -1,8 +1,10 @@
 import asyncio
 
 from matcher.logger import ERROR, INFO, log
+from matcher.models.api.domain import Song
 from matcher.models.api.dto import ExternalMetadataDto
 from matcher.models.match_result import LyricsMatchResult, SongMatchResult
+from matcher.providers.base import BaseFeature
 from matcher.providers.boilerplate import BaseProviderBoilerplate
 from matcher.providers.features import (
     GetPlainSongLyricsFeature,
@@ -13,7 +15,15 @@ from matcher.providers.features import (
 
 from ..context import Context
 from ..models.api.dto import ExternalMetadataSourceDto
-from . import common
+from . import common, planner
+from .planner import FeatureBinding, ProviderCall
+
+SONG_FEATURES: list[type[BaseFeature]] = [
+    GetSongDescriptionFeature,
+    GetSongGenresFeature,
+    GetSyncedSongLyricsFeature,
+    GetPlainSongLyricsFeature,
+]
 
 
 async def match_and_post_song(
@@ -21,28 +31,35 @@ async def match_and_post_song(
     song_name: str,
     local_identifiers: common.LocalIdentifiers,
     reuseSources: bool,
+    incremental: bool = False,
 ):
     try:
         context = Context.get()
-        song = await context.client.get_song(song_id)
-
-        async def match():
-            if not reuseSources:
-                return await match_song(
-                    song_id,
-                    song.name,
-                    song.artist.name,
-                    [f.name for f in song.featuring],
-                    song.master.duration if song.master else None,
-                    source_file.fingerprint if source_file else None,
-                    local_identifiers,
-                    None,
-                )
 
-            previous_metadata = await context.client.get_song_external_metadata(song_id)
-            previous_sources = previous_metadata.sources if previous_metadata else []
+        async def get_song_and_source_file():
+            song = await context.client.get_song(song_id)
+            source_file = (
+                await context.client.get_file(song.master.source_file_id)
+                if song.master
+                else None
+            )
+            return (song, source_file)
 
-            return await match_song(
+        # Also used to skip writes that would not change anything
+        ((song, source_file), previous_metadata) = await asyncio.gather(
+            get_song_and_source_file(),
+            context.client.get_song_external_metadata(song_id),
+        )
+        previous_sources = common.get_sources_to_reuse(
+            previous_metadata, reuseSources, incremental
+        )
+        known_features = (
+            get_known_features(song, previous_metadata) if incremental else set()
+        )
+        log_data: dict[str, str | int] = {"song": song_name}
+        skipped_writes = 0
+        with common.skipping_known_features(known_features):
+            res = await match_song(
                 song_id,
                 song.name,
                 song.artist.name,
@@ -52,29 +69,42 @@ async def match_and_post_song(
                 local_identifiers,
                 previous_sources,
             )
+            # Plain lyrics were not looked for. The stored ones are kept,
+            # instead of the ones rebuilt from the synced lyrics that may have been found
+            if GetPlainSongLyricsFeature in known_features and song.lyrics:
+                res.lyrics.plain = song.lyrics.plain
+            await common.keep_metadata_from_other_providers(
+                res.metadata,
+                lambda: context.client.get_song_external_metadata(song_id),
+            )
+        async with context.client.planned_writes():
+            log_data["providers count"] = len(res.metadata.sources)
+            if len(res.metadata.sources):
+                if common.is_metadata_unchanged(res.metadata, previous_metadata):
+                    skipped_writes += 1
+                else:
+                    await context.client.post_external_metadata(res.metadata)
+            if res.lyrics.plain or res.lyrics.synced:
+                log_data["lyrics"] = "synced" if res.lyrics.synced else "plain"
+                if res.lyrics.plain:  # NOTE: should always be true
+                    if common.are_lyrics_unchanged(
+                        res.lyrics.plain, res.lyrics.synced, song.lyrics
+                    ):
+                        skipped_writes += 1
+                    else:
+                        await context.client.post_song_lyrics(
+                            song_id, res.lyrics.plain, res.lyrics.synced
+                        )
+            else:
+                log_data["lyrics"] = "none"
 
-        source_file = (
-            await context.client.get_file(song.master.source_file_id)
-            if song.master
-            else None
-        )
-        log_data: dict[str, str | int] = {"song": song_name}
-        res = await match()
-        log_data["providers count"] = len(res.metadata.sources)
-        if len(res.metadata.sources):
-            await context.client.post_external_metadata(res.metadata)
-        if res.lyrics.plain or res.lyrics.synced:
-            log_data["lyrics"] = "synced" if res.lyrics.synced else "plain"
-            if res.lyrics.plain:  # NOTE: should always be true
-                await context.client.post_song_lyrics(
-                    song_id, res.lyrics.plain, res.lyrics.synced
-                )
-        else:
-            log_data["lyrics"] = "none"
-
-        log_data["genres count"] = len(res.genres)
-        if res.genres:
-            await context.client.post_song_genres(song_id, res.genres)
+            log_data["genres count"] = len(res.genres)
+            new_genres = common.get_new_genres(res.genres, song.genres)
+            if new_genres:
+                await context.client.post_song_genres(song_id, new_genres)
+            elif res.genres:
+                skipped_writes += 1
+        log_data["skipped writes"] = skipped_writes
         log(INFO, "Matched data", log_data)
     except Exception as e:
         log(ERROR, str(e))
@@ -154,14 +184,20 @@ async def match_song(
         [],
     )
 
-    async def provider_task(
-        source: ExternalMetadataSourceDto | None,
-        provider: BaseProviderBoilerplate,
-    ):
-        if source is None and sources_to_reuse is not None:
-            return
+    plan = planner.plan_tasks(
+        "song",
+        song_name,
+        external_sources,
+        [f for f in SONG_FEATURES if f is not GetSongGenresFeature or need_genres],
+        sources_only=sources_to_reuse is not None,
+    )
+    for known_source in plan.known_sources:
+        res.metadata.push_source(known_source)
+
+    async def provider_task(call: ProviderCall):
+        provider = call.provider
         (source, song) = await common.resolve_data_from_source(
-            source,
+            call.source,
             provider,
             lambda: provider.search_song(song_name, artist_name, featuring, duration),
             lambda id: provider.get_song(id),
@@ -172,39 +208,56 @@ async def match_song(
             res.metadata.push_source(source)
         if not song:
             return
-        await asyncio.gather(
-            common.bind_feature_to_result(
-                GetSongDescriptionFeature,
-                provider,
-                lambda: res.metadata.description is None,
-                lambda get_description: get_description.run(song),
-                lambda description: res.metadata.set_description_if_none(description),
-            ),
-            common.bind_feature_to_result(
-                GetSongGenresFeature,
-                provider,
-                lambda: need_genres,
-                lambda get_song_genres: get_song_genres.run(song),
-                lambda genres: res.push_genres(genres),
-            ),
-            common.bind_feature_to_result(
-                GetSyncedSongLyricsFeature,
-                provider,
-                lambda: res.lyrics.synced is None,
-                lambda get_synced_lyrics: get_synced_lyrics.run(song),
-                lambda lyrics: res.set_synced_lyrics(lyrics),
-            ),
-            common.bind_feature_to_result(
-                GetPlainSongLyricsFeature,
-                provider,
-                lambda: res.lyrics.plain is None,
-                lambda get_plain_lyrics: get_plain_lyrics.run(song),
-                lambda lyrics: res.set_plain_lyrics_if_none(lyrics),
-            ),
+        await planner.run_features(
+            call,
+            [
+                FeatureBinding(
+                    GetSongDescriptionFeature,
+                    lambda: res.metadata.description is None,
+                    lambda get_description: get_description.run(song),
+                    lambda description: res.metadata.set_description_if_none(
+                        description
+                    ),
+                ),
+                FeatureBinding(
+                    GetSongGenresFeature,
+                    lambda: need_genres,
+                    lambda get_song_genres: get_song_genres.run(song),
+                    lambda genres: res.push_genres(genres),
+                ),
+                FeatureBinding(
+                    GetSyncedSongLyricsFeature,
+                    lambda: res.lyrics.synced is None,
+                    lambda get_synced_lyrics: get_synced_lyrics.run(song),
+                    lambda lyrics: res.set_synced_lyrics(lyrics),
+                ),
+                FeatureBinding(
+                    GetPlainSongLyricsFeature,
+                    lambda: res.lyrics.plain is None,
+                    lambda get_plain_lyrics: get_plain_lyrics.run(song),
+                    lambda lyrics: res.set_plain_lyrics_if_none(lyrics),
+                ),
+            ],
         )
 
-    await common.run_tasks_from_sources(provider_task, external_sources)
+    await planner.run_plan(plan, provider_task)
 
     if not res.lyrics.plain and res.lyrics.synced:
         res.lyrics.plain = "\n".join([line for (_, line) in res.lyrics.synced])
     return res
+
+
+# Used in incremental mode, to only run the features whose data is missing
+def get_known_features(
+    song: Song, previous_metadata: ExternalMetadataDto | None
+) -> set[type[BaseFeature]]:
+    known: set[type[BaseFeature]] = set()
+    if previous_metadata and previous_metadata.description:
+        known.add(GetSongDescriptionFeature)
+    if song.lyrics:
+        known.add(GetPlainSongLyricsFeature)
+        if song.lyrics.synced:
+            known.add(GetSyncedSongLyricsFeature)
+    if song.genres:
+        known.add(GetSongGenresFeature)
+    return known
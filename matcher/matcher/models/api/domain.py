@@ -18,12 +18,36 @@ class LocalIdentifiers(DataClassJsonMixin):
     acoustid_id: str | None = None
 
 
+@dataclass_json(letter_case=LetterCase.CAMEL, undefined=Undefined.EXCLUDE)  # type: ignore
+@dataclass
+class Genre(DataClassJsonMixin):
+    id: int
+    name: str
+
+
+@dataclass_json(letter_case=LetterCase.CAMEL, undefined=Undefined.EXCLUDE)  # type: ignore
+@dataclass
+class SyncedLyric(DataClassJsonMixin):
+    timestamp: float
+    content: str
+
+
+@dataclass_json(letter_case=LetterCase.CAMEL, undefined=Undefined.EXCLUDE)  # type: ignore
+@dataclass
+class Lyrics(DataClassJsonMixin):
+    plain: str
+    synced: list[SyncedLyric] | None = None
+
+
 @dataclass_json(letter_case=LetterCase.CAMEL, undefined=Undefined.EXCLUDE)  # type: ignore
 @dataclass
 class Artist(DataClassJsonMixin):
     id: int
     name: str
     local_identifiers: LocalIdentifiers | None = None
+    illustration_id: int | None = None
+    activity_area_id: int | None = None
+    birth_area_id: int | None = None
 
 
 @dataclass_json(letter_case=LetterCase.CAMEL, undefined=Undefined.EXCLUDE)  # type: ignore
@@ -35,6 +59,7 @@ class Album(DataClassJsonMixin):
     type: AlbumType = AlbumType.OTHER
     release_date: str | None = None
     local_identifiers: LocalIdentifiers | None = None
+    genres: list[Genre] | None = None
 
 
 @dataclass_json(letter_case=LetterCase.CAMEL, undefined=Undefined.EXCLUDE)  # type: ignore
@@ -70,6 +95,8 @@ class Song(DataClassJsonMixin):
     featuring: list[Artist]
     master: Track | None = None
     local_identifiers: LocalIdentifiers | None = None
+    genres: list[Genre] | None = None
+    lyrics: Lyrics | None = None
 
 
 @dataclass_json(letter_case=LetterCase.CAMEL, undefined=Undefined.EXCLUDE)  # type: ignore
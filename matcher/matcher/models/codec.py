@@ -0,0 +1,141 @@
+import dataclasses
+import types
+from collections.abc import Callable
+from enum import Enum
+from typing import Any, Union, get_args, get_origin, get_type_hints
+
+# Decoders and encoders generated once per dataclass, much cheaper than
+# going through dataclasses_json/marshmallow (or jsons) on each call.
+# Same output as `Model.schema().load(obj)` and `model.to_dict()`:
+# - keys follow the model's letter case
+# - unknown keys are ignored (i.e. Undefined.EXCLUDE)
+# - missing keys fall back to the field's default, and raise if there is none
+# - enums are decoded from their value, and left as is when encoding
+# Unlike marshmallow, primitive values are not type-checked.
+
+_MISSING = object()
+
+_decoders: dict[type, Callable[[Any], Any]] = {}
+_encoders: dict[type, Callable[[Any], dict[str, Any]]] = {}
+
+
+def load[T](cls: type[T], obj: Any) -> T:
+    decoder = _decoders.get(cls) or _compile_decoder(cls)
+    return decoder(obj)
+
+
+def dump(obj: Any) -> dict[str, Any]:
+    cls = type(obj)
+    encoder = _encoders.get(cls) or _compile_encoder(cls)
+    return encoder(obj)
+
+
+def _key(cls: type, field: dataclasses.Field) -> str:
+    config = getattr(cls, "dataclass_json_config", None) or {}
+    letter_case = config.get("letter_case")
+    return letter_case(field.name) if letter_case else field.name
+
+
+# Returns (is nullable, type without None)
+def _unwrap_optional(t: Any) -> tuple[bool, Any]:
+    if get_origin(t) in (Union, types.UnionType):
+        args = [a for a in get_args(t) if a is not type(None)]
+        if len(args) < len(get_args(t)):
+            return (True, args[0] if len(args) == 1 else t)
+    return (False, t)
+
+
+# Returns an expression converting `var`, or None if the value can be used as is
+def _decode_expression(t: Any, var: str, env: dict[str, Any]) -> str | None:
+    # Nested models are classes, not instances
+    if isinstance(t, type) and dataclasses.is_dataclass(t):
+        name = f"_decode_{t.__name__}"
+        env[name] = lambda obj, model=t: load(model, obj)
+        return f"{name}({var})"
+    if isinstance(t, type) and issubclass(t, Enum):
+        env[t.__name__] = t
+        return f"{t.__name__}({var})"
+    if get_origin(t) is list and get_args(t):
+        item = _decode_expression(get_args(t)[0], "x", env)
+        return f"[{item} for x in {var}]" if item else None
+    return None
+
+
+def _compile_decoder(cls: type) -> Callable[[Any], Any]:
+    hints = get_type_hints(cls)
+    env: dict[str, Any] = {"_cls": cls, "_MISSING": _MISSING}
+    lines = ["def decode(obj):"]
+    arguments = []
+    for i, field in enumerate(dataclasses.fields(cls)):
+        if not field.init:
+            continue
+        key = _key(cls, field)
+        var = f"v{i}"
+        (nullable, t) = _unwrap_optional(hints[field.name])
+        has_default = (
+            field.default is not dataclasses.MISSING
+            or field.default_factory is not dataclasses.MISSING
+        )
+        if has_default:
+            lines.append(f"    {var} = obj.get({key!r}, _MISSING)")
+        else:
+            lines.append(f"    {var} = obj[{key!r}]")
+        conversion = _decode_expression(t, var, env)
+        if not nullable:
+            lines.append(f"    if {var} is None:")
+            lines.append(f"        raise ValueError('Field may not be null: {key}')")
+        if conversion:
+            guard = f"{var} is not None" if nullable else "True"
+            if has_default:
+                guard += f" and {var} is not _MISSING"
+            lines.append(f"    if {guard}:")
+            lines.append(f"        {var} = {conversion}")
+        if has_default:
+            lines.append(f"    if {var} is _MISSING:")
+            if field.default is not dataclasses.MISSING:
+                env[f"_default{i}"] = field.default
+                lines.append(f"        {var} = _default{i}")
+            else:
+                env[f"_default{i}"] = field.default_factory
+                lines.append(f"        {var} = _default{i}()")
+        arguments.append(f"{field.name}={var}")
+    if hasattr(cls, "__post_init__") or "__slots__" in cls.__dict__:
+        lines.append(f"    return _cls({', '.join(arguments)})")
+    else:
+        # dataclasses_json wraps __init__ to handle undefined parameters, which is slow.
+        # We already filtered them out, so we can skip it
+        env["_new"] = object.__new__
+        lines.append("    decoded = _new(_cls)")
+        lines.append(f"    decoded.__dict__.update({', '.join(arguments)})")
+        lines.append("    return decoded")
+    exec("\n".join(lines), env)  # noqa: S102 (generated from the model's fields only)
+    _decoders[cls] = env["decode"]
+    return env["decode"]
+
+
+def _encode_expression(t: Any, var: str, env: dict[str, Any]) -> str | None:
+    if isinstance(t, type) and dataclasses.is_dataclass(t):
+        name = f"_encode_{t.__name__}"
+        env[name] = dump
+        return f"{name}({var})"
+    if get_origin(t) is list and get_args(t):
+        item = _encode_expression(get_args(t)[0], "x", env)
+        return f"[{item} for x in {var}]" if item else f"list({var})"
+    return None
+
+
+def _compile_encoder(cls: type) -> Callable[[Any], dict[str, Any]]:
+    hints = get_type_hints(cls)
+    env: dict[str, Any] = {}
+    entries = []
+    for field in dataclasses.fields(cls):
+        var = f"obj.{field.name}"
+        (nullable, t) = _unwrap_optional(hints[field.name])
+        value = _encode_expression(t, var, env) or var
+        if value != var and nullable:
+            value = f"({value} if {var} is not None else None)"
+        entries.append(f"{_key(cls, field)!r}: {value}")
+    source = f"def encode(obj):\n    return {{{', '.join(entries)}}}"
+    exec(source, env)  # noqa: S102
+    _encoders[cls] = env["encode"]
+    return env["encode"]
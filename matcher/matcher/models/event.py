@@ -1,7 +1,7 @@
 import json
 from dataclasses import dataclass
 
-import jsons
+from matcher.models import codec
 
 
 @dataclass
@@ -12,4 +12,4 @@ class Event:
 
     @staticmethod
     def from_json(raw_json: bytes):
-        return jsons.load(json.loads(raw_json)["data"], Event)
+        return codec.load(Event, json.loads(raw_json)["data"])
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 from collections.abc import Callable, Coroutine
@@ -7,11 +8,15 @@ import aiormq
 from aiormq.abc import AbstractChannel
 
 from matcher.context import Context
-from matcher.logger import ERROR, INFO, log
+from matcher.logger import ERROR, INFO, WARN, log
 
 channel: AbstractChannel | None = None
+consumer_tag: str | None = None
+queue_size_sampler: asyncio.Task | None = None
 
 queue_name = "meelo"
+# In seconds
+queue_size_sampling_interval = 5
 
 
 async def connect_mq(
@@ -34,19 +39,52 @@ async def connect_mq(
     if declare_ok.queue is None:
         log(ERROR, "Couldn't declare queue")
         sys.exit(1)
-    log(INFO, "Ready to match!", {"version": Context.get().settings.version})
-    await channel.basic_qos(prefetch_count=1)
-    await channel.basic_consume(
-        declare_ok.queue,
-        lambda msg: on_message_callback(msg, channel),  # pyright: ignore
+    settings = Context.get().settings
+    log(
+        INFO,
+        "Ready to match!",
+        {"version": settings.version, "workers": settings.workers},
     )
+    # Messages being matched + messages buffered by the scheduler
+    await channel.basic_qos(prefetch_count=settings.workers + settings.buffer_size)
+    global queue_size_sampler
+    queue_size_sampler = asyncio.create_task(sample_queue_size())
+
+    async def on_message(msg: Any):
+        # Keeps the count up-to-date between two samples
+        ctx = Context.get()
+        ctx.pending_items_count = max(ctx.pending_items_count - 1, 0)
+        await on_message_callback(msg, channel)  # pyright: ignore
+
+    global consumer_tag
+    consume_ok = await channel.basic_consume(declare_ok.queue, on_message)
+    consumer_tag = consume_ok.consumer_tag
+
+
+async def stop_consuming():
+    if channel is not None and consumer_tag is not None:
+        await channel.basic_cancel(consumer_tag)
 
 
 async def stop_mq():
+    if queue_size_sampler is not None:
+        queue_size_sampler.cancel()
     if channel is not None:
         await channel.close()
 
 
+# Refreshes the number of pending items on its own schedule,
+# so that matching an item does not require a round-trip to the broker
+async def sample_queue_size():
+    ctx = Context.get()
+    while True:
+        try:
+            ctx.pending_items_count = await get_queue_size()
+        except Exception as e:
+            log(WARN, "Could not get queue size", {"error": str(e)})
+        await asyncio.sleep(queue_size_sampling_interval)
+
+
 async def get_queue_size() -> int:
     if not channel:
         return 0
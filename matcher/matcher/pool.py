@@ -0,0 +1,89 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from matcher.lane import Lane, current_lane
+
+# (resource type, resource id), e.g. ("album", 12)
+type ResourceKey = tuple[str, int]
+
+
+class MatchPool:
+    # Bounds the number of matches running at the same time,
+    # and makes sure that two matches of the same resource never overlap.
+    # Provider-specific throttling (e.g. MusicBrainz's rate limiter) is not handled here.
+    def __init__(self, size: int, interactive_size: int):
+        self.size = max(size, 1)
+        self._slots = asyncio.Semaphore(self.size)
+        # Reserved for the interactive lane
+        self._interactive_slots = asyncio.Semaphore(max(interactive_size, 1))
+        self._locks: dict[ResourceKey, asyncio.Lock] = {}
+        self._lock_users: dict[ResourceKey, int] = {}
+
+    @asynccontextmanager
+    async def slot(
+        self, key: ResourceKey, lane: Lane = Lane.BACKGROUND
+    ) -> AsyncIterator[None]:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        slots = self._interactive_slots if lane == Lane.INTERACTIVE else self._slots
+        try:
+            # Taking the resource lock first, so that a duplicate
+            # does not hold a worker slot while waiting
+            async with lock:
+                async with slots:
+                    token = current_lane.set(lane)
+                    try:
+                        yield
+                    finally:
+                        current_lane.reset(token)
+        finally:
+            self._lock_users[key] -= 1
+            if self._lock_users[key] == 0:
+                del self._lock_users[key]
+                del self._locks[key]
+
+
+class Coalescer:
+    # Filters out events for resources that are already waiting to be matched,
+    # being matched, or that were matched less than `window` seconds ago
+    def __init__(self, window: float):
+        self.window = window
+        self.coalesced_count = 0
+        # Set when the resource is released
+        self._pending: dict[ResourceKey, asyncio.Event] = {}
+        # Ordered by completion time, oldest first
+        self._finished: dict[ResourceKey, float] = {}
+
+    def admit(self, key: ResourceKey) -> bool:
+        now = time.monotonic()
+        self._forget_older_than(now - self.window)
+        if key in self._pending or key in self._finished:
+            self.coalesced_count += 1
+            return False
+        self.hold(key)
+        return True
+
+    # Marks the resource as pending, regardless of when it was last matched
+    def hold(self, key: ResourceKey):
+        self._pending.setdefault(key, asyncio.Event())
+
+    # Returns an event set once the pending resource is released
+    def pending(self, key: ResourceKey) -> asyncio.Event | None:
+        return self._pending.get(key)
+
+    def release(self, key: ResourceKey):
+        released = self._pending.pop(key, None)
+        if released:
+            released.set()
+        self._finished.pop(key, None)
+        if self.window > 0:
+            self._finished[key] = time.monotonic()
+
+    def _forget_older_than(self, limit: float):
+        while self._finished:
+            key, finished_at = next(iter(self._finished.items()))
+            if finished_at > limit:
+                break
+            del self._finished[key]
@@ -0,0 +1,44 @@
+from matcher.context import Context
+from matcher.lane import Lane, current_lane
+from matcher.models.api.domain import LocalIdentifiers
+from matcher.providers.musicbrainz import MusicBrainzProvider
+
+
+# Fetches the API entity of an upcoming event, and the first MusicBrainz request its match will send.
+# The API client keeps the entity for the match, MusicBrainz's HTTP cache keeps the rest.
+# MusicBrainz requests are only sent if its rate limiter has spare requests
+async def prefetch(resource_type: str, resource_id: int):
+    current_lane.set(Lane.PREFETCH)
+    ctx = Context.get()
+    mb = ctx.get_provider(MusicBrainzProvider)
+    match resource_type:
+        case "artist":
+            artist = await ctx.client.get_artist(resource_id)
+            mbid = (artist.local_identifiers or LocalIdentifiers()).musicbrainz_id
+            if mb is None:
+                return
+            if mbid:
+                await mb.get_artist(mbid)
+            else:
+                await mb.search_artist(artist.name)
+        case "album":
+            album = await ctx.client.get_album(resource_id)
+            mbid = (album.local_identifiers or LocalIdentifiers()).musicbrainz_id
+            if mb is None:
+                return
+            if mbid:
+                await mb.get_album(mbid)
+            else:
+                await mb.search_album(album.name, [a.name for a in album.artists or []])
+        case "song":
+            song = await ctx.client.get_song(resource_id)
+            if song.master:
+                await ctx.client.get_file(song.master.source_file_id)
+            # Without a MBID, songs are first looked up using their fingerprint
+            mbid = (song.local_identifiers or LocalIdentifiers()).musicbrainz_id
+            if mb is not None and mbid:
+                await mb.get_song(mbid)
+        case "area":
+            ctx.areas.remember(await ctx.client.get_area(str(resource_id), True))
+        case "label":
+            await ctx.client.get_label(str(resource_id))
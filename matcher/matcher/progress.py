@@ -0,0 +1,37 @@
+import asyncio
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class ProgressEvent:
+    name: str
+    data: Any
+
+
+class ProgressBroadcaster:
+    # Fans out progress events to the clients of the SSE stream.
+    # A slow client loses its oldest events instead of slowing down matches
+    def __init__(self, backlog: int = 100):
+        self.backlog = backlog
+        self._subscribers: set[asyncio.Queue[ProgressEvent]] = set()
+
+    def has_subscribers(self) -> bool:
+        return len(self._subscribers) > 0
+
+    def publish(self, name: str, data: Any):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(ProgressEvent(name, data))
+
+    @contextmanager
+    def subscribe(self) -> Iterator[asyncio.Queue[ProgressEvent]]:
+        queue: asyncio.Queue[ProgressEvent] = asyncio.Queue(self.backlog)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
@@ -11,6 +11,7 @@ from bs4 import BeautifulSoup, Tag
 from matcher.context import Context
 from matcher.providers.boilerplate import BaseProviderBoilerplate
 from matcher.providers.session import HasSession
+from matcher.transport import transport
 from matcher.utils import asyncify, normalise_url_for_parse, removeprefix_or_none
 
 from ..settings import AllMusicSettings
@@ -30,6 +31,8 @@ from .features import (
 
 @dataclass
 class AllMusicProvider(BaseProviderBoilerplate[AllMusicSettings], HasSession):
+    rate_limiter_name = "allmusic"
+
     def __post_init__(self):
         self.features = [
             GetMusicBrainzRelationKeyFeature(lambda: "allmusic"),
@@ -58,7 +61,8 @@ class AllMusicProvider(BaseProviderBoilerplate[AllMusicSettings], HasSession):
 
     def mk_session(self) -> ClientSession:
         return ClientSession(
-            headers={"User-Agent": f"Meelo Matcher/{Context.get().settings.version}"}
+            headers={"User-Agent": f"Meelo Matcher/{Context.get().settings.version}"},
+            **transport.session_options(),
         )
 
     def _get_resource_path_from_url(self, resource_url: str) -> str | None:
@@ -79,12 +83,11 @@ class AllMusicProvider(BaseProviderBoilerplate[AllMusicSettings], HasSession):
 
     async def _get_album(self, album_id: str) -> Any | None:
         try:
-            async with self.get_session().get(
-                str(self.get_album_url_from_id(album_id)),
-            ) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, "html.parser")
-                return soup
+            html = await self.get_cached(
+                "resource", str(self.get_album_url_from_id(album_id)), as_json=False
+            )
+            soup = BeautifulSoup(html, "html.parser")
+            return soup
         except Exception:
             pass
 
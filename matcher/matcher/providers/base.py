@@ -23,12 +23,30 @@ class BaseProvider[Settings]:
     api_model: ApiProviderEntry
     settings: Settings
     features: list[BaseFeature] = field(init=False)
+    # Built from `features` on first use, see `index_features`
+    _features_by_type: dict[type, BaseFeature] = field(
+        init=False, repr=False, default_factory=dict
+    )
+    _indexed_features: list[BaseFeature] | None = field(
+        init=False, repr=False, default=None
+    )
 
     def has_feature(self, t: type[T]) -> bool:
-        return any(f for f in self.features if isinstance(f, t))
+        return self.get_feature(t) is not None
 
     def get_feature(self, t: type[T]) -> T | None:
-        try:
-            return [f for f in self.features if isinstance(f, t)][0]
-        except Exception:
-            pass
+        if self._indexed_features is not self.features:
+            self.index_features()
+        return self._features_by_type.get(t)  # pyright: ignore
+
+    # Maps each feature class (and its parent classes) to the first matching feature,
+    # which is what an isinstance scan of `features` would return
+    def index_features(self):
+        index: dict[type, BaseFeature] = {}
+        for feature in self.features:
+            for cls in type(feature).__mro__:
+                if cls is BaseFeature:
+                    break
+                index.setdefault(cls, feature)
+        self._features_by_type = index
+        self._indexed_features = self.features
@@ -1,10 +1,10 @@
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, ClassVar
 from urllib.parse import urlparse
 
-import discogs_client
 from aiohttp import ClientSession
 
+from matcher.cache import DAY
 from matcher.context import Context
 from matcher.providers.domain import SearchResult
 from matcher.providers.features import (
@@ -22,6 +22,7 @@ from matcher.providers.features import (
     SearchArtistFeature,
 )
 from matcher.providers.session import HasSession
+from matcher.transport import transport
 from matcher.utils import (
     asyncify,
     capitalize_all_words,
@@ -41,6 +42,9 @@ from .boilerplate import BaseProviderBoilerplate
 
 @dataclass
 class DiscogsProvider(BaseProviderBoilerplate[DiscogsSettings], HasSession):
+    cache_ttls: ClassVar[dict[str, float]] = {"resource": 14 * DAY}
+    rate_limiter_name = "discogs"
+
     def __post_init__(self):
         self.features = [
             GetMusicBrainzRelationKeyFeature(lambda: "discogs"),
@@ -69,28 +73,20 @@ class DiscogsProvider(BaseProviderBoilerplate[DiscogsSettings], HasSession):
             ),
         ]
 
-    def _get_client(self):
-        return discogs_client.Client(
-            f"Meelo Matcher/{Context.get().settings.version}",
-            user_token=self.settings.api_key,
-        )
-
     def mk_session(self) -> ClientSession:
         return ClientSession(
             base_url="https://api.discogs.com/",
             headers={
-                "Accept-Encoding": "gzip",
                 "Accept": "application/vnd.discogs.v2.plaintext+json",
                 "User-Agent": f"Meelo Matcher/{Context.get().settings.version}",
             },
+            **transport.session_options(),
         )
 
     async def _fetch(self, route: str) -> Any | None:
-        async with self.get_session().get(
-            route,
-            params={"token": self.settings.api_key},
-        ) as response:
-            return await response.json()
+        return await self.get_cached(
+            "resource", route, params={"token": self.settings.api_key}
+        )
 
     def _get_resource_path_from_url(self, resource_url: str) -> str | None:
         url = urlparse(normalise_url_for_parse(resource_url))
@@ -109,11 +105,18 @@ class DiscogsProvider(BaseProviderBoilerplate[DiscogsSettings], HasSession):
             return removeprefix_or_none(path, "/master/")
 
     async def _search_artist(self, artist_name: str) -> SearchResult | None:
-        client = self._get_client()
         try:
-            data = await asyncify(lambda: client.search(artist_name, type="artist")[0])
-
-            return SearchResult(str(data.id), data)
+            data = await self.get_cached(
+                "search",
+                "/database/search",
+                params={
+                    "type": "artist",
+                    "q": artist_name,
+                    "token": self.settings.api_key,
+                },
+            )
+            artist = data["results"][0]
+            return SearchResult(str(artist["id"]), artist)
         except Exception:
             return None
 
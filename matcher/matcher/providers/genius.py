@@ -1,14 +1,13 @@
 import re
-from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 from datetime import date
-from typing import Any, TypeAlias
+from typing import Any, ClassVar, TypeAlias
 from urllib.parse import urlparse
 
-import aiohttp
 from aiohttp.client import ClientSession
 from bs4 import BeautifulSoup
 
+from matcher.cache import DAY
 from matcher.context import Context
 from matcher.providers.features import (
     GetAlbumFeature,
@@ -35,6 +34,7 @@ from matcher.providers.features import (
     SearchSongFeature,
 )
 from matcher.providers.session import HasSession
+from matcher.transport import transport
 
 from ..settings import GeniusSettings
 from ..utils import (
@@ -53,6 +53,10 @@ AlbumSearchResultData: TypeAlias = tuple[Any, Any]
 # Consider that the passed Ids are names, not the numeric ids
 @dataclass
 class GeniusProvider(BaseProviderBoilerplate[GeniusSettings], HasSession):
+    # Lyrics pages rarely change
+    cache_ttls: ClassVar[dict[str, float]] = {"resource": 30 * DAY}
+    rate_limiter_name = "genius"
+
     def __post_init__(self):
         self.features = [
             GetMusicBrainzRelationKeyFeature(lambda: "genius"),
@@ -112,22 +116,24 @@ class GeniusProvider(BaseProviderBoilerplate[GeniusSettings], HasSession):
                 "Authorization": f"{self.settings.api_key}",
                 "User-Agent": f"Meelo (Matcher), {Context.get().settings.version}",
             },
+            **transport.session_options(),
         )
 
     async def __fetch(
         self,
         url: str,
         host: str,
-        then: Callable[[aiohttp.ClientResponse], Awaitable[Any]],
+        as_json: bool,
         params={},
     ):
-        async with self.get_session().get(
+        return await self.get_cached(
+            "search" if url.startswith("/search") else "resource",
             f"{host}{url}",
             params=params
             if host == "https://genius.com/api"
             else {**params, "access_token": self.settings.api_key},
-        ) as response:
-            return await then(response)
+            as_json=as_json,
+        )
 
     def _get_resource_path_from_url(self, resource_url: str) -> str | None:
         url = urlparse(normalise_url_for_parse(resource_url))
@@ -151,10 +157,10 @@ class GeniusProvider(BaseProviderBoilerplate[GeniusSettings], HasSession):
             return removesuffix_or_none(path.removeprefix("/"), "-lyrics")
 
     async def _fetch_json(self, url: str, params={}, host="https://genius.com/api"):
-        return await self.__fetch(url, host, lambda r: r.json(), params)
+        return await self.__fetch(url, host, True, params)
 
     async def _fetch_text(self, url: str, params={}, host="https://genius.com/api"):
-        return await self.__fetch(url, host, lambda r: r.text(), params)
+        return await self.__fetch(url, host, False, params)
 
     async def _search_artist(self, artist_query: str) -> SearchResult | None:
         def remove_and(s: str):
@@ -18,11 +18,14 @@ from matcher.providers.features import (
 )
 from matcher.providers.session import HasSession
 from matcher.settings import LrcLibSettings
+from matcher.transport import transport
 from matcher.utils import asyncify, normalise_url_for_parse, removeprefix_or_none
 
 
 @dataclass
 class LrcLibProvider(BaseProviderBoilerplate[LrcLibSettings], HasSession):
+    rate_limiter_name = "lrclib"
+
     def __post_init__(self):
         self.features = [
             SearchSongFeature(
@@ -46,11 +49,11 @@ class LrcLibProvider(BaseProviderBoilerplate[LrcLibSettings], HasSession):
             headers={
                 "User-Agent": f"Meelo Matcher {Context.get().settings.version} (github.com/Arthi-chaud/meelo)"
             },
+            **transport.session_options(),
         )
 
     async def _fetch(self, route: str):
-        async with self.get_session().get("/api/" + route) as response:
-            return await response.json()
+        return await self.get_cached("search", "/api/" + route)
 
     def _candidate_is_valid(self, item: Any, duration: int | None):
         if item.get("id") is None:
@@ -22,11 +22,14 @@ from matcher.providers.features import (
 )
 from matcher.providers.session import HasSession
 from matcher.settings import MetacriticSettings
+from matcher.transport import transport
 from matcher.utils import asyncify, normalise_url_for_parse, removeprefix_or_none
 
 
 @dataclass
 class MetacriticProvider(BaseProviderBoilerplate[MetacriticSettings], HasSession):
+    rate_limiter_name = "metacritic"
+
     def __post_init__(self):
         self.features = [
             IsMusicBrainzRelationFeature(
@@ -60,6 +63,7 @@ class MetacriticProvider(BaseProviderBoilerplate[MetacriticSettings], HasSession
     def mk_session(self) -> ClientSession:
         return ClientSession(
             headers={"User-Agent": f"Meelo Matcher/{Context.get().settings.version}"},
+            **transport.session_options(),
         )
 
     def _get_resource_path_from_url(self, resource_url: str) -> str | None:
@@ -81,12 +85,9 @@ class MetacriticProvider(BaseProviderBoilerplate[MetacriticSettings], HasSession
     async def _get_album(self, album_id: str) -> Any | None:
         album_url = self.get_album_url_from_id(album_id)
         try:
-            async with self.get_session().get(
-                str(album_url),
-            ) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, "html.parser")
-                return soup
+            html = await self.get_cached("resource", str(album_url), as_json=False)
+            soup = BeautifulSoup(html, "html.parser")
+            return soup
         except Exception:
             pass
 
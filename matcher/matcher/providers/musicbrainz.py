@@ -1,15 +1,14 @@
-import asyncio
 import re
 import time
 from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Any
+from typing import Any, ClassVar
 from urllib.parse import urlparse
 
-import aiohttp
-from aiohttp.client import ClientSession
+from aiohttp.client import ClientResponse, ClientSession
 from aiohttp_client_cache import CacheBackend, CachedSession  # pyright: ignore
 
+from matcher.cache import DAY
 from matcher.context import Context
 from matcher.logger import ERROR, log
 from matcher.models.api.dto import AreaDto, LabelDto
@@ -48,6 +47,7 @@ from matcher.providers.features import (
     SearchSongWithAcoustIdFeature,
     SearchSongWithFingerprintFeature,
 )
+from matcher.transport import transport
 
 from ..settings import MusicBrainzSettings
 from ..utils import (
@@ -61,49 +61,74 @@ from .boilerplate import BaseProviderBoilerplate
 from .domain import AlbumType, AreaType, SearchResult
 from .session import HasSession
 
+# In seconds. Long enough for prefetched responses to be used by the match
+CACHE_EXPIRATION = 30
+
+
+# Tells whether a request's response is in the session's cache with a single lookup,
+# instead of going through the cached responses
+class CacheIndex:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # (Route, sorted query) -> expiry (monotonic time).
+        # As the TTL is the same for all entries, they are (roughly) ordered by expiry,
+        # so expired entries are dropped from the front
+        self._expiries: dict[tuple[str, tuple], float] = {}
+        self._session: ClientSession | None = None
+
+    @staticmethod
+    def key(route: str, params: dict[str, Any]) -> tuple[str, tuple]:
+        return (route, tuple(sorted(params.items())))
+
+    def has(self, session: ClientSession, route: str, params: dict[str, Any]) -> bool:
+        if session is not self._session:
+            return False
+        expiry = self._expiries.get(self.key(route, params))
+        return expiry is not None and expiry > time.monotonic()
+
+    # sent_at: when the request was sent, so that the entry expires before the cached response does
+    def add(
+        self,
+        session: ClientSession,
+        route: str,
+        params: dict[str, Any],
+        sent_at: float,
+    ):
+        # The cache is lost when the session is re-created
+        if session is not self._session:
+            self._session = session
+            self._expiries.clear()
+        now = time.monotonic()
+        while self._expiries:
+            (oldest_key, oldest_expiry) = next(iter(self._expiries.items()))
+            if oldest_expiry > now:
+                break
+            del self._expiries[oldest_key]
+        key = self.key(route, params)
+        self._expiries.pop(key, None)
+        self._expiries[key] = sent_at + self.ttl
+
+    def __len__(self) -> int:
+        return len(self._expiries)
+
+
+# Used to search recordings using fingerprints or AcoustIDs
+class AcoustIdClient(HasSession):
+    # Lookups of a fingerprint or AcoustID rarely change
+    cache_ttls: ClassVar[dict[str, float]] = {"search": 30 * DAY}
+    rate_limiter_name = "acoustid"
 
-# Stolen from https://github.com/alastair/python-musicbrainzngs/blob/master/musicbrainzngs/musicbrainz.py
-class RateLimiter:
-    def __init__(self):
-        self.limit_interval = 1.0
-        self.limit_requests = 1 if Context.is_ci() else 2
-        self.last_call = 0.0
-        self.lock = asyncio.Lock()
-        self.remaining_requests = None
-
-    def _update_remaining(self):
-        if self.remaining_requests is None:
-            self.remaining_requests = float(self.limit_requests)
-
-        else:
-            since_last_call = time.time() - self.last_call
-            self.remaining_requests += since_last_call * (
-                self.limit_requests / self.limit_interval
-            )
-            self.remaining_requests = min(
-                self.remaining_requests, float(self.limit_requests)
-            )
-
-        self.last_call = time.time()
-
-    async def rate_limit(self):
-        async with self.lock:
-            self._update_remaining()
-            while self.remaining_requests and (self.remaining_requests < 0.999):
-                await asyncio.sleep(
-                    (1.0 - self.remaining_requests)
-                    * (self.limit_requests / self.limit_interval)
-                )
-                self._update_remaining()
-
-            if self.remaining_requests:
-                self.remaining_requests -= 1.0
+    def mk_session(self) -> ClientSession:
+        return ClientSession(**transport.session_options())
 
 
 @dataclass
 class MusicBrainzProvider(BaseProviderBoilerplate[MusicBrainzSettings], HasSession):
+    rate_limiter_name = "musicbrainz"
+
     def __post_init__(self):
-        self.rate_limiter = RateLimiter()
+        self.cache_index = CacheIndex(CACHE_EXPIRATION)
+        self.acoustid = AcoustIdClient()
         self.features = [
             GetArtistFeature(lambda artist_id: self._get_artist(artist_id)),
             SearchArtistFeature(lambda artist_name: self._search_artist(artist_name)),
@@ -172,31 +197,39 @@ class MusicBrainzProvider(BaseProviderBoilerplate[MusicBrainzSettings], HasSessi
     def mk_session(self) -> ClientSession:
         return CachedSession(
             base_url="https://musicbrainz.org/",
-            cache=CacheBackend(expire_after=3),
+            cache=CacheBackend(expire_after=CACHE_EXPIRATION),
             headers={
                 "User-Agent": f"Meelo Matcher/{Context.get().settings.version} ( github.com/Arthi-chaud/Meelo )"
             },
+            **transport.session_options(),
         )
 
     # Note: Only use this method if action is not supported by library
     # E.g. Getting genres of a release-group
     async def _fetch(self, url: str, query: Any = {}) -> Any:
-        session: CachedSession = self.get_session()  # pyright: ignore
-        route = f"/ws/2{url}"
-        is_cached = any(
-            [
-                route == s.path and query == s.query  # pyright: ignore (s is URL, not str)
-                async for s in session.cache.get_urls()
-            ]
+        return await self.get_cached(
+            "search" if "query" in query else "resource",
+            f"/ws/2{url}",
+            {**query, "fmt": "json"},
         )
-        if not is_cached:
-            await self.rate_limiter.rate_limit()
-        async with session.get(
-            route,
-            params={**query, "fmt": "json"},
-        ) as response:
-            res = await response.json()
-            return res
+
+    # Responses that are in the session's cache are not rate limited
+    def is_rate_limited(self, url: str, params: dict[str, Any] | None) -> bool:
+        return not self.cache_index.has(self.get_session(), url, params or {})
+
+    def on_response(
+        self,
+        response: ClientResponse,
+        url: str,
+        params: dict[str, Any] | None,
+        sent_at: float,
+    ):
+        session: CachedSession = self.get_session()  # pyright: ignore
+        if (
+            not response.from_cache  # pyright: ignore
+            and response.status in session.cache.allowed_codes
+        ):
+            self.cache_index.add(session, url, params or {}, sent_at)
 
     def compilation_artist_id(self):
         return "89ad4ac3-39f7-470e-963a-56509c546377"
@@ -505,41 +538,39 @@ class MusicBrainzProvider(BaseProviderBoilerplate[MusicBrainzSettings], HasSessi
     ) -> SearchResult | None:
         try:
             song_slug = to_slug(song_name)
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
+            recordings = (
+                await self.acoustid.get_cached(
+                    "search",
                     # Note: the 'params' are does not allow the '+' for the 'meta' field
                     f"https://api.acoustid.org/v2/lookup?client={'3WWOxoNbNH'}&duration={duration}&fingerprint={fingerprint}&meta=recordings+sources",
-                ) as response:
-                    recordings = (await response.json())["results"][0]["recordings"]
-
-                    recordings = [
-                        r for r in recordings if r.get("sources") and r.get("title")
-                    ]
-                    ## Filter recordings by title
-                    recordings = [
-                        r for r in recordings if to_slug(r["title"]) == song_slug
-                    ]
-                    ## Order recordings by sources count
-                    ordered_recordings = sorted(
-                        recordings,
-                        key=lambda r: -r["sources"],
-                    )
-                    match = ordered_recordings[0]
-                    return SearchResult(match["id"], match)
+                )
+            )["results"][0]["recordings"]
+
+            recordings = [r for r in recordings if r.get("sources") and r.get("title")]
+            ## Filter recordings by title
+            recordings = [r for r in recordings if to_slug(r["title"]) == song_slug]
+            ## Order recordings by sources count
+            ordered_recordings = sorted(
+                recordings,
+                key=lambda r: -r["sources"],
+            )
+            match = ordered_recordings[0]
+            return SearchResult(match["id"], match)
         except Exception:
             pass
 
     async def _search_song_with_acoustid(self, acoustid: str) -> SearchResult | None:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
+            res = (
+                await self.acoustid.get_cached(
+                    "search",
                     f"https://api.acoustid.org/v2/lookup?client={'3WWOxoNbNH'}&trackid={acoustid}&meta=recordings+sources",
-                ) as response:
-                    res = (await response.json())["results"][0]["recordings"]
-                    ordered_res = sorted(res, key=lambda r: r["sources"])
-                    match = ordered_res[0]
+                )
+            )["results"][0]["recordings"]
+            ordered_res = sorted(res, key=lambda r: r["sources"])
+            match = ordered_res[0]
 
-                    return SearchResult(match["id"], match)
+            return SearchResult(match["id"], match)
         except Exception as e:
             print(e)
 
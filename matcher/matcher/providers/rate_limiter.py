@@ -0,0 +1,236 @@
+import asyncio
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+from matcher.context import Context
+from matcher.lane import Lane, current_lane
+from matcher.logger import WARN, log
+from matcher.tokens import get_token_client
+
+# Requests per interval (in seconds), by rate limiter.
+# Can be overridden using MATCHER_RATE_LIMITS (see Settings)
+DEFAULT_RATE_LIMITS: dict[str, tuple[int, float]] = {
+    "musicbrainz": (2, 1.0),
+    "acoustid": (3, 1.0),
+    # 60 requests per minute, over a moving window.
+    # Without bursts, so that the window is never exceeded
+    "discogs": (1, 1.0),
+    "genius": (5, 1.0),
+    "wikipedia": (10, 1.0),
+    "wikidata": (5, 1.0),
+    "lrclib": (5, 1.0),
+    # Scraped websites
+    "allmusic": (1, 1.0),
+    "metacritic": (1, 1.0),
+}
+# Responses telling that we are sending too many requests
+THROTTLED_STATUSES = {429, 503}
+# Headers with the number of requests that can still be sent in the current window
+REMAINING_HEADERS = ["X-Discogs-Ratelimit-Remaining", "X-RateLimit-Remaining"]
+# Headers with the number of requests allowed per window, by their window (in seconds)
+LIMIT_HEADERS = {"X-Discogs-Ratelimit": 60.0}
+# In seconds. Used when a throttled response does not have a Retry-After header.
+# Doubled on each consecutive throttled response
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+@dataclass
+class RateLimiterStats:
+    requests: int = 0
+    throttled: int = 0
+    # In seconds, time spent waiting for the budget
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+# Token bucket, adjusted from the providers' responses
+# Stolen from https://github.com/alastair/python-musicbrainzngs/blob/master/musicbrainzngs/musicbrainz.py
+class RateLimiter:
+    def __init__(self, name: str, limit_requests: int = 1, limit_interval: float = 1.0):
+        self.name = name
+        self.limit_interval = limit_interval
+        self.limit_requests = limit_requests
+        # Requests that only the interactive lane can spend,
+        # so that an admin's rematch does not wait behind the queue
+        self.reserved_requests = min(1, self.limit_requests - 1)
+        self.last_call = 0.0
+        self.remaining_requests = None
+        # Number of requests waiting for the budget
+        self.waiting = 0
+        # Monotonic time until which no request is sent, after being throttled
+        self.paused_until = 0.0
+        self.backoff = 0.0
+        self.stats = RateLimiterStats()
+
+    def _update_remaining(self):
+        if self.remaining_requests is None:
+            self.remaining_requests = float(self.limit_requests)
+
+        else:
+            since_last_call = time.time() - self.last_call
+            self.remaining_requests += since_last_call * (
+                self.limit_requests / self.limit_interval
+            )
+            self.remaining_requests = min(
+                self.remaining_requests, float(self.limit_requests)
+            )
+
+        self.last_call = time.time()
+
+    # In seconds
+    def pause_remaining(self) -> float:
+        return max(0.0, self.paused_until - time.monotonic())
+
+    async def rate_limit(self):
+        lane = current_lane.get()
+        token_client = get_token_client()
+        if lane == Lane.PREFETCH:
+            # Prefetching never waits, it only spends requests that nobody needs.
+            # Worker processes do not know about the supervisor's spare requests
+            if token_client is not None or not self._take_spare_request():
+                raise Exception("No spare request to prefetch with")
+            self.stats.requests += 1
+            return
+        start = time.monotonic()
+        # Not holding a lock while sleeping,
+        # so that an interactive request can overtake background ones
+        self.waiting += 1
+        try:
+            while pause := self.pause_remaining():
+                await asyncio.sleep(pause)
+            # In a worker process, the budget is held by the supervisor
+            if token_client is not None:
+                await token_client.acquire(self.name, lane)
+                return
+            required = 1.0
+            if lane != Lane.INTERACTIVE:
+                required += self.reserved_requests
+            while True:
+                self._update_remaining()
+                assert self.remaining_requests is not None
+                if (
+                    self.remaining_requests > required - 0.001
+                    and not self.pause_remaining()
+                ):
+                    self.remaining_requests -= 1.0
+                    return
+                await asyncio.sleep(
+                    max(
+                        (required - self.remaining_requests)
+                        * (self.limit_interval / self.limit_requests),
+                        self.pause_remaining(),
+                    )
+                )
+        finally:
+            self.waiting -= 1
+            wait = time.monotonic() - start
+            self.stats.requests += 1
+            self.stats.total_wait += wait
+            self.stats.max_wait = max(self.stats.max_wait, wait)
+
+    def _take_spare_request(self) -> bool:
+        if self.waiting or self.pause_remaining():
+            return False
+        self._update_remaining()
+        assert self.remaining_requests is not None
+        if self.remaining_requests > 1.0 + self.reserved_requests - 0.001:
+            self.remaining_requests -= 1.0
+            return True
+        return False
+
+    # Adjusts the budget using the response's status and headers
+    def observe(self, status: int, headers: Mapping[str, str]):
+        for header, window in LIMIT_HEADERS.items():
+            limit = _parse_number(headers.get(header))
+            if limit:
+                self.limit_interval = self.limit_requests * window / limit
+        for header in REMAINING_HEADERS:
+            remaining = _parse_number(headers.get(header))
+            if remaining is not None and remaining < 1:
+                # The provider's window is spent, waiting for it to move
+                self.pause(self.limit_interval)
+        if status not in THROTTLED_STATUSES:
+            self.backoff = 0.0
+            return
+        self.stats.throttled += 1
+        self.backoff = (
+            min(self.backoff * 2, BACKOFF_MAX) if self.backoff else BACKOFF_BASE
+        )
+        delay = _parse_retry_after(headers.get("Retry-After"))
+        self.pause(delay if delay is not None else self.backoff)
+        log(
+            WARN,
+            "Throttled by provider",
+            {"rate limiter": self.name, "pause": f"{self.pause_remaining():.1f}s"},
+        )
+
+    # In seconds. Also called by the token server, when a worker process was throttled
+    def pause(self, delay: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self.remaining_requests = 0.0
+        self.last_call = time.time()
+        # The supervisor holds the budget, the other processes must stop too
+        token_client = get_token_client()
+        if token_client is not None:
+            token_client.pause(self.name, delay)
+
+
+# Rate limiters of this process, by name. Shared by the sessions of a provider,
+# and lent by the token server to the worker processes
+rate_limiters: dict[str, RateLimiter] = {}
+_overrides: dict[str, tuple[int, float]] = {}
+
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    limiter = rate_limiters.get(name)
+    if limiter is None:
+        (limit_requests, limit_interval) = _get_rate_limit(name)
+        limiter = RateLimiter(name, limit_requests, limit_interval)
+        rate_limiters[name] = limiter
+    return limiter
+
+
+# Called at bootstrap, before the providers are built.
+# Limiters are created eagerly, so that the token server can lend their budgets
+def configure_rate_limiters(overrides: dict[str, tuple[int, float]]):
+    _overrides.clear()
+    _overrides.update(overrides)
+    rate_limiters.clear()
+    for name in DEFAULT_RATE_LIMITS | overrides:
+        get_rate_limiter(name)
+
+
+def _get_rate_limit(name: str) -> tuple[int, float]:
+    if name in _overrides:
+        return _overrides[name]
+    # In CI, MusicBrainz is shared with other runners
+    if name == "musicbrainz" and Context.is_ci():
+        return (1, 1.0)
+    return DEFAULT_RATE_LIMITS.get(name, (1, 1.0))
+
+
+def _parse_number(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+# The header is either a number of seconds or an HTTP date
+def _parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    seconds = _parse_number(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+    except (TypeError, ValueError):
+        return None
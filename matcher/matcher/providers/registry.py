@@ -0,0 +1,66 @@
+from typing import Literal, TypeVar
+
+from .base import BaseFeature
+from .boilerplate import BaseProviderBoilerplate
+from .features import (
+    GetAlbumFeature,
+    GetArea,
+    GetArtistFeature,
+    GetLabelByMBID,
+    GetLabelByName,
+    GetSongFeature,
+    SearchAlbumFeature,
+    SearchArtistFeature,
+    SearchSongFeature,
+)
+
+T = TypeVar("T", bound=BaseProviderBoilerplate)
+
+ResourceType = Literal["artist", "album", "song", "area", "label"]
+
+# A provider can serve a resource if it has one of these features
+RESOURCE_FEATURES: dict[ResourceType, list[type[BaseFeature]]] = {
+    "artist": [SearchArtistFeature, GetArtistFeature],
+    "album": [SearchAlbumFeature, GetAlbumFeature],
+    "song": [SearchSongFeature, GetSongFeature],
+    "area": [GetArea],
+    "label": [GetLabelByName, GetLabelByMBID],
+}
+
+
+# Lookup tables built once at bootstrap, so that finding a provider
+# does not require scanning the list of providers
+class ProviderRegistry:
+    def __init__(self, providers: list[BaseProviderBoilerplate]):
+        self.providers = providers
+        self.by_id: dict[int, BaseProviderBoilerplate] = {}
+        self.by_type: dict[type, BaseProviderBoilerplate] = {}
+        self.by_resource: dict[ResourceType, list[BaseProviderBoilerplate]] = {
+            resource: [] for resource in RESOURCE_FEATURES
+        }
+        # Provider name -> names of the features it implements
+        self.capabilities: dict[str, list[str]] = {}
+        for provider in providers:
+            provider.index_features()
+            self.by_id[provider.api_model.id] = provider
+            self.capabilities[provider.api_model.name] = [
+                type(f).__name__ for f in provider.features
+            ]
+            # Same as an isinstance scan, i.e. the first matching provider wins
+            for cls in type(provider).__mro__:
+                self.by_type.setdefault(cls, provider)
+            for resource, features in RESOURCE_FEATURES.items():
+                if any(provider.has_feature(f) for f in features):
+                    self.by_resource[resource].append(provider)
+
+    def get_by_id(self, provider_id: int) -> BaseProviderBoilerplate | None:
+        return self.by_id.get(provider_id)
+
+    def get_by_type(self, cl: type[T]) -> T | None:
+        return self.by_type.get(cl)  # pyright: ignore
+
+    def get_for_resource(self, resource: ResourceType) -> list[BaseProviderBoilerplate]:
+        return self.by_resource[resource]
+
+    def capability_matrix(self) -> dict[str, list[str]]:
+        return self.capabilities
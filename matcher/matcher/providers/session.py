@@ -1,10 +1,66 @@
+import itertools
+import time
 from abc import abstractmethod
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Any, ClassVar
+from urllib.parse import urlencode
 
-from aiohttp import ClientSession
+from aiohttp import ClientResponse, ClientSession, TraceConfig, TraceRequestEndParams
+
+from matcher.cache import CACHE_DEFAULT_TTLS, response_cache
+from matcher.providers.base import BaseProvider
+from matcher.providers.rate_limiter import (
+    THROTTLED_STATUSES,
+    RateLimiter,
+    get_rate_limiter,
+)
+from matcher.transport import transport
+
+# IDs of the providers whose requests failed during the current match
+failed_providers: ContextVar[set[int] | None] = ContextVar(
+    "failed_providers", default=None
+)
+# Number of times a throttled request is sent again
+THROTTLED_RETRIES = 2
+# In seconds. If a provider asks to wait for longer, its requests fail
+# (and the match is retried later) instead of holding the workers
+MAX_THROTTLED_WAIT = 60.0
+
+
+def _record_failure(owner: object):
+    failures = failed_providers.get()
+    if failures is not None and isinstance(owner, BaseProvider):
+        failures.add(owner.api_model.id)
+
+
+# Records timeouts, connection errors and server-side errors,
+# which are worth retrying later. Throttled requests are recorded by HasSession.send_get,
+# if they still fail once sent again
+def mk_failure_trace(owner: object) -> TraceConfig:
+    async def on_request_end(
+        _: ClientSession, __: SimpleNamespace, params: TraceRequestEndParams
+    ):
+        status = params.response.status
+        if status >= 500 and status not in THROTTLED_STATUSES:
+            _record_failure(owner)
+
+    async def on_request_exception(*_):
+        _record_failure(owner)
+
+    trace = TraceConfig()
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    trace.freeze()
+    return trace
 
 
 class HasSession:
     _session: ClientSession | None = None
+    # In seconds, by resource kind. Overrides CACHE_DEFAULT_TTLS
+    cache_ttls: ClassVar[dict[str, float]] = {}
+    # Shared by the provider's requests, see DEFAULT_RATE_LIMITS
+    rate_limiter_name: ClassVar[str]
 
     @abstractmethod
     def mk_session(self) -> ClientSession:
@@ -20,6 +76,71 @@ class HasSession:
         if self._session and self._session.closed:
             self._session = None
         if not self._session:
-            self._session = self.mk_session()
+            self._session = transport.register(self.mk_session())
+            self._session.trace_configs.append(mk_failure_trace(self))
 
         return self._session
+
+    # Sends a GET request and reads its body (as JSON or text).
+    # Successful responses are stored in the response cache, if it is enabled
+    async def get_cached(
+        self,
+        kind: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        as_json: bool = True,
+    ) -> Any:
+        key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+        ttl = self.cache_ttls.get(
+            kind, CACHE_DEFAULT_TTLS.get(kind, CACHE_DEFAULT_TTLS["resource"])
+        )
+        return await response_cache.get_or_fetch(
+            type(self).__name__,
+            kind,
+            key,
+            ttl,
+            lambda: self.send_get(url, params, as_json),
+        )
+
+    def get_rate_limiter(self) -> RateLimiter:
+        return get_rate_limiter(self.rate_limiter_name)
+
+    # Returns the body, and whether it can be cached.
+    # Throttled requests are sent again, once the provider allows it
+    async def send_get(
+        self, url: str, params: dict[str, Any] | None, as_json: bool
+    ) -> tuple[Any, bool]:
+        limiter = self.get_rate_limiter()
+        for attempt in itertools.count():
+            if limiter.pause_remaining() > MAX_THROTTLED_WAIT:
+                _record_failure(self)
+                raise Exception("Provider is throttling requests")
+            rate_limited = self.is_rate_limited(url, params)
+            if rate_limited:
+                await limiter.rate_limit()
+            sent_at = time.monotonic()
+            async with self.get_session().get(url, params=params) as response:
+                if rate_limited:
+                    limiter.observe(response.status, response.headers)
+                if response.status in THROTTLED_STATUSES:
+                    if attempt < THROTTLED_RETRIES:
+                        continue
+                    _record_failure(self)
+                self.on_response(response, url, params, sent_at)
+                body = await (response.json() if as_json else response.text())
+                return (body, response.status == 200)
+        raise AssertionError("unreachable")
+
+    # Returns false if the request will not reach the provider (e.g. it is in the session's cache)
+    def is_rate_limited(self, url: str, params: dict[str, Any] | None) -> bool:
+        return True
+
+    # sent_at: monotonic time
+    def on_response(
+        self,
+        response: ClientResponse,
+        url: str,
+        params: dict[str, Any] | None,
+        sent_at: float,
+    ):
+        pass
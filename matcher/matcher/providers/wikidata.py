@@ -1,10 +1,12 @@
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, ClassVar
 
 from aiohttp import ClientSession
 
+from matcher.cache import DAY
 from matcher.context import Context
 from matcher.providers.session import HasSession
+from matcher.transport import transport
 
 
 @dataclass
@@ -22,6 +24,9 @@ class WikidataRelations:
 # Note: Not a regular provider, we use it to link with other providers
 @dataclass
 class WikidataProvider(HasSession):
+    cache_ttls: ClassVar[dict[str, float]] = {"resource": 30 * DAY}
+    rate_limiter_name = "wikidata"
+
     def mk_session(self) -> ClientSession:
         version = Context.get().settings.version
         # https://wikitech.wikimedia.org/wiki/Robot_policy
@@ -29,15 +34,16 @@ class WikidataProvider(HasSession):
             base_url="https://wikidata.org/",
             headers={
                 "User-Agent": f"Meelo (Matcher), {version} (https://github.com/Arthi-chaud/meelo) meelo-matcher/{version}",
-                "Accept-Encoding": "gzip",
             },
+            **transport.session_options(),
         )
 
     async def get_resource_relations(self, wikidata_id):
         try:
-            async with self.get_session().get(
-                f"/w/rest.php/wikibase/v1/entities/items/{wikidata_id}",
-            ) as response:
-                return WikidataRelations(await response.json())
+            return WikidataRelations(
+                await self.get_cached(
+                    "resource", f"/w/rest.php/wikibase/v1/entities/items/{wikidata_id}"
+                )
+            )
         except Exception:
             return None
@@ -7,6 +7,7 @@ from aiohttp import ClientSession
 from matcher.context import Context
 from matcher.providers.boilerplate import BaseProviderBoilerplate
 from matcher.providers.session import HasSession
+from matcher.transport import transport
 from matcher.utils import asyncify, normalise_url_for_parse, removeprefix_or_none
 
 from ..settings import WikipediaSettings
@@ -26,6 +27,8 @@ from .features import (
 
 @dataclass
 class WikipediaProvider(BaseProviderBoilerplate[WikipediaSettings], HasSession):
+    rate_limiter_name = "wikipedia"
+
     def __post_init__(self):
         self.features = [
             GetArtistIdFromUrlFeature(
@@ -60,13 +63,14 @@ class WikipediaProvider(BaseProviderBoilerplate[WikipediaSettings], HasSession):
         return ClientSession(
             headers={
                 "User-Agent": f"Meelo (Matcher), {version} (https://github.com/Arthi-chaud/meelo) meelo-matcher/{version}",
-                "Accept-Encoding": "gzip",
             },
+            **transport.session_options(),
         )
 
     async def get_article(self, article_id: str) -> Any | None:
         try:
-            async with self.get_session().get(
+            json = await self.get_cached(
+                "resource",
                 "https://en.wikipedia.org/w/api.php",
                 params={
                     "format": "json",
@@ -77,11 +81,10 @@ class WikipediaProvider(BaseProviderBoilerplate[WikipediaSettings], HasSession):
                     "redirects": 1,
                     "titles": unquote(article_id),
                 },
-            ) as response:
-                json = await response.json()
-                res = json["query"]["pages"]
-                first_entity = next(iter(res))
-                return res[first_entity]
+            )
+            res = json["query"]["pages"]
+            first_entity = next(iter(res))
+            return res[first_entity]
         except Exception:
             return None
 
@@ -105,18 +108,20 @@ class WikipediaProvider(BaseProviderBoilerplate[WikipediaSettings], HasSession):
 
     async def get_article_name_from_wikidata(self, wikidata_id: str) -> str | None:
         try:
-            async with self.get_session().get(
-                "https://www.wikidata.org/w/api.php",
-                params={
-                    "action": "wbgetentities",
-                    "props": "sitelinks",
-                    "ids": wikidata_id,
-                    "sitefilter": "enwiki",
-                    "format": "json",
-                },
-            ) as response:
-                entities = (await response.json())["entities"]
-                first_entity = next(iter(entities))
-                return entities[first_entity]["sitelinks"]["enwiki"]["title"]
+            entities = (
+                await self.get_cached(
+                    "resource",
+                    "https://www.wikidata.org/w/api.php",
+                    params={
+                        "action": "wbgetentities",
+                        "props": "sitelinks",
+                        "ids": wikidata_id,
+                        "sitefilter": "enwiki",
+                        "format": "json",
+                    },
+                )
+            )["entities"]
+            first_entity = next(iter(entities))
+            return entities[first_entity]["sitelinks"]["enwiki"]["title"]
         except Exception:
             return None
@@ -0,0 +1,55 @@
+import asyncio
+from collections.abc import Callable
+
+from matcher.pool import ResourceKey
+
+# Below the API's lowest event priority
+RETRY_PRIORITY = 0
+
+
+class Retrier:
+    # Schedules matches whose provider requests failed (e.g. timeouts),
+    # with an exponential backoff: `delay`, then 2 * `delay`, etc.
+    def __init__(self, delay: float, max_attempts: int):
+        self.delay = delay
+        self.max_attempts = max_attempts
+        # Number of retries already scheduled for each resource
+        self._attempts: dict[ResourceKey, int] = {}
+        self._timers: dict[ResourceKey, asyncio.TimerHandle] = {}
+
+    # Returns false if the resource was retried too many times
+    def schedule(self, key: ResourceKey, retry: Callable[[], None]) -> bool:
+        attempts = self._attempts.get(key, 0)
+        if attempts >= self.max_attempts:
+            self.forget(key)
+            return False
+        self._attempts[key] = attempts + 1
+        previous_timer = self._timers.pop(key, None)
+        if previous_timer:
+            previous_timer.cancel()
+        self._timers[key] = asyncio.get_running_loop().call_later(
+            self.delay * 2**attempts, self._fire, key, retry
+        )
+        return True
+
+    # Called once the resource was matched without failures
+    def forget(self, key: ResourceKey):
+        self._attempts.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+    def attempts(self, key: ResourceKey) -> int:
+        return self._attempts.get(key, 0)
+
+    def pending_count(self) -> int:
+        return len(self._timers)
+
+    def stop(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers = {}
+
+    def _fire(self, key: ResourceKey, retry: Callable[[], None]):
+        del self._timers[key]
+        retry()
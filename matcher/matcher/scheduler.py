@@ -0,0 +1,131 @@
+import asyncio
+import heapq
+import itertools
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from matcher.logger import DEBUG, ERROR, log
+
+# Rough number of provider round-trips needed to match a resource.
+# Among tasks with the same priority, the cheapest ones are served first
+RESOURCE_COST: dict[str, int] = {
+    "area": 1,
+    "label": 1,
+    "artist": 2,
+    "song": 3,
+    "album": 3,
+}
+
+# Same scale as the API's ResourceEventPriority
+DEFAULT_PRIORITY = 1
+
+
+@dataclass(order=True)
+class ScheduledTask:
+    sort_key: tuple[int, int, int]
+    run: Callable[[], Awaitable[None]] = field(compare=False)
+    # Called on shutdown if the task was not run (e.g. to return a message to the broker)
+    drop: Callable[[], Awaitable[None]] = field(compare=False)
+    # Fetches the task's data ahead of time, while it waits for a worker
+    prefetch: Callable[[], Awaitable[None]] | None = field(default=None, compare=False)
+    prefetching: bool = field(default=False, compare=False)
+
+
+class Scheduler:
+    # Local buffer of tasks, served by a fixed number of workers,
+    # highest priority first, then cheapest first, then oldest first.
+    # The next `lookahead` tasks in line are prefetched.
+    def __init__(self, workers: int, lookahead: int = 0):
+        self.workers = max(workers, 1)
+        self.lookahead = max(lookahead, 0)
+        # Min-heap of the tasks waiting for a worker
+        self._heap: list[ScheduledTask] = []
+        # Set when a task is pushed, cleared by the workers once the heap is empty
+        self._pushed = asyncio.Event()
+        self._counter = itertools.count()
+        self._worker_tasks: list[asyncio.Task] = []
+        # Indexed by sequence number
+        self._running: dict[int, ScheduledTask] = {}
+        self._prefetches: set[asyncio.Task] = set()
+
+    def start(self):
+        self._worker_tasks = [
+            asyncio.create_task(self._work()) for _ in range(self.workers)
+        ]
+
+    def push(
+        self,
+        resource_type: str,
+        priority: int | None,
+        run: Callable[[], Awaitable[None]],
+        drop: Callable[[], Awaitable[None]],
+        prefetch: Callable[[], Awaitable[None]] | None = None,
+    ):
+        cost = RESOURCE_COST.get(resource_type, max(RESOURCE_COST.values()))
+        if priority is None:
+            priority = DEFAULT_PRIORITY
+        sort_key = (-priority, cost, next(self._counter))
+        heapq.heappush(self._heap, ScheduledTask(sort_key, run, drop, prefetch))
+        self._pushed.set()
+        self._prefetch_next()
+
+    def pending_count(self) -> int:
+        return len(self._heap)
+
+    async def stop(self):
+        running = list(self._running.values())
+        for worker in self._worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for prefetch in self._prefetches:
+            prefetch.cancel()
+        (dropped, self._heap) = (running + self._heap, [])
+        for task in dropped:
+            try:
+                await task.drop()
+            except Exception as e:
+                log(ERROR, "Could not drop task", {"error": str(e)})
+
+    async def _work(self):
+        while True:
+            task = await self._next()
+            self._running[task.sort_key[2]] = task
+            self._prefetch_next()
+            try:
+                await task.run()
+            except Exception as e:
+                log(ERROR, "Task failed", {"error": str(e)})
+            finally:
+                del self._running[task.sort_key[2]]
+
+    async def _next(self) -> ScheduledTask:
+        while not self._heap:
+            self._pushed.clear()
+            await self._pushed.wait()
+        return heapq.heappop(self._heap)
+
+    def _prefetch_next(self):
+        if not self.lookahead or not self._worker_tasks:
+            return
+        # Idle workers are about to take the first tasks, no need to prefetch them
+        idle_workers = self.workers - len(self._running)
+        upcoming = heapq.nsmallest(idle_workers + self.lookahead, self._heap)
+        for task in upcoming[idle_workers:]:
+            if len(self._prefetches) >= self.lookahead:
+                return
+            if task.prefetch is None or task.prefetching:
+                continue
+            task.prefetching = True
+            prefetch = asyncio.create_task(self._run_prefetch(task.prefetch))
+            self._prefetches.add(prefetch)
+            prefetch.add_done_callback(self._prefetches.discard)
+
+    async def _run_prefetch(self, prefetch: Callable[[], Awaitable[None]]):
+        try:
+            await prefetch()
+        except Exception as e:
+            log(DEBUG, "Prefetch failed", {"error": str(e)})
+        finally:
+            self._prefetches.discard(asyncio.current_task())  # pyright: ignore
+            self._prefetch_next()
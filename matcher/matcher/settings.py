@@ -10,6 +10,9 @@ from matcher.logger import INFO, WARN, log
 
 T = TypeVar("T")
 
+# Set by the supervisor for the worker processes it spawns
+PROCESS_INDEX_ENV = "MATCHER_PROCESS_INDEX"
+
 
 @dataclass_json
 @dataclass
@@ -60,6 +63,34 @@ class LrcLibSettings(BaseProviderSettings):
 class Settings:
     push_genres: bool
     version: str
+    # Number of resources that can be matched at the same time
+    workers: int
+    # Number of matcher processes, each consuming the queue.
+    # Processes share providers' rate limits through a Unix socket
+    processes: int
+    supervisor_socket_path: str
+    # Number of matches reserved to admin-requested rematches
+    interactive_workers: int
+    # Number of events buffered locally, on top of the ones being matched,
+    # so that they can be reordered by priority
+    buffer_size: int
+    # Events for a resource matched less than this many seconds ago are skipped
+    coalesce_window: float
+    # Number of upcoming events whose data is fetched ahead of their match
+    prefetch_size: int
+    # Delay before retrying a match whose provider requests failed, doubled on each attempt
+    retry_delay: float
+    # Set to 0 to disable retries
+    retry_attempts: int
+    # SQLite file where writes to the API are journaled before being sent.
+    # If not set, matches wait for their writes to be sent
+    journal_path: str | None
+    # SQLite file where providers' responses are cached. Shared by the processes
+    cache_path: str | None
+    # In megabytes
+    cache_size: int
+    # Overrides of the providers' rate limits: requests per interval (in seconds), by rate limiter
+    rate_limits: dict[str, tuple[int, float]]
     provider_settings: list[BaseProviderSettings]
 
     def __init__(self):
@@ -70,6 +101,29 @@ class Settings:
         if not os.path.isfile(config_path):
             raise Exception("Could not find settings file")
         self.version = os.environ.get("VERSION") or "unknown"
+        self.workers = int(os.environ.get("MATCHER_WORKERS") or 4)
+        self.processes = int(os.environ.get("MATCHER_PROCESSES") or 1)
+        self.supervisor_socket_path = (
+            os.environ.get("MATCHER_SOCKET_PATH") or "/tmp/meelo-matcher.sock"
+        )
+        self.interactive_workers = int(
+            os.environ.get("MATCHER_INTERACTIVE_WORKERS") or 2
+        )
+        self.buffer_size = int(os.environ.get("MATCHER_BUFFER_SIZE") or 20)
+        self.coalesce_window = float(os.environ.get("MATCHER_COALESCE_WINDOW") or 300)
+        self.prefetch_size = int(os.environ.get("MATCHER_PREFETCH_SIZE") or 2)
+        self.retry_delay = float(os.environ.get("MATCHER_RETRY_DELAY") or 60)
+        self.retry_attempts = int(os.environ.get("MATCHER_RETRY_ATTEMPTS") or 4)
+        self.journal_path = os.environ.get("MATCHER_JOURNAL_PATH") or None
+        # Each process has its own journal
+        process_index = os.environ.get(PROCESS_INDEX_ENV)
+        if self.journal_path and process_index:
+            self.journal_path = f"{self.journal_path}.{process_index}"
+        self.cache_path = os.environ.get("MATCHER_CACHE_PATH") or None
+        self.cache_size = int(os.environ.get("MATCHER_CACHE_SIZE") or 1024)
+        self.rate_limits = parse_rate_limits(
+            os.environ.get("MATCHER_RATE_LIMITS") or ""
+        )
         with open(config_path) as file:
             log(INFO, "Reading settings file...")
             json_data = json.loads(file.read())
@@ -109,3 +163,16 @@ class Settings:
             if isinstance(provider_setting, cl):
                 return provider_setting
         return None
+
+
+# Format: "<rate limiter>=<requests>[/<interval in seconds>],...", e.g. "discogs=25/60,genius=2"
+def parse_rate_limits(value: str) -> dict[str, tuple[int, float]]:
+    rate_limits = {}
+    for entry in filter(None, value.split(",")):
+        try:
+            (name, limit) = entry.split("=")
+            (requests, _, interval) = limit.partition("/")
+            rate_limits[name.strip().lower()] = (int(requests), float(interval or 1))
+        except ValueError:
+            raise Exception(f"Invalid rate limit: '{entry}'")
+    return rate_limits
@@ -0,0 +1,74 @@
+import asyncio
+import glob
+import os
+import sys
+
+from matcher.journal import WriteJournal
+from matcher.logger import ERROR, INFO, WARN, log
+from matcher.providers.rate_limiter import rate_limiters
+from matcher.settings import PROCESS_INDEX_ENV
+from matcher.tokens import SUPERVISOR_SOCKET_ENV, TokenServer
+
+# In seconds
+RESPAWN_DELAY = 5
+
+
+class Supervisor:
+    # Runs additional matcher processes, each with its own queue consumer.
+    # Provider rate limits are shared with them through a token server.
+    # Note: The HTTP endpoints (e.g. /queue, rematches, jobs) only cover this process
+    def __init__(self, processes: int, socket_path: str):
+        self.processes = processes
+        self.token_server = TokenServer(socket_path, rate_limiters)
+        self._stopping = False
+        self._children: list[asyncio.subprocess.Process] = []
+        self._monitors: list[asyncio.Task] = []
+
+    async def start(self):
+        await self.token_server.start()
+        # This process is one of the matcher processes
+        self._monitors = [
+            asyncio.create_task(self._run_child(i)) for i in range(1, self.processes)
+        ]
+        log(INFO, "Started worker processes", {"count": self.processes - 1})
+
+    async def stop(self):
+        self._stopping = True
+        for child in self._children:
+            if child.returncode is None:
+                child.terminate()
+        await asyncio.gather(*self._monitors, return_exceptions=True)
+        await self.token_server.stop()
+
+    async def _run_child(self, index: int):
+        env = {
+            **os.environ,
+            SUPERVISOR_SOCKET_ENV: self.token_server.path,
+            PROCESS_INDEX_ENV: str(index),
+        }
+        while not self._stopping:
+            child = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "matcher.worker", env=env
+            )
+            self._children.append(child)
+            return_code = await child.wait()
+            self._children.remove(child)
+            if self._stopping:
+                break
+            log(
+                ERROR,
+                "Worker process exited, restarting it",
+                {"process": index, "code": return_code},
+            )
+            await asyncio.sleep(RESPAWN_DELAY)
+
+
+# Journals of worker processes that are not spawned anymore (e.g. MATCHER_PROCESSES was reduced)
+# would never be replayed. Their writes are moved to this process's journal
+def adopt_orphan_journals(journal: WriteJournal, processes: int):
+    for path in glob.glob(f"{glob.escape(journal.path)}.*"):
+        index = path.removeprefix(f"{journal.path}.")
+        if not index.isdigit() or int(index) < processes:
+            continue
+        adopted = journal.adopt(path)
+        log(WARN, "Adopted orphan journal", {"path": path, "writes": adopted})
@@ -0,0 +1,149 @@
+import asyncio
+import itertools
+import os
+from collections.abc import Mapping
+from typing import Protocol
+
+from matcher.lane import Lane, current_lane
+from matcher.logger import ERROR, INFO, log
+
+# Set by the supervisor for its worker processes.
+# Path to the socket of the token server
+SUPERVISOR_SOCKET_ENV = "MATCHER_SUPERVISOR_SOCKET"
+
+
+class Throttle(Protocol):
+    async def rate_limit(self) -> None: ...
+
+    # In seconds
+    def pause(self, delay: float) -> None: ...
+
+
+# Lends the budgets of the supervisor's rate limiters to the worker processes,
+# so that providers' global limits are respected across processes.
+#
+# Protocol (one line per message):
+# - Request: "<request id> <rate limiter name> <lane>"
+# - Response: "<request id>", sent once the request can be sent to the provider
+# - Pause: "pause <rate limiter name> <seconds>", sent when a provider throttled a worker.
+#   No request is lent for that rate limiter until the pause ends
+class TokenServer:
+    # rate_limiters: the registry of this process's rate limiters, by name
+    def __init__(self, path: str, rate_limiters: Mapping[str, Throttle]):
+        self.path = path
+        self.rate_limiters = rate_limiters
+        self._server: asyncio.Server | None = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        grants: set[asyncio.Task] = set()
+        try:
+            while line := await reader.readline():
+                try:
+                    request_id, name, lane = line.decode().split()
+                    if request_id == "pause":
+                        self._pause(name, float(lane))
+                        continue
+                    grant = asyncio.create_task(
+                        self._grant(writer, request_id, name, Lane(lane))
+                    )
+                    grants.add(grant)
+                    grant.add_done_callback(grants.discard)
+                except ValueError:
+                    log(ERROR, "Invalid token request", {"request": line.decode()})
+        finally:
+            for grant in grants:
+                grant.cancel()
+            writer.close()
+
+    def _pause(self, name: str, delay: float):
+        limiter = self.rate_limiters.get(name)
+        if limiter is not None:
+            limiter.pause(delay)
+
+    async def _grant(
+        self, writer: asyncio.StreamWriter, request_id: str, name: str, lane: Lane
+    ):
+        limiter = self.rate_limiters.get(name)
+        if limiter is not None:
+            # Each task has its own copy of the context
+            current_lane.set(lane)
+            await limiter.rate_limit()
+        writer.write(f"{request_id}\n".encode())
+        await writer.drain()
+
+
+class TokenClient:
+    def __init__(self, path: str):
+        self.path = path
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._pending: dict[str, asyncio.Future[None]] = {}
+        self._request_ids = itertools.count()
+        self._connect_lock = asyncio.Lock()
+
+    async def acquire(self, name: str, lane: Lane):
+        async with self._connect_lock:
+            if self._writer is None:
+                await self._connect()
+        assert self._writer is not None
+        request_id = str(next(self._request_ids))
+        granted = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = granted
+        self._writer.write(f"{request_id} {name} {lane.value}\n".encode())
+        await granted
+
+    # Stops the other processes from sending requests to a provider that throttled this one.
+    # Not sent if not connected, as this process did not get any token
+    def pause(self, name: str, delay: float):
+        if self._writer is not None:
+            self._writer.write(f"pause {name} {delay}\n".encode())
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _connect(self):
+        reader, self._writer = await asyncio.open_unix_connection(self.path)
+        log(INFO, "Connected to token server", {"path": self.path})
+        self._reader_task = asyncio.create_task(self._read(reader))
+
+    async def _read(self, reader: asyncio.StreamReader):
+        while line := await reader.readline():
+            granted = self._pending.pop(line.decode().strip(), None)
+            if granted is not None and not granted.done():
+                granted.set_result(None)
+        # The connection was lost. Next request will reconnect
+        self._writer = None
+        for granted in self._pending.values():
+            if not granted.done():
+                granted.set_exception(ConnectionError("Lost token server"))
+        self._pending = {}
+
+
+_client: TokenClient | None = None
+
+
+# Returns a client if this process is a worker process of a supervisor
+def get_token_client() -> TokenClient | None:
+    global _client
+    path = os.environ.get(SUPERVISOR_SOCKET_ENV)
+    if not path:
+        return None
+    if _client is None:
+        _client = TokenClient(path)
+    return _client
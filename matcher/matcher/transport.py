@@ -0,0 +1,104 @@
+import asyncio
+import weakref
+from dataclasses import dataclass
+from typing import Any
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+
+# Shared by all the hosts
+CONNECTIONS_LIMIT = 100
+# Per host (e.g. the API, or a provider)
+CONNECTIONS_PER_HOST_LIMIT = 10
+# In seconds
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+DEFAULT_TIMEOUT = ClientTimeout(total=60, sock_connect=10)
+
+
+@dataclass
+class TransportStats:
+    requests: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+    dns_cache_hits: int = 0
+    dns_cache_misses: int = 0
+
+
+# Connection pool shared by the API client and the providers' sessions,
+# so that connections (and TLS sessions) are kept alive and reused across matches.
+# Gzip (and Brotli, if installed) responses are negotiated by aiohttp
+class Transport:
+    def __init__(self):
+        self.stats = TransportStats()
+        self._connector: TCPConnector | None = None
+        # The connector can only be used in the loop it was created in
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._sessions: weakref.WeakSet[ClientSession] = weakref.WeakSet()
+        self._trace = self._mk_trace()
+
+    # Options to pass to ClientSession, so that it uses the shared pool
+    def session_options(self) -> dict[str, Any]:
+        return {
+            "connector": self._get_connector(),
+            "connector_owner": False,
+            "timeout": DEFAULT_TIMEOUT,
+            "trace_configs": [self._trace],
+        }
+
+    # Sessions registered here are closed on shutdown
+    def register(self, session: ClientSession) -> ClientSession:
+        self._sessions.add(session)
+        return session
+
+    def open_sessions_count(self) -> int:
+        return len([s for s in self._sessions if not s.closed])
+
+    async def close(self):
+        for session in list(self._sessions):
+            if not session.closed:
+                await session.close()
+        if self._connector is not None:
+            await self._connector.close()
+            self._connector = None
+
+    def _get_connector(self) -> TCPConnector:
+        loop = asyncio.get_running_loop()
+        if self._connector is None or self._connector.closed or self._loop is not loop:
+            self._loop = loop
+            self._connector = TCPConnector(
+                limit=CONNECTIONS_LIMIT,
+                limit_per_host=CONNECTIONS_PER_HOST_LIMIT,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=DNS_CACHE_TTL,
+            )
+        return self._connector
+
+    def _mk_trace(self) -> TraceConfig:
+        stats = self.stats
+
+        async def on_request_start(*_):
+            stats.requests += 1
+
+        async def on_connection_create_end(*_):
+            stats.connections_created += 1
+
+        async def on_connection_reuseconn(*_):
+            stats.connections_reused += 1
+
+        async def on_dns_cache_hit(*_):
+            stats.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(*_):
+            stats.dns_cache_misses += 1
+
+        trace = TraceConfig()
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace.on_dns_cache_miss.append(on_dns_cache_miss)
+        trace.freeze()
+        return trace
+
+
+transport = Transport()
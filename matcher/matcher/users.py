@@ -0,0 +1,46 @@
+import time
+
+from matcher.models.api.dto import User
+
+# In seconds
+USER_CACHE_TTL = 30
+# Invalid tokens are checked again sooner, in case the API could not be reached
+USER_CACHE_NEGATIVE_TTL = 5
+USER_CACHE_CAPACITY = 256
+
+
+class UserCache:
+    # Users of the tokens sent to the HTTP endpoints (None if the token is invalid),
+    # so that polling the admin endpoints does not send a request to the API every time
+    def __init__(
+        self,
+        ttl: float = USER_CACHE_TTL,
+        negative_ttl: float = USER_CACHE_NEGATIVE_TTL,
+        capacity: int = USER_CACHE_CAPACITY,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.capacity = capacity
+        # Ordered by insertion time, oldest first
+        self._entries: dict[str, tuple[float, User | None]] = {}
+
+    # Returns (whether the token is cached, its user)
+    def get(self, token: str) -> tuple[bool, User | None]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return (False, None)
+        (expires_at, user) = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[token]
+            return (False, None)
+        return (True, user)
+
+    def set(self, token: str, user: User | None):
+        ttl = self.ttl if user is not None else self.negative_ttl
+        self._entries.pop(token, None)
+        self._entries[token] = (time.monotonic() + ttl, user)
+        while len(self._entries) > self.capacity:
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, token: str):
+        self._entries.pop(token, None)
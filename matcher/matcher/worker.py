@@ -0,0 +1,38 @@
+# Entrypoint of the worker processes started by the supervisor
+import asyncio
+import signal
+
+from matcher import consume
+from matcher.bootstrap import bootstrap_context
+from matcher.cache import response_cache
+from matcher.context import Context
+from matcher.logger import setup_logging
+from matcher.mq import connect_mq, stop_consuming, stop_mq
+from matcher.tokens import get_token_client
+from matcher.transport import transport
+
+
+async def main():
+    setup_logging()
+    await bootstrap_context()
+    ctx = Context.get()
+    ctx.scheduler.start()
+    await connect_mq(consume)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in [signal.SIGTERM, signal.SIGINT]:
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    await stop_consuming()
+    await ctx.scheduler.stop()
+    ctx.retrier.stop()
+    await stop_mq()
+    await ctx.client.stop_journal()
+    await response_cache.close()
+    await transport.close()
+    if client := get_token_client():
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
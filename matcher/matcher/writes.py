@@ -0,0 +1,42 @@
+import asyncio
+import contextlib
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+type Send = Callable[[str, dict[str, Any]], Awaitable[Any]]
+
+
+class WritePlan:
+    # Writes collected during a match, whose responses are not needed.
+    # They are sent concurrently once the match is done
+    def __init__(self):
+        self._puts: list[tuple[str, dict[str, Any]]] = []
+        self._posts: list[tuple[str, dict[str, Any]]] = []
+
+    def put(self, route: str, json: dict[str, Any]):
+        self._puts.append((route, json))
+
+    def post(self, route: str, json: dict[str, Any]):
+        self._posts.append((route, json))
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._puts) + len(self._posts)
+
+    # Raises the first failure, once all the requests are done
+    async def send(self, put: Send, post: Send):
+        (puts, self._puts) = (self._puts, [])
+        (posts, self._posts) = (self._posts, [])
+        results = await asyncio.gather(
+            *[put(route, json) for (route, json) in puts],
+            *[post(route, json) for (route, json) in posts],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    # Used when the match failed, the original error is the one worth reporting
+    async def send_quietly(self, put: Send, post: Send):
+        with contextlib.suppress(Exception):
+            await self.send(put, post)
@@ -0,0 +1,39 @@
+import os
+from collections.abc import AsyncIterator, Awaitable, Callable
+from unittest import mock
+
+import pytest_asyncio
+from aiohttp import web
+from matcher.api import API
+
+# Starts a local server with the given routes.
+# Returns its base URL, and an API client that uses it
+type StartServer = Callable[[list[web.RouteDef]], Awaitable[tuple[str, API]]]
+
+
+# The servers and their clients are closed at the end of the test
+@pytest_asyncio.fixture
+async def local_server() -> AsyncIterator[StartServer]:
+    runners: list[web.AppRunner] = []
+    clients: list[API] = []
+
+    async def start(routes: list[web.RouteDef]) -> tuple[str, API]:
+        app = web.Application()
+        app.add_routes(routes)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        runners.append(runner)
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        (host, port) = runner.addresses[0]
+        url = f"http://{host}:{port}"
+        with mock.patch.dict(os.environ, {"API_URL": url, "API_KEYS": "abcd"}):
+            client = API()
+        clients.append(client)
+        return (url, client)
+
+    yield start
+    for client in clients:
+        await client.session.close()
+    for runner in runners:
+        await runner.cleanup()
@@ -0,0 +1,51 @@
+import pytest
+from aiohttp import web
+from aiohttp_client_cache import CacheBackend
+from aiohttp_client_cache.session import CachedSession
+from matcher.providers.musicbrainz import CacheIndex
+
+ROUTE = "/ws/2/artist/abcd"
+PARAMS = {"inc": "url-rels", "fmt": "json"}
+
+
+class TestCacheIndex:
+    def test_lookup_is_normalised(self):
+        index = CacheIndex(60)
+        session = object()
+        assert not index.has(session, ROUTE, PARAMS)  # pyright: ignore
+        index.add(session, ROUTE, PARAMS, 0)  # pyright: ignore
+        index.add(session, ROUTE, PARAMS, float("inf"))  # pyright: ignore
+        assert index.has(session, ROUTE, {"fmt": "json", "inc": "url-rels"})  # pyright: ignore
+        assert not index.has(session, ROUTE, {"fmt": "json"})  # pyright: ignore
+        assert not index.has(object(), ROUTE, PARAMS)  # pyright: ignore
+
+    def test_expired_entries_are_dropped(self):
+        index = CacheIndex(0)
+        session = object()
+        for i in range(10):
+            index.add(session, f"/ws/2/artist/{i}", PARAMS, 0)  # pyright: ignore
+        assert not index.has(session, "/ws/2/artist/9", PARAMS)  # pyright: ignore
+        assert len(index) == 1
+
+    def test_entries_are_dropped_with_the_session(self):
+        index = CacheIndex(60)
+        (session, other_session) = (object(), object())
+        index.add(session, ROUTE, PARAMS, float("inf"))  # pyright: ignore
+        index.add(other_session, "/ws/2/artist/efgh", PARAMS, float("inf"))  # pyright: ignore
+        assert len(index) == 1
+        assert not index.has(session, ROUTE, PARAMS)  # pyright: ignore
+
+    @pytest.mark.asyncio
+    async def test_cached_responses_are_detected(self, local_server):
+        async def handler(_: web.Request):
+            return web.json_response({"ok": True})
+
+        (url, _) = await local_server([web.get(ROUTE, handler)])
+        session = CachedSession(base_url=url, cache=CacheBackend())
+        try:
+            async with session.get(ROUTE, params=PARAMS) as response:
+                assert not response.from_cache  # pyright: ignore
+            async with session.get(ROUTE, params=PARAMS) as response:
+                assert response.from_cache  # pyright: ignore
+        finally:
+            await session.close()
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from unittest import mock
+
+import pytest
+from aiohttp import ClientSession, web
+from matcher.lane import Lane, current_lane
+from matcher.providers import rate_limiter
+from matcher.providers.rate_limiter import RateLimiter
+from matcher.providers.session import HasSession
+
+
+class TestRateLimiter:
+    @pytest.mark.asyncio
+    async def test_interactive_requests_overtake_background_ones(self):
+        limiter = RateLimiter("test")
+        limiter.limit_requests = 2
+        limiter.reserved_requests = 1
+
+        async def background_requests():
+            for _ in range(4):
+                await limiter.rate_limit()
+
+        background = asyncio.create_task(background_requests())
+        await asyncio.sleep(0.1)
+        token = current_lane.set(Lane.INTERACTIVE)
+        start = time.monotonic()
+        await limiter.rate_limit()
+        current_lane.reset(token)
+        assert time.monotonic() - start < 0.2
+        await background
+
+    @pytest.mark.asyncio
+    async def test_prefetch_only_uses_spare_requests(self):
+        limiter = RateLimiter("test")
+        limiter.limit_requests = 2
+        limiter.reserved_requests = 1
+        token = current_lane.set(Lane.PREFETCH)
+        await limiter.rate_limit()
+        with pytest.raises(Exception):
+            await limiter.rate_limit()
+        current_lane.reset(token)
+
+    def test_throttled_responses_pause_requests(self):
+        limiter = RateLimiter("test")
+        limiter.observe(429, {"Retry-After": "5"})
+        assert 4 < limiter.pause_remaining() <= 5
+        assert limiter.stats.throttled == 1
+        # Without Retry-After, the pause doubles on each throttled response
+        limiter = RateLimiter("test")
+        limiter.observe(503, {})
+        limiter.observe(503, {})
+        assert limiter.backoff == 2
+        limiter.observe(200, {})
+        assert limiter.backoff == 0
+
+    def test_worker_processes_share_their_pauses(self):
+        token_client = mock.Mock()
+        with mock.patch.object(
+            rate_limiter, "get_token_client", return_value=token_client
+        ):
+            RateLimiter("test").observe(429, {"Retry-After": "5"})
+        token_client.pause.assert_called_once_with("test", 5.0)
+
+    def test_limits_are_read_from_headers(self):
+        limiter = RateLimiter("test")
+        limiter.observe(
+            200, {"X-Discogs-Ratelimit": "25", "X-Discogs-Ratelimit-Remaining": "10"}
+        )
+        assert limiter.limit_interval == 2.4
+        assert not limiter.pause_remaining()
+        limiter.observe(200, {"X-Discogs-Ratelimit-Remaining": "0"})
+        assert limiter.pause_remaining() > 2
+
+    @pytest.mark.asyncio
+    async def test_throttled_requests_are_sent_again(self, local_server):
+        statuses = [429, 200]
+
+        async def handler(_: web.Request):
+            return web.json_response(
+                {"ok": True}, status=statuses.pop(0), headers={"Retry-After": "0.1"}
+            )
+
+        (url, _) = await local_server([web.get("/", handler)])
+
+        class Client(HasSession):
+            rate_limiter_name = "test-client"
+
+            def mk_session(self):
+                return ClientSession(base_url=url)
+
+        client = Client()
+        try:
+            assert await client.send_get("/", None, True) == ({"ok": True}, True)
+            assert client.get_rate_limiter().stats.throttled == 1
+            assert not statuses
+        finally:
+            await client.reset_session()
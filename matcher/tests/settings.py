@@ -1,7 +1,12 @@
 import unittest
 from unittest import mock
 import os
-from matcher.settings import GeniusSettings, MusicBrainzSettings, Settings
+from matcher.settings import (
+    GeniusSettings,
+    MusicBrainzSettings,
+    Settings,
+    parse_rate_limits,
+)
 
 
 class TestSettings(unittest.TestCase):
@@ -40,3 +45,12 @@ class TestSettings(unittest.TestCase):
     def test_missing_api_key_field(self, _):
         with self.assertRaises(Exception):
             Settings()
+
+    def test_parse_rate_limits(self):
+        self.assertEqual(
+            parse_rate_limits("discogs=25/60, Genius=2"),
+            {"discogs": (25, 60.0), "genius": (2, 1.0)},
+        )
+        self.assertEqual(parse_rate_limits(""), {})
+        with self.assertRaises(Exception):
+            parse_rate_limits("discogs")
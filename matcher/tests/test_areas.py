@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from matcher.areas import AreaResolver
+from matcher.models.api.domain import Area
+from matcher.models.api.dto import AreaDto
+
+
+class FakeClient:
+    def __init__(self):
+        self.areas: dict[str, Area] = {}
+        self.gets = 0
+        self.posts = 0
+
+    async def get_area_by_mbid(self, mbid: str) -> Area | None:
+        self.gets += 1
+        await asyncio.sleep(0)
+        return self.areas.get(mbid)
+
+    async def post_area(self, dto: AreaDto) -> Area | None:
+        self.posts += 1
+        await asyncio.sleep(0)
+        area = Area(id=len(self.areas) + 1, name=dto.name, mbid=dto.mbid)
+        self.areas[dto.mbid] = area
+        return area
+
+
+FRANCE = AreaDto(name="France", sort_name="France", mbid="abcd")
+
+
+class TestAreaResolver:
+    @pytest.mark.asyncio
+    async def test_concurrent_resolutions_create_once(self):
+        client = FakeClient()
+        resolver = AreaResolver(client)  # pyright: ignore
+        areas = await asyncio.gather(*[resolver.resolve(FRANCE) for _ in range(5)])
+        assert [a.id for a in areas if a] == [1] * 5
+        assert client.posts == 1
+        assert client.gets == 1
+
+    @pytest.mark.asyncio
+    async def test_resolved_areas_are_cached(self):
+        client = FakeClient()
+        resolver = AreaResolver(client)  # pyright: ignore
+        await resolver.resolve(FRANCE)
+        await resolver.resolve(FRANCE)
+        assert client.gets == 1
+        assert resolver.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_remembered_areas_are_not_fetched(self):
+        client = FakeClient()
+        resolver = AreaResolver(client)  # pyright: ignore
+        resolver.remember(Area(id=4, name="France", mbid="abcd"))
+        area = await resolver.resolve(FRANCE)
+        assert area and area.id == 4
+        assert client.gets == 0
+
+    @pytest.mark.asyncio
+    async def test_expired_areas_are_fetched_again(self):
+        client = FakeClient()
+        resolver = AreaResolver(client, ttl=0)  # pyright: ignore
+        resolver.remember(Area(id=4, name="France", mbid="abcd"))
+        await asyncio.sleep(0.01)
+        area = await resolver.resolve(FRANCE)
+        assert area and area.id == 1
+        assert client.posts == 1
@@ -0,0 +1,143 @@
+import asyncio
+import sqlite3
+import time
+from typing import Any
+
+import pytest
+from matcher.cache import ResponseCache
+
+
+class Counter:
+    def __init__(self, value: Any = "value", cacheable: bool = True):
+        self.calls = 0
+        self.value = value
+        self.cacheable = cacheable
+
+    async def __call__(self):
+        self.calls += 1
+        return (self.value, self.cacheable)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache()
+    cache.open(str(tmp_path / "cache.db"))
+    return cache
+
+
+class TestResponseCache:
+    @pytest.mark.asyncio
+    async def test_disabled_cache_always_fetches(self):
+        cache = ResponseCache()
+        fetch = Counter()
+        for _ in range(2):
+            assert await cache.get_or_fetch("P", "search", "k", 60, fetch) == "value"
+        assert fetch.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_responses_are_served_from_cache(self, cache):
+        fetch = Counter({"a": [1, 2]})
+        for _ in range(3):
+            value = await cache.get_or_fetch("P", "search", "k", 60, fetch)
+            assert value == {"a": [1, 2]}
+        assert fetch.calls == 1
+        assert (cache.stats.hits, cache.stats.misses) == (2, 1)
+        # Keys are scoped by provider
+        await cache.get_or_fetch("Q", "search", "k", 60, fetch)
+        assert fetch.calls == 2
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_responses_are_not_cached(self, cache):
+        fetch = Counter(cacheable=False)
+        await cache.get_or_fetch("P", "search", "k", 60, fetch)
+        await cache.get_or_fetch("P", "search", "k", 60, fetch)
+        assert fetch.calls == 2
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_stale_responses_are_refreshed_in_the_background(self, cache):
+        await cache.get_or_fetch("P", "search", "k", -1, Counter("old"))
+        fetch = Counter("new")
+        assert await cache.get_or_fetch("P", "search", "k", 60, fetch) == "old"
+        assert cache.stats.stale_hits == 1
+        await asyncio.sleep(0)
+        assert fetch.calls == 1
+        assert await cache.get_or_fetch("P", "search", "k", 60, fetch) == "new"
+        assert fetch.calls == 1
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_responses_are_evicted(self, cache):
+        cache.max_size = 100
+        value = "x" * 38
+        await cache.get_or_fetch("P", "search", "a", 60, Counter(value))
+        await asyncio.sleep(0.001)
+        await cache.get_or_fetch("P", "search", "b", 60, Counter(value))
+        await asyncio.sleep(0.001)
+        # 'a' becomes the most recently used response
+        await cache.get_or_fetch("P", "search", "a", 60, Counter(value))
+        await cache.get_or_fetch("P", "search", "c", 60, Counter(value))
+        assert cache.stats.evictions == 1
+        assert cache.size() <= 90
+        fetch = Counter(value)
+        await cache.get_or_fetch("P", "search", "a", 60, fetch)
+        assert fetch.calls == 0
+        await cache.get_or_fetch("P", "search", "b", 60, fetch)
+        assert fetch.calls == 1
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_responses_persist_across_restarts(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = ResponseCache()
+        cache.open(path)
+        await cache.get_or_fetch("P", "resource", "k", 60, Counter())
+        await cache.close()
+        cache = ResponseCache()
+        cache.open(path)
+        fetch = Counter()
+        assert await cache.get_or_fetch("P", "resource", "k", 60, fetch) == "value"
+        assert fetch.calls == 0
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_access_times_are_written_in_batches(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = ResponseCache()
+        cache.open(path)
+        await cache.get_or_fetch("P", "search", "k", 60, Counter())
+        db = sqlite3.connect(path)
+        [(written_at,)] = db.execute("SELECT accessed_at FROM responses").fetchall()
+        await cache.get_or_fetch("P", "search", "k", 60, Counter())
+        assert db.execute("SELECT accessed_at FROM responses").fetchall() == [
+            (written_at,)
+        ]
+        await cache.close()
+        [(accessed_at,)] = db.execute("SELECT accessed_at FROM responses").fetchall()
+        assert accessed_at > written_at
+        db.close()
+
+    @pytest.mark.asyncio
+    async def test_locked_file_does_not_block_the_event_loop(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = ResponseCache()
+        cache.open(path)
+        # Another process is writing to the file
+        other = sqlite3.connect(path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+
+        async def release():
+            await asyncio.sleep(0.1)
+            other.execute("COMMIT")
+
+        start = time.monotonic()
+        await asyncio.gather(
+            cache.get_or_fetch("P", "search", "k", 60, Counter()), release()
+        )
+        assert time.monotonic() - start < 1
+        fetch = Counter()
+        await cache.get_or_fetch("P", "search", "k", 60, fetch)
+        assert fetch.calls == 0
+        await cache.close()
+        other.close()
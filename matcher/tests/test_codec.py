@@ -0,0 +1,97 @@
+import jsons
+import pytest
+from matcher.models.api.domain import Album, Area, Artist, File, Label, Song
+from matcher.models.api.dto import (
+    AreaDto,
+    CreateProviderDto,
+    ExternalMetadataDto,
+    ExternalMetadataSourceDto,
+    LabelDto,
+    UpdateAlbumDto,
+    UpdateAreaDto,
+    UpdateLabelDto,
+)
+from matcher.models.codec import dump, load
+from matcher.models.event import Event
+from matcher.providers.domain import AreaType
+
+
+class TestCodec:
+    @pytest.mark.parametrize(
+        "cls,obj",
+        [
+            (
+                Album,
+                {
+                    "id": 1,
+                    "name": "Album",
+                    "type": "LiveRecording",
+                    "releaseDate": "2020-01-01",
+                    "unknownKey": True,
+                    "artists": [
+                        {
+                            "id": 2,
+                            "name": "A",
+                            "localIdentifiers": {"musicbrainzId": "m"},
+                        }
+                    ],
+                    "localIdentifiers": None,
+                },
+            ),
+            (Album, {"id": 1, "name": "Album"}),
+            (Artist, {"id": 2, "name": "A", "slug": "a"}),
+            (
+                Song,
+                {
+                    "id": 1,
+                    "name": "Song",
+                    "artist": {"id": 2, "name": "A"},
+                    "featuring": [{"id": 3, "name": "B"}],
+                    "master": {"sourceFileId": 3, "duration": 120, "bitrate": 320},
+                },
+            ),
+            (File, {"fingerprint": "abc", "path": "a.flac"}),
+            (File, {}),
+            (Area, {"id": 1, "name": "France", "mbid": "m", "type": "Country"}),
+            (Label, {"id": 1, "name": "Label"}),
+            (
+                ExternalMetadataDto,
+                {
+                    "description": "Description",
+                    "rating": None,
+                    "sources": [{"url": "https://a.b", "providerId": 2}],
+                    "albumId": 3,
+                },
+            ),
+        ],
+    )
+    def test_load_is_same_as_dataclasses_json(self, cls, obj):
+        assert load(cls, obj) == cls.schema().load(obj)
+
+    def test_load_event_is_same_as_jsons(self):
+        obj = {"type": "album", "name": "Album", "id": 1, "priority": 3}
+        assert load(Event, obj) == jsons.load(obj, Event)
+
+    @pytest.mark.parametrize(
+        "obj", [{"id": 1}, {"id": 1, "name": "Album", "type": None}]
+    )
+    def test_load_rejects_invalid_objects(self, obj):
+        with pytest.raises(Exception):
+            load(Album, obj)
+
+    @pytest.mark.parametrize(
+        "dto",
+        [
+            ExternalMetadataDto(
+                "Description", None, [ExternalMetadataSourceDto("u", 1)], album_id=3
+            ),
+            UpdateAlbumDto("2020-01-01", ["Rock"], [LabelDto("Label", "m")], "EP"),
+            UpdateAlbumDto(),
+            AreaDto("France", "France", "m", "FR", AreaType.COUNTRY),
+            UpdateAreaDto(3, None),
+            UpdateLabelDto("2000-01-01", None, "m", 2),
+            CreateProviderDto("Genius"),
+        ],
+    )
+    def test_dump_is_same_as_dataclasses_json(self, dto):
+        assert dump(dto) == dto.to_dict()
@@ -0,0 +1,54 @@
+from matcher.matcher.common import (
+    are_lyrics_unchanged,
+    get_new_genres,
+    is_metadata_unchanged,
+)
+from matcher.models import codec
+from matcher.models.api.domain import Genre, Lyrics, Song, SyncedLyric
+from matcher.models.api.dto import ExternalMetadataDto, ExternalMetadataSourceDto
+
+
+def mk_metadata(description: str | None, urls: list[str]) -> ExternalMetadataDto:
+    return ExternalMetadataDto(
+        description=description,
+        rating=None,
+        sources=[ExternalMetadataSourceDto(url, i) for (i, url) in enumerate(urls)],
+        song_id=1,
+    )
+
+
+class TestDiff:
+    def test_metadata(self):
+        metadata = mk_metadata("Hello", ["a", "b"])
+        assert not is_metadata_unchanged(metadata, None)
+        assert is_metadata_unchanged(metadata, mk_metadata("Hello", ["a", "b"]))
+        assert not is_metadata_unchanged(metadata, mk_metadata("Hello", ["a"]))
+        assert not is_metadata_unchanged(metadata, mk_metadata("Hi", ["a", "b"]))
+
+    def test_genres(self):
+        existing = [Genre(1, "Hip-Hop"), Genre(2, "Pop")]
+        assert get_new_genres(["Hip Hop", "pop", "Rock"], existing) == ["Rock"]
+        assert get_new_genres(["Pop"], None) == ["Pop"]
+
+    def test_lyrics(self):
+        lyrics = Lyrics("a\nb", [SyncedLyric(1.0, "a"), SyncedLyric(2.5, "b")])
+        assert are_lyrics_unchanged("a\nb", [(1.0, "a"), (2.5, "b")], lyrics)
+        assert not are_lyrics_unchanged("a\nb", None, lyrics)
+        assert are_lyrics_unchanged("a\nb", None, Lyrics("a\nb", None))
+        assert not are_lyrics_unchanged("a\nc", None, Lyrics("a\nb", None))
+        assert not are_lyrics_unchanged("a\nb", None, None)
+
+    def test_song_lyrics_and_genres_are_decoded(self):
+        song = codec.load(
+            Song,
+            {
+                "id": 1,
+                "name": "Song",
+                "artist": {"id": 1, "name": "Artist"},
+                "featuring": [],
+                "genres": [{"id": 1, "name": "Pop", "slug": "pop"}],
+                "lyrics": {"plain": "a", "synced": [{"timestamp": 1, "content": "a"}]},
+            },
+        )
+        assert song.genres == [Genre(1, "Pop")]
+        assert song.lyrics == Lyrics("a", [SyncedLyric(1, "a")])
@@ -0,0 +1,78 @@
+import pytest
+from matcher.matcher import album, artist, common, song
+from matcher.models.api.domain import Album, Artist, Genre, Lyrics, Song
+from matcher.models.api.dto import ExternalMetadataDto
+from matcher.providers.features import (
+    GetAlbumDescriptionFeature,
+    GetAlbumGenresFeature,
+    GetAlbumRatingFeature,
+    GetAlbumReleaseDateFeature,
+    GetArtistDescriptionFeature,
+    GetArtistIllustrationUrlFeature,
+    GetPlainSongLyricsFeature,
+    GetSongGenresFeature,
+)
+
+
+class FakeProvider:
+    def __init__(self, features: list[type]):
+        self.features = features
+
+    def get_feature(self, feature: type):
+        return feature if feature in self.features else None
+
+
+METADATA = ExternalMetadataDto(description="Hello", rating=None, sources=[])
+
+
+class TestIncremental:
+    def test_known_album_features(self):
+        known = album.get_known_features(
+            Album(1, "Album", release_date="2008-06-15", genres=[Genre(1, "Pop")]),
+            METADATA,
+        )
+        assert known == {
+            GetAlbumDescriptionFeature,
+            GetAlbumReleaseDateFeature,
+            GetAlbumGenresFeature,
+        }
+        assert (
+            album.get_known_features(Album(1, "Album", release_date="2008-01-01"), None)
+            == set()
+        )
+
+    def test_known_song_features(self):
+        known = song.get_known_features(
+            Song(1, "Song", Artist(1, "Artist"), [], lyrics=Lyrics("a")), None
+        )
+        assert known == {GetPlainSongLyricsFeature}
+
+    def test_known_artist_features(self):
+        known = artist.get_known_features(
+            Artist(1, "Artist", illustration_id=2), METADATA
+        )
+        assert known == {GetArtistDescriptionFeature, GetArtistIllustrationUrlFeature}
+
+    @pytest.mark.asyncio
+    async def test_known_features_are_not_run(self):
+        provider = FakeProvider([GetAlbumRatingFeature, GetSongGenresFeature])
+        results = []
+
+        async def get(_):
+            return 1
+
+        with common.skipping_known_features({GetAlbumRatingFeature}):
+            for feature in [GetAlbumRatingFeature, GetSongGenresFeature]:
+                await common.bind_feature_to_result(
+                    feature,
+                    provider,  # pyright: ignore
+                    lambda: True,
+                    get,
+                    lambda r, feature=feature: results.append(feature),
+                )
+        assert results == [GetSongGenresFeature]
+
+    def test_sources_to_reuse(self):
+        assert common.get_sources_to_reuse(None, False, True) is None
+        assert common.get_sources_to_reuse(None, True, False) == []
+        assert common.get_sources_to_reuse(METADATA, False, False) is None
@@ -0,0 +1,24 @@
+from matcher.jobs import Job, JobItem, JobItemStatus, JobRegistry
+
+
+class TestJobs:
+    def test_status(self):
+        job = Job([JobItem("album", 1), JobItem("song", 2)], False)
+        assert job.status == JobItemStatus.PENDING
+        job.items[0].start()
+        assert job.status == JobItemStatus.RUNNING
+        job.items[0].finish(JobItemStatus.DONE)
+        assert job.status == JobItemStatus.RUNNING
+        assert job.items[0].duration is not None
+        job.items[1].start()
+        job.items[1].finish(JobItemStatus.FAILED)
+        assert job.status == JobItemStatus.FAILED
+
+    def test_registry_only_keeps_recent_jobs(self):
+        registry = JobRegistry(2)
+        jobs = [Job([JobItem("artist", i)], False) for i in range(3)]
+        for job in jobs:
+            registry.add(job)
+        assert registry.get(jobs[0].id) is None
+        assert registry.get(jobs[1].id) is jobs[1]
+        assert registry.get(jobs[2].id) is jobs[2]
@@ -0,0 +1,116 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+from matcher.journal import RejectedWrite, WriteJournal
+from matcher.supervisor import adopt_orphan_journals
+
+
+class TestWriteJournal:
+    @pytest.mark.asyncio
+    async def test_writes_are_replayed_in_order(self, tmp_path: Path):
+        replayed: list[tuple[str, str, dict]] = []
+
+        async def replay(method: str, route: str, body: dict):
+            replayed.append((method, route, body))
+
+        journal = WriteJournal(str(tmp_path / "journal.db"))
+        journal.start(replay)
+        journal.append("PUT", "/songs/1", {"genres": ["Pop"]})
+        journal.append("POST", "/songs/1/lyrics", {"plain": "a"})
+        journal.append("PUT", "/songs/1", {"genres": ["Rock"]})
+        await asyncio.sleep(0.05)
+        await journal.stop()
+        assert [r for r in replayed if r[1] == "/songs/1"] == [
+            ("PUT", "/songs/1", {"genres": ["Pop"]}),
+            ("PUT", "/songs/1", {"genres": ["Rock"]}),
+        ]
+        assert len(replayed) == 3
+
+    @pytest.mark.asyncio
+    async def test_unsent_writes_survive_restarts(self, tmp_path: Path):
+        path = str(tmp_path / "journal.db")
+        replayed: list[str] = []
+
+        async def fail(*_):
+            raise Exception("API is down")
+
+        async def replay(_: str, route: str, __: dict):
+            replayed.append(route)
+
+        journal = WriteJournal(path)
+        journal.start(fail)
+        journal.append("PUT", "/albums/1", {"type": "Live"})
+        await asyncio.sleep(0.05)
+        await journal.stop()
+        assert replayed == []
+
+        journal = WriteJournal(path)
+        assert journal.pending_count() == 1
+        # The failed write waits for its backoff
+        journal._db.execute("UPDATE writes SET retry_at = 0")
+        journal.start(replay)
+        await asyncio.sleep(0.05)
+        assert replayed == ["/albums/1"]
+        assert journal.pending_count() == 0
+        await journal.stop()
+
+    @pytest.mark.asyncio
+    async def test_failed_write_blocks_its_resource_only(self, tmp_path: Path):
+        replayed: list[str] = []
+
+        async def replay(method: str, route: str, body: dict):
+            if body.get("songId") == 1:
+                raise Exception("API is restarting")
+            replayed.append(f"{method} {route} {body}")
+
+        journal = WriteJournal(str(tmp_path / "journal.db"))
+        journal.start(replay)
+        journal.append("POST", "/external-metadata", {"songId": 1})
+        journal.append("POST", "/external-metadata", {"songId": 1, "rating": 1})
+        journal.append("POST", "/external-metadata", {"songId": 2})
+        await asyncio.sleep(0.05)
+        assert replayed == ["POST /external-metadata {'songId': 2}"]
+        # The second write of the song waits for the first one
+        assert journal.pending_count() == 2
+        await journal.stop()
+
+    @pytest.mark.asyncio
+    async def test_only_rejected_writes_are_dropped(self, tmp_path: Path):
+        replayed: list[str] = []
+
+        async def replay(method: str, route: str, _: dict):
+            if route == "/albums/1" and method == "POST":
+                raise RejectedWrite("Not found")
+            if route == "/albums/2":
+                raise Exception("API is restarting")
+            replayed.append(f"{method} {route}")
+
+        journal = WriteJournal(str(tmp_path / "journal.db"))
+        journal.start(replay)
+        journal.append("POST", "/albums/1", {})
+        journal.append("PUT", "/albums/1", {})
+        journal.append("PUT", "/albums/2", {})
+        journal._db.execute("UPDATE writes SET attempts = 100")
+        await asyncio.sleep(0.05)
+        # The rejected write was dropped, then the next one was sent
+        assert replayed == ["PUT /albums/1"]
+        assert journal.dropped_count == 1
+        # However many times it failed, the other write is kept
+        assert journal.pending_count() == 1
+        await journal.stop()
+
+    @pytest.mark.asyncio
+    async def test_journals_of_removed_processes_are_adopted(self, tmp_path: Path):
+        path = str(tmp_path / "journal.db")
+        for index in [1, 2]:
+            worker_journal = WriteJournal(f"{path}.{index}")
+            worker_journal.append("PUT", f"/songs/{index}", {"genres": ["Pop"]})
+            await worker_journal.stop()
+        journal = WriteJournal(path)
+        adopt_orphan_journals(journal, 2)
+        assert journal.pending_count() == 1
+        assert not os.path.exists(f"{path}.2")
+        assert os.path.exists(f"{path}.1")
+        await journal.stop()
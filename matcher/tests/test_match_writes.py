@@ -0,0 +1,100 @@
+import os
+from unittest import mock
+
+import pytest
+from matcher.api import API
+from matcher.context import Context
+from matcher.matcher import artist, song
+from matcher.models.api.domain import Area, Artist, LocalIdentifiers, Lyrics, Song
+from matcher.models.api.dto import ExternalMetadataDto
+from matcher.models.match_result import (
+    ArtistMatchResult,
+    LyricsMatchResult,
+    SongMatchResult,
+)
+from matcher.settings import Settings
+
+AREA = Area(id=1, name="France", mbid="08310658-51eb-3801-80de-5a0739207115")
+
+
+@pytest.fixture(autouse=True)
+def context():
+    with mock.patch.dict(
+        os.environ,
+        {
+            "INTERNAL_CONFIG_DIR": "tests/assets",
+            "API_URL": "http://localhost",
+            "API_KEYS": "abcd",
+        },
+    ):
+        Context.init(API(), Settings(), [])
+    client = Context.get().client
+    with (
+        mock.patch.object(client, "get_artist_external_metadata", return_value=None),
+        mock.patch.object(client, "post_artist_illustration") as post_illustration,
+        mock.patch.object(client, "link_artist_to_area") as link_to_area,
+        mock.patch.object(Context.get().areas, "resolve", return_value=AREA),
+    ):
+        yield (post_illustration, link_to_area)
+
+
+async def match_and_post_artist(stored: Artist):
+    result = ArtistMatchResult(
+        ExternalMetadataDto(None, None, []),
+        "https://example.com/artist.jpg",
+        mock.sentinel.activity_area,
+        None,
+    )
+    with (
+        mock.patch.object(Context.get().client, "get_artist", return_value=stored),
+        mock.patch.object(artist, "match_artist", return_value=result),
+    ):
+        await artist.match_and_post_artist(1, "Artist", LocalIdentifiers(), False)
+
+
+class TestArtistWrites:
+    @pytest.mark.asyncio
+    async def test_new_data_is_written(self, context):
+        (post_illustration, link_to_area) = context
+        await match_and_post_artist(Artist(id=1, name="Artist"))
+        post_illustration.assert_awaited_once()
+        link_to_area.assert_awaited_once_with(1, AREA.id, None)
+
+    @pytest.mark.asyncio
+    async def test_known_data_is_not_written_again(self, context):
+        (post_illustration, link_to_area) = context
+        await match_and_post_artist(
+            Artist(id=1, name="Artist", illustration_id=2, activity_area_id=AREA.id)
+        )
+        post_illustration.assert_not_awaited()
+        link_to_area.assert_not_awaited()
+
+
+class TestSongWrites:
+    @pytest.mark.asyncio
+    async def test_known_plain_lyrics_are_kept_when_synced_ones_are_found(self):
+        client = Context.get().client
+        stored = Song(
+            id=1,
+            name="Song",
+            artist=Artist(id=1, name="Artist"),
+            featuring=[],
+            genres=[],
+            lyrics=Lyrics(plain="Stored lyrics"),
+        )
+        result = SongMatchResult(
+            ExternalMetadataDto(None, None, []), LyricsMatchResult(None, None), []
+        )
+        result.set_synced_lyrics([(0.0, "Found"), (1.0, "lyrics")])
+        with (
+            mock.patch.object(client, "get_song", return_value=stored),
+            mock.patch.object(client, "get_song_external_metadata", return_value=None),
+            mock.patch.object(client, "post_song_lyrics") as post_lyrics,
+            mock.patch.object(song, "match_song", return_value=result),
+        ):
+            await song.match_and_post_song(
+                1, "Song", LocalIdentifiers(), False, incremental=True
+            )
+        post_lyrics.assert_awaited_once_with(
+            1, "Stored lyrics", [(0.0, "Found"), (1.0, "lyrics")]
+        )
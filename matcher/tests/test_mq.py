@@ -0,0 +1,67 @@
+import asyncio
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from matcher import mq
+from matcher.api import API
+from matcher.context import Context
+from matcher.settings import Settings
+
+
+@pytest.fixture(autouse=True)
+def channel(monkeypatch):
+    with mock.patch.dict(
+        os.environ,
+        {
+            "INTERNAL_CONFIG_DIR": "tests/assets",
+            "API_URL": "http://localhost",
+            "API_KEYS": "abcd",
+        },
+    ):
+        Context.init(API(), Settings(), [])
+    channel = mock.AsyncMock()
+    channel.queue_declare.return_value = SimpleNamespace(
+        queue=mq.queue_name, message_count=7
+    )
+    channel.basic_consume.return_value = SimpleNamespace(consumer_tag="tag")
+    # Restored after the test
+    monkeypatch.setenv("RABBITMQ_URL", "amqp://localhost")
+    monkeypatch.setattr(mq, "channel", None)
+    monkeypatch.setattr(mq, "consumer_tag", None)
+    monkeypatch.setattr(mq, "queue_size_sampler", None)
+    return channel
+
+
+async def connect(channel) -> mock.AsyncMock:
+    connection = mock.AsyncMock()
+    connection.channel.return_value = channel
+    callback = mock.AsyncMock()
+    with mock.patch.object(mq.aiormq, "connect", return_value=connection):
+        await mq.connect_mq(callback)
+    return callback
+
+
+class TestQueueSize:
+    @pytest.mark.asyncio
+    async def test_sampled_size_is_stored(self, channel):
+        await connect(channel)
+        await asyncio.sleep(0)
+        assert Context.get().pending_items_count == 7
+        await mq.stop_mq()
+
+    @pytest.mark.asyncio
+    async def test_deliveries_decrement_the_size(self, channel):
+        callback = await connect(channel)
+        await asyncio.sleep(0)
+        on_message = channel.basic_consume.call_args.args[1]
+        ctx = Context.get()
+        ctx.pending_items_count = 1
+        await on_message(mock.sentinel.message)
+        assert ctx.pending_items_count == 0
+        # Until the next sample, e.g. when messages were published since the last one
+        await on_message(mock.sentinel.message)
+        assert ctx.pending_items_count == 0
+        callback.assert_awaited_with(mock.sentinel.message, channel)
+        await mq.stop_mq()
@@ -0,0 +1,105 @@
+import os
+from unittest import mock
+
+import pytest
+from matcher.api import API
+from matcher.context import Context
+from matcher.matcher import album, common, label, planner
+from matcher.models.api.dto import ExternalMetadataSourceDto
+from matcher.models.api.provider import Provider
+from matcher.providers.factory import ProviderFactory
+from matcher.providers.features import (
+    GetAlbumDescriptionFeature,
+    GetAlbumReleaseDateFeature,
+)
+from matcher.settings import Settings
+
+MUSICBRAINZ_SOURCE = ExternalMetadataSourceDto("https://musicbrainz.org/", 1)
+GENIUS_SOURCE = ExternalMetadataSourceDto("https://genius.com/albums/a/b", 2)
+
+
+@pytest.fixture(autouse=True)
+def context():
+    with mock.patch.dict(
+        os.environ,
+        {
+            "INTERNAL_CONFIG_DIR": "tests/assets",
+            "API_URL": "http://localhost",
+            "API_KEYS": "abcd",
+        },
+    ):
+        settings = Settings()
+        api = API()
+    # Genius (ID 2) and MusicBrainz (ID 1)
+    providers = [
+        ProviderFactory.buildProvider(
+            Provider(id=2 - i, name=s.name, slug=s.name, illustration_id=None), s
+        )
+        for (i, s) in enumerate(settings.provider_settings)
+    ]
+    Context.init(api, settings, providers)
+
+
+class TestPlanner:
+    def test_providers_that_cannot_serve_the_resource_are_skipped(self):
+        plan = planner.plan_tasks(
+            "label", "Label", [], label.LABEL_FEATURES, link_sources=False
+        )
+        assert [c.provider.api_model.name for c in plan.calls] == ["MusicBrainz"]
+        assert plan.skipped == {"Genius": "cannot serve label"}
+
+    def test_providers_are_searched_to_link_sources(self):
+        plan = planner.plan_tasks("album", "Album", [], album.ALBUM_FEATURES)
+        assert [(c.provider.api_model.name, c.source) for c in plan.calls] == [
+            ("Genius", None),
+            ("MusicBrainz", None),
+        ]
+        genius_call = plan.calls[0]
+        assert genius_call.features == [GetAlbumReleaseDateFeature]
+
+    def test_only_known_sources_are_used_when_reused(self):
+        plan = planner.plan_tasks(
+            "album", "Album", [GENIUS_SOURCE], album.ALBUM_FEATURES, sources_only=True
+        )
+        assert [c.source for c in plan.calls] == [GENIUS_SOURCE]
+        assert plan.skipped == {"MusicBrainz": "no known source"}
+
+    def test_sources_are_kept_when_their_data_is_known(self):
+        with common.skipping_known_features({GetAlbumReleaseDateFeature}):
+            plan = planner.plan_tasks(
+                "album",
+                "Album",
+                [MUSICBRAINZ_SOURCE, GENIUS_SOURCE],
+                album.ALBUM_FEATURES,
+            )
+        assert plan.known_sources == [GENIUS_SOURCE]
+        assert [c.provider.api_model.name for c in plan.calls] == ["MusicBrainz"]
+        assert GetAlbumReleaseDateFeature not in plan.calls[0].features
+        assert {"provider id": 2, "action": "keep source"} in plan.describe()
+
+    @pytest.mark.asyncio
+    async def test_only_planned_features_are_run(self):
+        plan = planner.plan_tasks("album", "Album", [], album.ALBUM_FEATURES)
+        results = []
+
+        async def get(_):
+            return 1
+
+        await planner.run_features(
+            plan.calls[0],
+            [
+                planner.FeatureBinding(
+                    f, lambda: True, get, lambda _, f=f: results.append(f)
+                )
+                for f in [GetAlbumDescriptionFeature, GetAlbumReleaseDateFeature]
+            ]
+            + [
+                planner.FeatureBinding(
+                    GetAlbumReleaseDateFeature,
+                    lambda: False,
+                    get,
+                    lambda _: results.append(None),
+                )
+            ],
+        )
+        assert results == [GetAlbumReleaseDateFeature]
@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+from matcher.lane import Lane
+from matcher.pool import Coalescer, MatchPool
+
+
+class TestMatchPool:
+    @pytest.mark.asyncio
+    async def test_same_resource_does_not_overlap(self):
+        pool = MatchPool(4, 1)
+        running = 0
+        max_running = 0
+
+        async def match():
+            nonlocal running, max_running
+            async with pool.slot(("album", 1)):
+                running += 1
+                max_running = max(max_running, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*[match() for _ in range(3)])
+        assert max_running == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        pool = MatchPool(2, 1)
+        running = 0
+        max_running = 0
+
+        async def match(id: int):
+            nonlocal running, max_running
+            async with pool.slot(("song", id)):
+                running += 1
+                max_running = max(max_running, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*[match(i) for i in range(6)])
+        assert max_running == 2
+
+    @pytest.mark.asyncio
+    async def test_interactive_lane_is_reserved(self):
+        pool = MatchPool(1, 1)
+        background_started = asyncio.Event()
+        release_background = asyncio.Event()
+
+        async def background_match():
+            async with pool.slot(("song", 1)):
+                background_started.set()
+                await release_background.wait()
+
+        background = asyncio.create_task(background_match())
+        await background_started.wait()
+        async with asyncio.timeout(1):
+            async with pool.slot(("song", 2), Lane.INTERACTIVE):
+                pass
+        release_background.set()
+        await background
+
+    @pytest.mark.asyncio
+    async def test_locks_are_released(self):
+        pool = MatchPool(1, 1)
+        async with pool.slot(("artist", 1)):
+            pass
+        assert pool._locks == {}
+
+
+class TestCoalescer:
+    def test_pending_duplicates_are_coalesced(self):
+        coalescer = Coalescer(0)
+        assert coalescer.admit(("album", 1))
+        assert not coalescer.admit(("album", 1))
+        assert coalescer.admit(("song", 1))
+        assert coalescer.coalesced_count == 1
+
+    def test_no_window(self):
+        coalescer = Coalescer(0)
+        assert coalescer.admit(("album", 1))
+        coalescer.release(("album", 1))
+        assert coalescer.admit(("album", 1))
+
+    def test_recently_matched_resources_are_skipped(self):
+        coalescer = Coalescer(0.05)
+        assert coalescer.admit(("artist", 1))
+        coalescer.release(("artist", 1))
+        assert not coalescer.admit(("artist", 1))
+        time.sleep(0.06)
+        assert coalescer.admit(("artist", 1))
+        assert coalescer.coalesced_count == 1
+
+    @pytest.mark.asyncio
+    async def test_pending_event_is_set_on_release(self):
+        coalescer = Coalescer(0)
+        assert coalescer.pending(("album", 1)) is None
+        coalescer.hold(("album", 1))
+        pending = coalescer.pending(("album", 1))
+        assert pending is not None and not pending.is_set()
+        coalescer.release(("album", 1))
+        assert pending.is_set()
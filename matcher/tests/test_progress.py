@@ -0,0 +1,21 @@
+from matcher.progress import ProgressBroadcaster
+
+
+class TestProgressBroadcaster:
+    def test_publish(self):
+        broadcaster = ProgressBroadcaster()
+        assert not broadcaster.has_subscribers()
+        with broadcaster.subscribe() as events:
+            assert broadcaster.has_subscribers()
+            broadcaster.publish("match", {"id": 1})
+            event = events.get_nowait()
+            assert event.name == "match"
+            assert event.data == {"id": 1}
+        assert not broadcaster.has_subscribers()
+
+    def test_slow_subscribers_lose_oldest_events(self):
+        broadcaster = ProgressBroadcaster(backlog=2)
+        with broadcaster.subscribe() as events:
+            for i in range(3):
+                broadcaster.publish("match", i)
+            assert [events.get_nowait().data for _ in range(2)] == [1, 2]
@@ -0,0 +1,56 @@
+from matcher.models.api.provider import Provider
+from matcher.providers.features import (
+    GetArea,
+    GetArtistUrlFromIdFeature,
+    GetUrlFromIdFeature,
+    GetWikidataRelationKeyFeature,
+)
+from matcher.providers.genius import GeniusProvider
+from matcher.providers.musicbrainz import MusicBrainzProvider
+from matcher.providers.registry import ProviderRegistry
+from matcher.settings import GeniusSettings, MusicBrainzSettings
+
+MUSICBRAINZ = MusicBrainzProvider(
+    Provider(1, "MusicBrainz", "musicbrainz", None), MusicBrainzSettings("MusicBrainz")
+)
+GENIUS = GeniusProvider(
+    Provider(2, "Genius", "genius", None), GeniusSettings("Genius", "x")
+)
+
+
+class TestFeatureDispatch:
+    def test_same_feature_as_isinstance_scan(self):
+        for t in [GetArtistUrlFromIdFeature, GetUrlFromIdFeature, GetArea]:
+            expected = [f for f in MUSICBRAINZ.features if isinstance(f, t)]
+            assert MUSICBRAINZ.get_feature(t) is (expected[0] if expected else None)
+
+    def test_missing_feature(self):
+        assert GENIUS.get_feature(GetArea) is None
+        assert not GENIUS.has_feature(GetArea)
+        assert GENIUS.has_feature(GetWikidataRelationKeyFeature)
+
+    def test_index_follows_features(self):
+        provider = GeniusProvider(
+            Provider(2, "Genius", "genius", None), GeniusSettings("Genius", "x")
+        )
+        assert provider.has_feature(GetArtistUrlFromIdFeature)
+        provider.features = []
+        assert not provider.has_feature(GetArtistUrlFromIdFeature)
+
+
+class TestProviderRegistry:
+    def test_lookups(self):
+        registry = ProviderRegistry([MUSICBRAINZ, GENIUS])
+        assert registry.get_by_id(2) is GENIUS
+        assert registry.get_by_id(3) is None
+        assert registry.get_by_type(MusicBrainzProvider) is MUSICBRAINZ
+        assert registry.get_by_type(GeniusProvider) is GENIUS
+
+    def test_resources(self):
+        registry = ProviderRegistry([MUSICBRAINZ, GENIUS])
+        assert registry.get_for_resource("area") == [MUSICBRAINZ]
+        assert registry.get_for_resource("label") == [MUSICBRAINZ]
+        assert registry.get_for_resource("song") == [MUSICBRAINZ, GENIUS]
+        assert "GetArea" in registry.capability_matrix()["MusicBrainz"]
+        # Built once, with the other lookup tables
+        assert registry.capability_matrix() is registry.capability_matrix()
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+
+class TestRequestScope:
+    @pytest.mark.asyncio
+    async def test_gets_are_sent_once_per_scope(self, local_server):
+        hits: list[str] = []
+
+        async def handler(request: web.Request):
+            hits.append(request.method)
+            return web.json_response({"ok": True})
+
+        (_, api) = await local_server(
+            [web.get("/albums/1", handler), web.put("/albums/1", handler)]
+        )
+        with api.request_scope():
+            await asyncio.gather(api._get("/albums/1"), api._get("/albums/1"))
+            assert hits == ["GET"]
+            # Writes invalidate the responses
+            await api._put("/albums/1")
+            await api._get("/albums/1")
+            assert hits == ["GET", "PUT", "GET"]
+        await api._get("/albums/1")
+        assert hits == ["GET", "PUT", "GET", "GET"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_gets_share_a_request(self, local_server):
+        hits: list[str] = []
+
+        async def handler(request: web.Request):
+            hits.append(request.path)
+            await asyncio.sleep(0.01)
+            return web.json_response({"path": request.path})
+
+        (_, api) = await local_server([web.get("/albums/{id}", handler)])
+        responses = await asyncio.gather(
+            api._get("/albums/1"), api._get("/albums/1"), api._get("/albums/2")
+        )
+        assert [r["path"] for r in responses] == ["/albums/1"] * 2 + ["/albums/2"]
+        assert sorted(hits) == ["/albums/1", "/albums/2"]
+        # Once received, a response is not reused
+        await api._get("/albums/1")
+        assert len(hits) == 3
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+from matcher.retry import Retrier
+
+
+class TestRetrier:
+    @pytest.mark.asyncio
+    async def test_retries_with_backoff(self):
+        retrier = Retrier(0.01, 2)
+        retried_at: list[float] = []
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        def retry():
+            retried_at.append(loop.time() - start)
+
+        assert retrier.schedule(("album", 1), retry)
+        await asyncio.sleep(0.05)
+        assert retrier.schedule(("album", 1), retry)
+        await asyncio.sleep(0.05)
+        assert not retrier.schedule(("album", 1), retry)
+        assert len(retried_at) == 2
+        # Second attempt was scheduled after 0.05s, with twice the delay
+        assert retried_at[1] >= 0.05 + 0.02
+
+    @pytest.mark.asyncio
+    async def test_forget_cancels_retry(self):
+        retrier = Retrier(0.01, 2)
+        retried: list[bool] = []
+        retrier.schedule(("song", 1), lambda: retried.append(True))
+        assert retrier.pending_count() == 1
+        retrier.forget(("song", 1))
+        await asyncio.sleep(0.03)
+        assert retried == []
+        assert retrier.attempts(("song", 1)) == 0
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from matcher.scheduler import Scheduler
+
+
+class TestScheduler:
+    @pytest.mark.asyncio
+    async def test_order(self):
+        scheduler = Scheduler(1)
+        order: list[str] = []
+
+        async def noop():
+            pass
+
+        def run(name: str):
+            async def f():
+                order.append(name)
+
+            return f
+
+        scheduler.push("song", 1, run("low priority song"), noop)
+        scheduler.push("album", 4, run("studio album"), noop)
+        scheduler.push("artist", 4, run("artist"), noop)
+        scheduler.push("song", 3, run("original song"), noop)
+        scheduler.push("song", 3, run("other original song"), noop)
+        scheduler.start()
+        while scheduler.pending_count():
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        assert order == [
+            "artist",
+            "studio album",
+            "original song",
+            "other original song",
+            "low priority song",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_unrun_tasks_are_dropped_on_stop(self):
+        scheduler = Scheduler(1)
+        dropped: list[int] = []
+
+        async def block():
+            await asyncio.sleep(10)
+
+        def drop(i: int):
+            async def f():
+                dropped.append(i)
+
+            return f
+
+        for i in range(3):
+            scheduler.push("album", 1, block, drop(i))
+        scheduler.start()
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        assert sorted(dropped) == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_upcoming_tasks_are_prefetched(self):
+        scheduler = Scheduler(1, 2)
+        prefetched: list[int] = []
+        release = asyncio.Event()
+
+        async def noop():
+            pass
+
+        async def block():
+            await release.wait()
+
+        def prefetch(i: int):
+            async def f():
+                prefetched.append(i)
+
+            return f
+
+        scheduler.start()
+        for i in range(5):
+            scheduler.push("album", 1, block, noop, prefetch(i))
+        await asyncio.sleep(0.01)
+        # The first task is running, the next two are in the lookahead window
+        assert prefetched == [1, 2]
+        release.set()
+        while scheduler.pending_count():
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        assert prefetched == [1, 2, 3, 4]
@@ -0,0 +1,55 @@
+import asyncio
+import os
+import tempfile
+import time
+
+import pytest
+from matcher.lane import Lane
+from matcher.providers.rate_limiter import RateLimiter
+from matcher.tokens import TokenClient, TokenServer
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.calls = 0
+
+    async def rate_limit(self):
+        self.calls += 1
+
+    def pause(self, delay: float):
+        pass
+
+
+class TestTokens:
+    @pytest.mark.asyncio
+    async def test_client_acquires_tokens_from_server(self):
+        path = os.path.join(tempfile.mkdtemp(), "tokens.sock")
+        limiter = CountingLimiter()
+        server = TokenServer(path, {"counting": limiter})
+        await server.start()
+        client = TokenClient(path)
+        await asyncio.wait_for(
+            asyncio.gather(
+                *[client.acquire("counting", Lane.BACKGROUND) for _ in range(5)]
+            ),
+            1,
+        )
+        assert limiter.calls == 5
+        await client.close()
+        await asyncio.wait_for(server.stop(), 1)
+
+    @pytest.mark.asyncio
+    async def test_paused_limiters_are_not_lent(self):
+        path = os.path.join(tempfile.mkdtemp(), "tokens.sock")
+        limiter = RateLimiter("paused", 10)
+        server = TokenServer(path, {"paused": limiter})
+        await server.start()
+        client = TokenClient(path)
+        await client.acquire("paused", Lane.BACKGROUND)
+        # Another process was throttled by the provider
+        start = time.monotonic()
+        client.pause("paused", 0.2)
+        await asyncio.wait_for(client.acquire("paused", Lane.BACKGROUND), 1)
+        assert time.monotonic() - start >= 0.2
+        await client.close()
+        await asyncio.wait_for(server.stop(), 1)
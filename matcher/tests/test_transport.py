@@ -0,0 +1,35 @@
+import os
+from unittest import mock
+
+import pytest
+from aiohttp import web
+from matcher.api import API
+from matcher.transport import transport
+
+
+class TestTransport:
+    @pytest.mark.asyncio
+    async def test_connections_are_reused(self, local_server):
+        async def handler(_: web.Request):
+            return web.json_response({"ok": True})
+
+        (_, api) = await local_server([web.get("/albums/{id}", handler)])
+        created = transport.stats.connections_created
+        reused = transport.stats.connections_reused
+        for i in range(3):
+            await api._get(f"/albums/{i}")
+        assert transport.stats.connections_created == created + 1
+        assert transport.stats.connections_reused == reused + 2
+        assert transport.open_sessions_count() >= 1
+        await transport.close()
+
+    @pytest.mark.asyncio
+    async def test_close_closes_registered_sessions(self):
+        with mock.patch.dict(
+            os.environ, {"API_URL": "http://127.0.0.1:1", "API_KEYS": "abcd"}
+        ):
+            api = API()
+        session = api.session
+        await transport.close()
+        assert session.closed
+        assert transport.open_sessions_count() == 0
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+from aiohttp import web
+from matcher.models.api.dto import User
+from matcher.users import UserCache
+
+ADMIN = User(id=1, name="admin", admin=True, enabled=True)
+
+
+class TestUserCache:
+    def test_users_are_cached(self):
+        cache = UserCache()
+        assert cache.get("abcd") == (False, None)
+        cache.set("abcd", ADMIN)
+        assert cache.get("abcd") == (True, ADMIN)
+
+    def test_invalid_tokens_are_cached(self):
+        cache = UserCache()
+        cache.set("abcd", None)
+        assert cache.get("abcd") == (True, None)
+
+    def test_entries_expire(self):
+        cache = UserCache(ttl=60, negative_ttl=0)
+        cache.set("abcd", None)
+        cache.set("efgh", ADMIN)
+        time.sleep(0.001)
+        assert cache.get("abcd") == (False, None)
+        assert cache.get("efgh") == (True, ADMIN)
+
+    def test_oldest_entries_are_evicted(self):
+        cache = UserCache(capacity=2)
+        cache.set("a", ADMIN)
+        cache.set("b", ADMIN)
+        cache.set("c", ADMIN)
+        assert cache.get("a") == (False, None)
+        assert cache.get("c") == (True, ADMIN)
+
+    def test_invalidate(self):
+        cache = UserCache()
+        cache.set("abcd", ADMIN)
+        cache.invalidate("abcd")
+        assert cache.get("abcd") == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_rejected_tokens_are_invalidated(self, local_server):
+        async def handler(_: web.Request):
+            return web.json_response({"message": "Unauthorized"}, status=401)
+
+        (_, api) = await local_server([web.get("/albums/1", handler)])
+        cache = UserCache()
+        cache.set("revoked", ADMIN)
+        api.on_token_rejected = cache.invalidate
+        with pytest.raises(Exception):
+            await api._get("/albums/1", "revoked", log_fail=False)
+        assert cache.get("revoked") == (False, None)
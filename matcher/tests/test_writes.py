@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from matcher.writes import WritePlan
+
+
+class TestWritePlan:
+    @pytest.mark.asyncio
+    async def test_writes_are_sent_on_send(self):
+        sent: list[tuple[str, str, dict]] = []
+
+        async def put(route: str, json: dict):
+            sent.append(("PUT", route, json))
+
+        async def post(route: str, json: dict):
+            sent.append(("POST", route, json))
+
+        plan = WritePlan()
+        plan.put("/songs/1", {"genres": ["Pop"]})
+        plan.post("/songs/1/lyrics", {"plain": "a"})
+        plan.put("/songs/1", {"bpm": 120})
+        assert plan.pending_count == 3
+        assert sent == []
+        await plan.send(put, post)
+        assert sent == [
+            ("PUT", "/songs/1", {"genres": ["Pop"]}),
+            ("PUT", "/songs/1", {"bpm": 120}),
+            ("POST", "/songs/1/lyrics", {"plain": "a"}),
+        ]
+        assert plan.pending_count == 0
+
+    @pytest.mark.asyncio
+    async def test_failures_are_raised_once_all_writes_are_done(self):
+        sent: list[str] = []
+
+        async def put(route: str, _: dict):
+            raise Exception(route)
+
+        async def post(route: str, _: dict):
+            await asyncio.sleep(0.01)
+            sent.append(route)
+
+        plan = WritePlan()
+        plan.put("/albums/1", {})
+        plan.post("/external-metadata", {})
+        with pytest.raises(Exception, match="/albums/1"):
+            await plan.send(put, post)
+        assert sent == ["/external-metadata"]
+
+    @pytest.mark.asyncio
+    async def test_api_writes_are_sent_concurrently_on_exit(self, local_server):
+        requests: list[str] = []
+        in_flight = 0
+        max_in_flight = 0
+
+        async def handler(request: web.Request):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            requests.append(f"{request.method} {request.path}")
+            status = 201 if request.method == "POST" else 200
+            return web.json_response({}, status=status)
+
+        (_, api) = await local_server(
+            [web.put("/songs/1", handler), web.post("/songs/1/lyrics", handler)]
+        )
+        async with api.planned_writes():
+            await api.post_song_genres(1, ["Pop"])
+            await api.post_song_lyrics(1, "Lyrics", None)
+            assert requests == []
+        assert sorted(requests) == ["POST /songs/1/lyrics", "PUT /songs/1"]
+        assert max_in_flight == 2